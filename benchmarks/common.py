@@ -0,0 +1,147 @@
+'''
+Helpers shared by the benchmarks: timing, quieting the library printout, building
+replicated test systems and comparing results with a saved baseline.
+'''
+
+# standard library imports
+import io
+import sys
+import json
+import time
+import logging
+import contextlib
+from os import path
+
+# third party
+import numpy as np
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, path.join(ROOT, 'pygsm'))
+from utilities import manage_xyz, elements
+from coordinate_systems import Topology, PrimitiveInternalCoordinates, DelocalizedInternalCoordinates
+
+DIELS_ALDER = path.join(ROOT, 'data', 'diels_alder.xyz')
+ELEMENT_TABLE = elements.ElementData()
+
+
+@contextlib.contextmanager
+def quiet():
+    ''' drop the printout of the library, it would dominate the output of the benchmarks '''
+    # the nifty logger handler keeps the stderr it was created with, so silence it by level
+    logger = logging.getLogger("NiftyLogger")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            yield
+    finally:
+        logger.setLevel(level)
+
+
+def best_time(func, repeat=5, setup=None):
+    ''' best wall time of func() over repeat calls, setup() runs untimed before each call '''
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with quiet():
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter()-t0)
+    return min(times)
+
+
+def replicate(geoms, ncopies, spacing=10.):
+    '''
+    ncopies of every geometry in geoms side by side on a cubic grid spacing Angstrom apart,
+    the copies do not interact so the work per atom stays the same as the system grows
+    '''
+    nside = int(np.ceil(ncopies**(1./3)-1e-9))
+    shifts = np.array([(x, y, z) for x in range(nside) for y in range(nside) for z in range(nside)][:ncopies])*spacing
+    replicated = []
+    for geom in geoms:
+        atoms = manage_xyz.get_atoms(geom)
+        xyz = manage_xyz.xyz_to_np(geom)
+        big = np.concatenate([xyz+shift for shift in shifts])
+        replicated.append(manage_xyz.np_to_xyz([[a, 0., 0., 0.] for a in atoms*ncopies], big))
+    return replicated
+
+
+def build_coordinates(reactant, product=None, coordinate_type='TRIC'):
+    ''' topology, primitives and DLC of reactant (union with product) as main.py builds them '''
+    atoms = [ELEMENT_TABLE.from_symbol(a) for a in manage_xyz.get_atoms(reactant)]
+    xyz1 = manage_xyz.xyz_to_np(reactant)
+    kwargs = {
+            'connect': coordinate_type == 'DLC',
+            'addtr': coordinate_type == 'TRIC',
+            'addcart': coordinate_type == 'HDLC',
+            }
+    with quiet():
+        top1 = Topology.build_topology(xyz1, atoms)
+        if product is not None:
+            xyz2 = manage_xyz.xyz_to_np(product)
+            top2 = Topology.build_topology(xyz2, atoms)
+            for bond in top2.edges():
+                if bond not in top1.edges() and (bond[1], bond[0]) not in top1.edges():
+                    top1.add_edge(*sorted(bond, reverse=True))
+        p1 = PrimitiveInternalCoordinates.from_options(xyz=xyz1, atoms=atoms, topology=top1, **kwargs)
+        if product is not None:
+            p2 = PrimitiveInternalCoordinates.from_options(xyz=xyz2, atoms=atoms, topology=top1, **kwargs)
+            p1.add_union_primitives(p2)
+        coord_obj = DelocalizedInternalCoordinates.from_options(xyz=xyz1, atoms=atoms, primitives=p1, **kwargs)
+    return atoms, top1, coord_obj
+
+
+def report(results, title):
+    ''' print {name: {size: seconds}} as a table with one column per system size '''
+    sizes = sorted({size for timings in results.values() for size in timings})
+    print()
+    print(" {}".format(title))
+    print(" {:<22s}".format('natoms') + ''.join('{:>11d}'.format(n) for n in sizes))
+    for name, timings in results.items():
+        print(" {:<22s}".format(name) + ''.join('{:>11s}'.format('{:.4f}'.format(timings[n]) if n in timings else '-') for n in sizes))
+    # the slope of log(time) against log(size) between the two largest systems
+    print(" {:<22s}".format('scaling exponent'))
+    for name, timings in results.items():
+        n = sorted(timings)
+        if len(n) > 1 and timings[n[-2]] > 0:
+            print("   {:<20s} {:.2f}".format(name, np.log(timings[n[-1]]/timings[n[-2]])/np.log(float(n[-1])/n[-2])))
+
+
+def save(results, filename):
+    with open(filename, 'w') as f:
+        json.dump({name: {str(n): t for n, t in timings.items()} for name, timings in results.items()}, f, indent=1)
+
+
+def compare(results, baseline_file, tolerance=1.5):
+    ''' names of the timings that are more than tolerance times slower than in the baseline file '''
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    slower = []
+    for name, timings in results.items():
+        for n, t in timings.items():
+            ref = baseline.get(name, {}).get(str(n))
+            if ref is not None and t > tolerance*ref:
+                slower.append("{} ({} atoms) {:.4f} s, baseline {:.4f} s".format(name, n, t, ref))
+    return slower
+
+
+def add_arguments(parser, sizes):
+    parser.add_argument('-sizes', type=int, nargs='+', default=sizes, help='numbers of copies of the molecule (default: %(default)s)')
+    parser.add_argument('-repeat', type=int, default=3, help='timed calls per measurement, the best is kept (default: %(default)s)')
+    parser.add_argument('-save', type=str, default=None, help='write the timings to this json file')
+    parser.add_argument('-baseline', type=str, default=None, help='fail if a timing is slower than in this json file by more than -tolerance')
+    parser.add_argument('-tolerance', type=float, default=1.5, help='allowed slow down against the baseline (default: %(default)s)')
+
+
+def finish(results, args, title):
+    report(results, title)
+    if args.save is not None:
+        save(results, args.save)
+    if args.baseline is not None:
+        slower = compare(results, args.baseline, args.tolerance)
+        for line in slower:
+            print(" REGRESSION: {}".format(line))
+        if slower:
+            return 1
+    return 0
@@ -0,0 +1,70 @@
+'''
+Timings of the coordinate system hot paths against system size.
+
+The Diels-Alder reactant (with the union of reactant and product bonds, as in DE-GSM) is
+replicated 1, 2, 4, ... times; the copies do not interact, so the cost per atom of a
+linear scaling method stays the same and the printed scaling exponents show which
+steps grow faster than the system.
+
+    python benchmarks/coordinates.py [-sizes 1 2 4 8] [-save now.json] [-baseline before.json]
+'''
+
+# standard library imports
+import sys
+import argparse
+
+# third party
+import numpy as np
+
+from common import DIELS_ALDER, add_arguments, best_time, build_coordinates, finish, quiet, replicate
+from utilities import manage_xyz
+from coordinate_systems import Topology
+
+
+def bench_size(ncopies, repeat):
+    geoms = manage_xyz.read_xyzs(DIELS_ALDER)
+    reactant, product = replicate([geoms[0], geoms[-1]], ncopies)
+    atoms, top, coords = build_coordinates(reactant, product)
+    xyz = manage_xyz.xyz_to_np(reactant)
+    natoms = len(atoms)
+    rng = np.random.RandomState(0)
+    gradx = rng.randn(3*natoms, 1)*0.01
+    dQ = rng.randn(coords.Vecs.shape[1], 1)*0.01
+
+    def clear():
+        # the coordinate objects remember the last results, time the real work
+        coords.clearCache()
+        coords.__dict__.pop('stored_xyz', None)
+
+    timings = {
+            'build_bonds': best_time(lambda: Topology.build_bonds(xyz, atoms, range(natoms)), repeat),
+            'build_topology': best_time(lambda: Topology.build_topology(xyz, atoms), repeat),
+            'prims.wilsonB': best_time(lambda: coords.Prims.wilsonB(xyz), repeat, clear),
+            'prims.GMatrix': best_time(lambda: coords.Prims.GMatrix(xyz), repeat, clear),
+            'wilsonB': best_time(lambda: coords.wilsonB(xyz), repeat, clear),
+            'GMatrix': best_time(lambda: coords.GMatrix(xyz), repeat, clear),
+            'GInverse': best_time(lambda: coords.GInverse(xyz), repeat, clear),
+            'build_dlc': best_time(lambda: coords.build_dlc(xyz), repeat, clear),
+            'calcGrad': best_time(lambda: coords.calcGrad(xyz, gradx), repeat, clear),
+            'newCartesian': best_time(lambda: coords.newCartesian(xyz, dQ, verbose=False), repeat, clear),
+            }
+    return natoms, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the coordinate system hot paths on replicated Diels-Alder systems')
+    add_arguments(parser, sizes=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    results = {}
+    for ncopies in args.sizes:
+        natoms, timings = bench_size(ncopies, args.repeat)
+        print(" {:4d} atoms done".format(natoms))
+        sys.stdout.flush()
+        for name, t in timings.items():
+            results.setdefault(name, {})[natoms] = t
+    return finish(results, args, 'coordinate hot paths, best wall time (s)')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+'''
+Timing of a whole DE-GSM run and of ic_reparam on the analytic ModelPotential.
+
+The Diels-Alder reaction of data/diels_alder.xyz (replicated 1, 2, ... times for the
+scaling curve) is run for a fixed number of GSM iterations. The model potential costs
+microseconds per gradient, so the timings are those of pyGSM itself: coordinate
+systems, optimizers and string bookkeeping.
+
+    python benchmarks/gsm.py [-sizes 1 2] [-max_iters 10] [-save now.json] [-baseline before.json]
+'''
+
+# standard library imports
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from os import path
+
+from common import DIELS_ALDER, add_arguments, build_coordinates, finish, quiet, replicate
+from utilities import manage_xyz, trajectory
+from level_of_theories.model_potential import ModelPotential
+from level_of_theories.file_options import File_Options
+from potential_energy_surfaces import PES
+from wrappers import Molecule
+from optimizers import eigenvector_follow
+from growing_string_methods import DE_GSM
+
+
+def build_gsm(reactant, product, reaction_xyz, nnodes=9):
+    ''' a DE-GSM object of the reaction on the model potential, like main.py builds it '''
+    file_options = File_Options()
+    file_options.UserOptions['reaction_xyz'] = reaction_xyz
+    with quiet():
+        lot = ModelPotential.from_options(geom=reactant, file_options=file_options)
+        pes = PES.from_options(lot=lot, ad_idx=0, multiplicity=1)
+        atoms, top, coord_obj = build_coordinates(reactant, product)
+        reactant_node = Molecule.from_options(geom=reactant, PES=pes, coord_obj=coord_obj, Form_Hessian=True)
+        product_node = Molecule.copy_from_options(reactant_node, xyz=manage_xyz.xyz_to_np(product), new_node_id=nnodes-1, copy_wavefunction=False)
+        optimizer = eigenvector_follow.from_options(Linesearch='NoLineSearch', DMAX=0.1)
+        gsm = DE_GSM.from_options(reactant=reactant_node, product=product_node, nnodes=nnodes, optimizer=optimizer, ID=0)
+    return gsm
+
+
+def bench_size(ncopies, max_iters, repeat):
+    geoms = manage_xyz.read_xyzs(DIELS_ALDER)
+    reactant, product = replicate([geoms[0], geoms[-1]], ncopies)
+    natoms = len(manage_xyz.get_atoms(reactant))
+
+    owd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='gsm_bench_')
+    timings = {'de_gsm': [], 'ic_reparam': []}
+    try:
+        # the string writes scratch files and trajectories to the working directory
+        os.chdir(workdir)
+        manage_xyz.write_xyzs('reaction.xyz', [reactant, product], scale=1.)
+        for _ in range(repeat):
+            gsm = build_gsm(reactant, product, path.join(workdir, 'reaction.xyz'))
+            with quiet():
+                t0 = time.perf_counter()
+                gsm.go_gsm(max_iters=max_iters, opt_steps=3, rtype=2)
+                trajectory.get_trajectory_writer().flush()
+                t1 = time.perf_counter()
+                gsm.ic_reparam(ic_reparam_steps=8)
+                t2 = time.perf_counter()
+            timings['de_gsm'].append(t1-t0)
+            timings['ic_reparam'].append(t2-t1)
+    finally:
+        os.chdir(owd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return natoms, {name: min(t) for name, t in timings.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark a DE-GSM run on the model potential for replicated Diels-Alder systems')
+    add_arguments(parser, sizes=[1, 2])
+    parser.add_argument('-max_iters', type=int, default=10, help='GSM iterations per run (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for ncopies in args.sizes:
+        natoms, timings = bench_size(ncopies, args.max_iters, args.repeat)
+        print(" {:4d} atoms done".format(natoms))
+        sys.stdout.flush()
+        for name, t in timings.items():
+            results.setdefault(name, {})[natoms] = t
+    return finish(results, args, 'DE-GSM on the model potential, best wall time (s)')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+'''
+Startup time of the gsm entry point.
+
+Short xTB level jobs are run by the thousand, and importing pyGSM used to take about a
+second, most of it spent on packages that a typical job never uses (matplotlib,
+scipy.optimize, pkg_resources). This benchmark imports wrappers.main in fresh
+interpreters, reports the best wall time, and fails if it is slower than the budget or
+if any of the modules that should only be loaded on demand were imported.
+
+    python benchmarks/startup.py [-repeat 5] [-budget 0.6]
+'''
+
+# standard library imports
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from os import path
+
+PYGSM = path.join(path.dirname(path.dirname(path.abspath(__file__))), 'pygsm')
+
+# loaded by the run that needs them, never at startup
+LAZY_MODULES = [
+        'matplotlib',
+        'scipy.optimize',
+        'scipy.linalg',
+        'pkg_resources',
+        'growing_string_methods.se_cross',
+        'potential_energy_surfaces.avg_pes',
+        'potential_energy_surfaces.penalty_pes',
+        'level_of_theories.nanoreactor_engine',
+        ]
+
+CHILD = '''
+import sys, time, json
+t0 = time.time()
+sys.path.insert(0, {pygsm!r})
+import wrappers.main
+t1 = time.time()
+print(json.dumps({{'import_time': t1-t0, 'modules': sorted(sys.modules)}}))
+'''
+
+
+def time_import():
+    ''' wall time of the whole interpreter and of the import, and the loaded modules '''
+    t0 = time.time()
+    out = subprocess.check_output([sys.executable, '-c', CHILD.format(pygsm=PYGSM)], env=dict(os.environ, MPLBACKEND='Agg'))
+    wall = time.time()-t0
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    result['wall_time'] = wall
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of the gsm entry point')
+    parser.add_argument('-repeat', type=int, default=5, help='number of fresh interpreters (default: %(default)s)')
+    parser.add_argument('-budget', type=float, default=0.6, help='maximum best import time in seconds (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    results = [time_import() for _ in range(args.repeat)]
+    best_import = min(r['import_time'] for r in results)
+    best_wall = min(r['wall_time'] for r in results)
+    print(" import wrappers.main  best {:.3f} s  median {:.3f} s".format(best_import, sorted(r['import_time'] for r in results)[len(results)//2]))
+    print(" interpreter total     best {:.3f} s".format(best_wall))
+
+    failed = False
+    loaded = [m for m in LAZY_MODULES if m in results[0]['modules']]
+    if loaded:
+        print(" FAIL: modules imported at startup that should be lazy: {}".format(', '.join(loaded)))
+        failed = True
+    if best_import > args.budget:
+        print(" FAIL: import time {:.3f} s is over the budget of {:.3f} s".format(best_import, args.budget))
+        failed = True
+    if not failed:
+        print(" OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,3 +4,4 @@ from .primitive_internals import PrimitiveInternalCoordinates
 from .cartesian import CartesianCoordinates
 from .topology import Topology,MyG
 from .slots import Distance,Angle,Dihedral,OutOfPlane,TranslationX,TranslationY,TranslationZ,RotationA,RotationB,RotationC
+from .coordinate_cache import CoordinateCache
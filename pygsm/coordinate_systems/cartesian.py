@@ -35,6 +35,9 @@ class CartesianCoordinates(InternalCoordinates):
     def calcGrad(self,xyz,gradx):
         return gradx
 
+    def calcHess(self,xyz,gradx,hessx):
+        return hessx
+
     def newCartesian(self,xyz,dq,verbose=True):
         return xyz+np.reshape(dq,(-1,3))
     
@@ -0,0 +1,63 @@
+from __future__ import print_function
+
+# standard library imports
+import os
+import hashlib
+import pickle
+
+# third party
+import numpy as np
+
+'''
+Content addressed on-disk cache of built coordinate systems.
+
+Screening campaigns start many strings from the same reactant, and every one of them
+builds the same topology, primitive internal coordinates (with their block_info), DLC
+basis and guess Hessian again. CoordinateCache stores these objects pickled under the
+sha1 of everything they were built from: atoms, coordinates (to 1e-6 Angstrom), bonds,
+coordinate type and the hybrid/frozen/primitive index settings. A different input gives
+a different key, so entries never have to be invalidated.
+
+Entries are written to a temporary file and renamed, several jobs can share a cache
+directory.
+'''
+
+
+class CoordinateCache(object):
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+
+    @staticmethod
+    def key(kind, **inputs):
+        ''' sha1 of kind and the inputs, arrays are rounded so the last digits of an xyz file do not matter '''
+        sha = hashlib.sha1(kind.encode())
+        for name in sorted(inputs):
+            value = inputs[name]
+            sha.update(name.encode())
+            if isinstance(value, np.ndarray):
+                sha.update(np.ascontiguousarray(np.round(value, 6)+0.).tobytes())
+            else:
+                sha.update(repr(value).encode())
+        return '{}_{}'.format(kind, sha.hexdigest())
+
+    def filename(self, key):
+        return os.path.join(self.cachedir, key+'.pkl')
+
+    def load(self, key):
+        ''' the stored entry or None '''
+        try:
+            with open(self.filename(key), 'rb') as f:
+                entry = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+        print(" loaded {} from the coordinate cache".format(key.split('_')[0]))
+        return entry
+
+    def store(self, key, entry):
+        tmpfile = '{}.{}.tmp'.format(self.filename(key), os.getpid())
+        with open(tmpfile, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpfile, self.filename(key))
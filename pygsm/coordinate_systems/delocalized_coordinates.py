@@ -236,6 +236,7 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
             xyz2 = self.applyConstraints(xyz2)
         return xyz2
     
+    @profiler.timed('wilsonB')
     def wilsonB(self,xyz):
         Bp = self.Prims.wilsonB(xyz)
         #Vt = block_matrix.transpose(self.Vecs)
@@ -293,6 +294,7 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
         Gxc = multi_dot([Bmat.T, Gqc.T]).flatten()
         return Gxc
     
+    @profiler.timed('build_dlc')
     def build_dlc(self, xyz, C=None):
         """
         Build the delocalized internal coordinates (DLCs) which are linear 
@@ -317,11 +319,8 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
                 Float array containing difference in primitive coordinates
         """
 
-        nifty.click()
         #print(" Beginning to build G Matrix")
         G = self.Prims.GMatrix(xyz)  # in primitive coords
-        time_G = nifty.click()
-        #print(" Timings: Build G: %.3f " % (time_G))
 
         tmpvecs=[]
         for A in G.matlist:
@@ -341,9 +340,6 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
         #print(" shape of DLC")
         #print(self.Vecs.shape)
 
-        time_eig = nifty.click()
-        print(" Timings: Build G: %.3f Eig: %.3f" % (time_G, time_eig))
-
         #self.Internals = ["DLC %i" % (i+1) for i in range(len(LargeIdx))]
         self.Internals = ["DLC %i" % (i+1) for i in range(self.Vecs.shape[1])]
 
@@ -382,6 +378,7 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
         return
 
 
+    @profiler.timed('build_dlc')
     def build_dlc_conjugate(self, xyz, C=None):
         """
         Build the delocalized internal coordinates (DLCs) which are linear 
@@ -407,10 +404,7 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
         """
 
         print(" starting to build G prim")
-        nifty.click()
         G = self.Prims.GMatrix(xyz)  # in primitive coords
-        time_G = nifty.click()
-        print(" Timings: Build G: %.3f " % (time_G))
 
         tmpvecs=[]
         for A in G.matlist:
@@ -425,8 +419,6 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
             #print("LargeVals %i" % LargeVals)
             tmpvecs.append(Q[:,LargeIdx])
         self.Vecs = block_matrix(tmpvecs)
-        time_eig = nifty.click()
-        #print(" Timings: Build G: %.3f Eig: %.3f" % (time_G, time_eig))
 
         self.Internals = ["DLC %i" % (i+1) for i in range(len(LargeIdx))]
 
@@ -765,6 +757,7 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
     # which is an elegant way to use the derivatives
     # but there is a more efficient way to compute G
     # using the block diagonal properties of G and V
+    @profiler.timed('GMatrix')
     def GMatrix(self,xyz):
         tmpvecs=[]
         s3a=0
@@ -836,6 +829,11 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
 
         return Answer
 
+    def contract_second_derivatives(self, coords, gq):
+        """ sum_i gq_i d^2 Q_i/dx^2 for the DLCs, which is the primitive contraction with weights V.gq """
+        gp = block_matrix.dot(self.Vecs,gq)
+        return self.Prims.contract_second_derivatives(coords,gp)
+
     def MW_GInverse(self,xyz,mass):
         xyz = xyz.reshape(-1,3)
         #nifty.click()
@@ -846,6 +844,7 @@ class DelocalizedInternalCoordinates(InternalCoordinates):
         # print "G-time: %.3f Inv-time: %.3f" % (time_G, time_inv)
         return block_matrix(tmpGi)
 
+    @profiler.timed('GInverse')
     def GInverse(self, xyz):
         #return self.GInverse_diag(xyz)
         return self.GInverse_EIG(xyz)
@@ -9,7 +9,6 @@ import numpy as np
 from numpy.linalg import multi_dot
 import itertools
 import networkx as nx
-from pkg_resources import parse_version
 
 # local application imports
 try:
@@ -20,6 +19,7 @@ from utilities import *
 
 
 ELEMENT_TABLE = elements.ElementData()
+log = logs.get_logger('coordinates')
 
 CacheWarning = False
 
@@ -335,6 +335,7 @@ class InternalCoordinates(object):
         logger.info("Finite-difference Finished\n")
         return FiniteDifference
 
+    @profiler.timed('calcGrad')
     def calcGrad(self, xyz, gradx):
         #q0 = self.calculate(xyz)
         Ginv = self.GInverse(xyz)
@@ -361,13 +362,13 @@ class InternalCoordinates(object):
          """
          xyz = xyz.flatten()
          q0 = self.calculate(xyz)
-         Ginv = self.GInverse(xyz)
-         Bmat = self.wilsonB(xyz)
+         Ginv = block_matrix.full_matrix(self.GInverse(xyz))
+         Bmat = block_matrix.full_matrix(self.wilsonB(xyz))
          Gq = self.calcGrad(xyz, gradx)
-         deriv2 = self.second_derivatives(xyz)
-         Bmatp = deriv2.reshape(deriv2.shape[0], xyz.shape[0], xyz.shape[0])
-         Hx_BptGq = hessx - np.einsum('pmn,p->mn',Bmatp,Gq)
-         Hq = np.einsum('ps,sm,mn,nr,rq', Ginv, Bmat, Hx_BptGq, Bmat.T, Ginv, optimize=True)
+         # sum_p Gq_p d^2q_p/dx^2 is contracted on the fly instead of
+         # building the (nprim,3N,3N) second derivative tensor
+         Hx_BptGq = hessx - self.contract_second_derivatives(xyz, Gq)
+         Hq = multi_dot([Ginv, Bmat, Hx_BptGq, Bmat.T, Ginv])
          return Hq
 
     def readCache(self, xyz, dQ):
@@ -408,14 +409,14 @@ class InternalCoordinates(object):
         # Function to exit from loop
         def finish(microiter, rmsdt, ndqt, xyzsave, xyz_iter1):
             if ndqt > 1e-1:
-                if verbose: nifty.logger.info(" Failed to obtain coordinates after %i microiterations (rmsd = %.3e |dQ| = %.3e)\n" % (microiter, rmsdt, ndqt))
+                if verbose: log.info(" Failed to obtain coordinates after %i microiterations (rmsd = %.3e |dQ| = %.3e)", microiter, rmsdt, ndqt)
                 self.bork = True
                 self.writeCache(xyz, dQ, xyz_iter1)
                 return xyzsave.reshape((-1,3))
             elif ndqt > 1e-3:
-                if verbose: nifty.logger.info(" Approximate coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)\n" % (microiter, rmsdt, ndqt))
+                if verbose: log.debug(" Approximate coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)", microiter, rmsdt, ndqt)
             else:
-                if verbose: nifty.logger.info(" Cartesian coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)\n" % (microiter, rmsdt, ndqt))
+                if verbose: log.debug(" Cartesian coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)", microiter, rmsdt, ndqt)
             self.writeCache(xyz, dQ, xyzsave)
             return xyzsave.reshape((-1,3))
         fail_counter = 0
@@ -440,19 +441,19 @@ class InternalCoordinates(object):
             ndq = np.linalg.norm(dQ1-dQ_actual)
             if len(ndqs) > 0:
                 if ndq > ndqt:
-                    if verbose: nifty.logger.info(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Bad)\n" % (microiter, ndq, ndqt, rmsd, damp))
+                    if verbose: log.debug(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Bad)", microiter, ndq, ndqt, rmsd, damp)
                     damp /= 2
                     fail_counter += 1
                     # xyz2 = xyz1.copy()
                 else:
-                    if verbose: nifty.logger.info(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Good)\n" % (microiter, ndq, ndqt, rmsd, damp))
+                    if verbose: log.debug(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Good)", microiter, ndq, ndqt, rmsd, damp)
                     fail_counter = 0
                     damp = min(damp*1.2, 1.0)
                     rmsdt = rmsd
                     ndqt = ndq
                     xyzsave = xyz2.copy()
             else:
-                if verbose: nifty.logger.info(" Iter: %i Err-dQ = %.5e RMSD: %.5e Damp: %.5e\n" % (microiter, ndq, rmsd, damp))
+                if verbose: log.debug(" Iter: %i Err-dQ = %.5e RMSD: %.5e Damp: %.5e", microiter, ndq, rmsd, damp)
                 rmsdt = rmsd
                 ndqt = ndq
             ndqs.append(ndq)
@@ -469,6 +470,7 @@ class InternalCoordinates(object):
             xyz1 = xyz2.copy()
 
 
+    @profiler.timed('newCartesian')
     def newCartesian(self, xyz, dQ, verbose=True):
         cached = self.readCache(xyz, dQ)
         if cached is not None:
@@ -485,15 +487,17 @@ class InternalCoordinates(object):
         damp = 1.0
         # Function to exit from loop
         def finish(microiter, rmsdt, ndqt, xyzsave, xyz_iter1):
+            profiler.get_profiler().count('newCartesian microiterations', microiter)
+            logs.event('newCartesian', microiterations=microiter, rmsd=rmsdt, dq_error=ndqt)
             if ndqt > 1e-1:
-                if verbose: nifty.logger.info(" Failed to obtain coordinates after %i microiterations (rmsd = %.3e |dQ| = %.3e)\n" % (microiter, rmsdt, ndqt))
+                if verbose: log.info(" Failed to obtain coordinates after %i microiterations (rmsd = %.3e |dQ| = %.3e)", microiter, rmsdt, ndqt)
                 self.bork = True
                 self.writeCache(xyz, dQ, xyz_iter1)
                 return xyzsave.reshape((-1,3))
             elif ndqt > 1e-3:
-                if verbose: nifty.logger.info(" Approximate coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)\n" % (microiter, rmsdt, ndqt))
+                if verbose: log.debug(" Approximate coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)", microiter, rmsdt, ndqt)
             else:
-                if verbose: nifty.logger.info(" Cartesian coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)\n" % (microiter, rmsdt, ndqt))
+                if verbose: log.debug(" Cartesian coordinates obtained after %i microiterations (rmsd = %.3e |dQ| = %.3e)", microiter, rmsdt, ndqt)
             self.writeCache(xyz, dQ, xyzsave)
             return xyzsave.reshape((-1,3))
         fail_counter = 0
@@ -519,19 +523,19 @@ class InternalCoordinates(object):
             ndq = np.linalg.norm(dQ1-dQ_actual)
             if len(ndqs) > 0:
                 if ndq > ndqt:
-                    if verbose: nifty.logger.info(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Bad)\n" % (microiter, ndq, ndqt, rmsd, damp))
+                    if verbose: log.debug(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Bad)", microiter, ndq, ndqt, rmsd, damp)
                     damp /= 2
                     fail_counter += 1
                     #xyz2 = xyz1.copy()
                 else:
-                    if verbose: nifty.logger.info(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Good)\n" % (microiter, ndq, ndqt, rmsd, damp))
+                    if verbose: log.debug(" Iter: %i Err-dQ (Best) = %.5e (%.5e) RMSD: %.5e Damp: %.5e (Good)", microiter, ndq, ndqt, rmsd, damp)
                     fail_counter = 0
                     damp = min(damp*1.2, 1.0)
                     rmsdt = rmsd
                     ndqt = ndq
                     xyzsave = xyz2.copy()
             else:
-                if verbose: nifty.logger.info(" Iter: %i Err-dQ = %.5e RMSD: %.5e Damp: %.5e\n" % (microiter, ndq, rmsd, damp))
+                if verbose: log.debug(" Iter: %i Err-dQ = %.5e RMSD: %.5e Damp: %.5e", microiter, ndq, rmsd, damp)
                 rmsdt = rmsd
                 ndqt = ndq
             ndqs.append(ndq)
@@ -76,11 +76,9 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
             for g in self.fragments: g.__class__ = MyG
 
             self.get_hybrid_indices(xyz)
-            nifty.click()
-            self.newMakePrimitives(xyz)
+            with profiler.get_profiler().timer('make primitives'):
+                self.newMakePrimitives(xyz)
             print(" done making primitives")
-            time_build = nifty.click()
-            print(" make prim %.3f" % time_build)
 
         # Reorder primitives for checking with cc's code in TC.
         # Note that reorderPrimitives() _must_ be updated with each new InternalCoordinate class written.
@@ -294,6 +292,7 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
                             self.add(Dihedral(a, b, c, d))
 
     # overwritting parent internal coordinate wilsonB with a block matrix representation
+    @profiler.timed('prims.wilsonB')
     def wilsonB(self,xyz):
         """
         Given Cartesian coordinates xyz, return the Wilson B-matrix
@@ -305,6 +304,7 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
         ht = time.time() - t0
         if xhash in self.stored_wilsonB:
             #print(" returning stored")
+            profiler.get_profiler().count('prims.wilsonB cache hits')
             ans = self.stored_wilsonB[xhash]
             return ans
         xyz = xyz.reshape(-1,3)
@@ -338,6 +338,7 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
             CacheWarning = True
         return ans
     
+    @profiler.timed('prims.GMatrix')
     def GMatrix(self,xyz):
         #if len(self.nprims_frag)==1:
         #    return block_matrix(super(PrimitiveInternalCoordinates,self).GMatrix(xyz))
@@ -360,12 +361,10 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
     def GInverse_SVD(self, xyz):
         xyz = xyz.reshape(-1,3)
         # Perform singular value decomposition
-        nifty.click()
         loops = 0
         while True:
             try:
                 G = self.GMatrix(xyz)
-                time_G = nifty.click()
                 start=0
                 tmpUvecs=[]
                 tmpVvecs=[]
@@ -378,7 +377,6 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
                 V = block_matrix(tmpVvecs)
                 UT = block_matrix(tmpUvecs)
                 S = block_matrix(tmpSvecs)
-                time_svd = nifty.click()
             except np.linalg.LinAlgError:
                 logger.warning("\x1b[1;91m SVD fails, perturbing coordinates and trying again\x1b[0m")
                 xyz = xyz + 1e-2*np.random.random(xyz.shape)
@@ -387,7 +385,6 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
                     raise RuntimeError('SVD failed too many times')
                 continue
             break
-        print("Build G: %.3f SVD: %.3f" % (time_G, time_svd))
 
         LargeVals = 0
         
@@ -1281,6 +1278,54 @@ class PrimitiveInternalCoordinates(InternalCoordinates):
         # 5) 3
         return answer
 
+    def contract_second_derivatives(self,xyz,gq):
+        """
+        Return the (3N,3N) matrix sum_p gq_p * d^2 q_p/dx^2 without forming
+        the (nprim,3N,3N) second derivative tensor. Distances, angles and
+        dihedrals are evaluated with the vectorized kernels in slots and
+        scattered onto the atoms they touch, Cartesians and translations
+        are linear and contribute nothing, everything else falls back to
+        the per-primitive second_derivative.
+        """
+        xyz = xyz.reshape(-1,3)
+        gq = np.asarray(gq).flatten()
+        natoms = xyz.shape[0]
+        answer = np.zeros((3*natoms,3*natoms))
+
+        batched = {'Distance':[], 'Angle':[], 'Dihedral':[]}
+        for info in self.block_info:
+            sa,ea,sp,ep = info
+            for i,p in enumerate(self.Internals[sp:ep]):
+                g = gq[sp+i]
+                if g == 0.:
+                    continue
+                name = type(p).__name__
+                if name in batched:
+                    batched[name].append((sp+i,p.atoms))
+                elif name.startswith('Cartesian') or name.startswith('Translation'):
+                    continue
+                else:
+                    na = ea-sa
+                    sd = np.reshape(p.second_derivative(xyz[sa:ea,:],start_idx=sa),(3*na,3*na))
+                    answer[3*sa:3*ea,3*sa:3*ea] += g*sd
+
+        kernels = {
+                'Distance': distance_second_derivatives,
+                'Angle': angle_second_derivatives,
+                'Dihedral': dihedral_second_derivatives,
+                }
+        for name,prims in batched.items():
+            if not prims:
+                continue
+            idx = np.array([i for i,_ in prims])
+            atoms = np.array([a for _,a in prims])
+            SDer = kernels[name](xyz,*atoms.T)
+            nprim,k = SDer.shape[:2]
+            SDer = gq[idx,None,None]*SDer.reshape(nprim,3*k,3*k)
+            cols = (3*atoms[:,:,None] + np.arange(3)).reshape(nprim,3*k)
+            np.add.at(answer,(cols[:,:,None],cols[:,None,:]),SDer)
+        return answer
+
 
     def get_hybrid_indices(self,xyz):
         '''
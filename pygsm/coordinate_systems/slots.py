@@ -1106,7 +1106,7 @@ class Angle(PrimitiveCoordinate):
         term2 = (uv + uv.T - (3*vv - de)*cq)/(v_norm**2*sq)
         term3 = (uu + vv - uv*cq   - de)/(u_norm*v_norm*sq)
         term4 = (uu + vv - uv.T*cq - de)/(u_norm*v_norm*sq)
-        der1 = self.derivative(xyz)
+        der1 = self.derivative(xyz,start_idx)
         def zeta(a_, m_, n_):
             return (int(a_==m_) - int(a_==n_))
         for a in [m, n, o]:
@@ -1775,14 +1775,153 @@ class OutOfPlane(PrimitiveCoordinate):
             for j in range(3):
                 ii = [a, b, c, d][i]
                 xyz[ii, j] += h
-                FPlus = self.derivative(xyz)
+                FPlus = self.derivative(xyz,start_idx)
                 xyz[ii, j] -= 2*h
-                FMinus = self.derivative(xyz)
+                FMinus = self.derivative(xyz,start_idx)
                 xyz[ii, j] += h
                 fderiv = (FPlus-FMinus)/(2*h)
                 deriv2[ii, j, :, :] = fderiv
         return deriv2
 
+# Vectorized second derivative kernels.
+# Each kernel takes the full (natoms,3) geometry and integer arrays of atom
+# indices (one entry per primitive) and returns the non-zero atom x atom blocks
+# of the second derivative, i.e. an array of shape (nprim,k,3,k,3) where k is
+# the number of atoms the primitive type touches. The atom ordering of the
+# blocks is the same as the order of the index arrays passed in.
+
+def _zeta(a_, m_, n_):
+    return (int(a_==m_) - int(a_==n_))
+
+def _coefficient_tables():
+    '''
+    the zeta products of the angle and dihedral second derivatives for every pair of
+    local atoms, and the tensor form of Dihedral.second_derivative.mk_amat
+    '''
+    # local atom ordering (m,o,n) = (a,b,c)
+    angle = np.zeros((4,3,3))
+    for a in range(3):
+        for b in range(3):
+            angle[0,a,b] = _zeta(a,0,1)*_zeta(b,0,1)
+            angle[1,a,b] = _zeta(a,2,1)*_zeta(b,2,1)
+            angle[2,a,b] = _zeta(a,0,1)*_zeta(b,2,1)
+            angle[3,a,b] = _zeta(a,2,1)*_zeta(b,0,1)
+
+    # local atom ordering (m,o,p,n) = (a,b,c,d)
+    m,o,p,n = 0,1,2,3
+    dihedral = np.zeros((8,4,4))
+    for a in range(4):
+        for b in range(4):
+            dihedral[0,a,b] = _zeta(a,m,o)*_zeta(b,m,o)
+            dihedral[1,a,b] = _zeta(a,n,p)*_zeta(b,n,p)
+            dihedral[2,a,b] = _zeta(a,m,o)*_zeta(b,o,p) + _zeta(a,p,o)*_zeta(b,o,m)
+            dihedral[3,a,b] = _zeta(a,n,p)*_zeta(b,p,o) + _zeta(a,p,o)*_zeta(b,n,p)
+            dihedral[4,a,b] = _zeta(a,o,p)*_zeta(b,p,o)
+            dihedral[5,a,b] = _zeta(a,p,o)*_zeta(b,o,p)
+            if a != b:
+                dihedral[6,a,b] = _zeta(a,m,o)*_zeta(b,p,o) + _zeta(a,p,o)*_zeta(b,o,m)
+                dihedral[7,a,b] = _zeta(a,n,o)*_zeta(b,p,o) + _zeta(a,p,o)*_zeta(b,o,n)
+
+    amat = np.zeros((3,3,3))
+    for i in range(3):
+        for j in range(3):
+            if i == j: continue
+            amat[i,j,3-i-j] = (j-i) * ((-0.5)**np.abs(j-i))
+    return angle, dihedral, amat
+
+_ANGLE_COEFS, _DIHEDRAL_COEFS, _AMAT = _coefficient_tables()
+
+def _outer(x, y):
+    return np.einsum('ni,nj->nij', x, y)
+
+def distance_second_derivatives(xyz, a, b):
+    xyz = xyz.reshape(-1,3)
+    d = xyz[a] - xyz[b]
+    l = np.linalg.norm(d, axis=1)
+    u = d / l[:,None]
+    mtx = (_outer(u,u) - np.eye(3)) / l[:,None,None]
+    deriv2 = np.zeros((len(l),2,3,2,3))
+    deriv2[:,0,:,0,:] = -mtx
+    deriv2[:,1,:,1,:] = -mtx
+    deriv2[:,0,:,1,:] = mtx
+    deriv2[:,1,:,0,:] = mtx
+    return deriv2
+
+def angle_second_derivatives(xyz, a, b, c):
+    xyz = xyz.reshape(-1,3)
+    u_prime = xyz[a] - xyz[b]
+    v_prime = xyz[c] - xyz[b]
+    u_norm = np.linalg.norm(u_prime, axis=1)
+    v_norm = np.linalg.norm(v_prime, axis=1)
+    u = u_prime / u_norm[:,None]
+    v = v_prime / v_norm[:,None]
+    # Deriv2 derivatives are set to zero in the case of parallel or antiparallel vectors
+    ok = (np.linalg.norm(u+v, axis=1) >= 1e-10) & (np.linalg.norm(u-v, axis=1) >= 1e-10)
+    cq = np.einsum('ni,ni->n', u, v)
+    sq = np.sqrt(np.clip(1-cq**2, 0., None))
+    sq[~ok] = 1.
+    w = np.cross(u, v)
+    w_norm = np.linalg.norm(w, axis=1)
+    w_norm[~ok] = 1.
+    w /= w_norm[:,None]
+    der1 = np.zeros((len(cq),3,3))
+    der1[:,0] = np.cross(u, w) / u_norm[:,None]
+    der1[:,2] = np.cross(w, v) / v_norm[:,None]
+    der1[:,1] = -(der1[:,0] + der1[:,2])
+    uu = _outer(u,u)
+    uv = _outer(u,v)
+    vv = _outer(v,v)
+    uvT = uv.transpose(0,2,1)
+    de = np.eye(3)
+    terms = np.array([
+        (uv + uvT - (3*uu - de)*cq[:,None,None])/(u_norm**2*sq)[:,None,None],
+        (uv + uvT - (3*vv - de)*cq[:,None,None])/(v_norm**2*sq)[:,None,None],
+        (uu + vv - uv*cq[:,None,None] - de)/(u_norm*v_norm*sq)[:,None,None],
+        (uu + vv - uvT*cq[:,None,None] - de)/(u_norm*v_norm*sq)[:,None,None],
+        ])
+    deriv2 = np.einsum('tab,tnij->naibj', _ANGLE_COEFS, terms)
+    deriv2 -= (cq/sq)[:,None,None,None,None] * np.einsum('nai,nbj->naibj', der1, der1)
+    deriv2[~ok] = 0.
+    return deriv2
+
+def dihedral_second_derivatives(xyz, a, b, c, d):
+    xyz = xyz.reshape(-1,3)
+    u_prime = xyz[a] - xyz[b]
+    w_prime = xyz[c] - xyz[b]
+    v_prime = xyz[d] - xyz[c]
+    lu = np.linalg.norm(u_prime, axis=1)
+    lw = np.linalg.norm(w_prime, axis=1)
+    lv = np.linalg.norm(v_prime, axis=1)
+    u = u_prime / lu[:,None]
+    w = w_prime / lw[:,None]
+    v = v_prime / lv[:,None]
+    cu = np.einsum('ni,ni->n', u, w)
+    su = np.sqrt(np.clip(1 - cu**2, 0., None))
+    cv = np.einsum('ni,ni->n', v, w)
+    sv = np.sqrt(np.clip(1 - cv**2, 0., None))
+    ok = (su >= 1e-6) & (sv >= 1e-6)
+    su[~ok] = 1.
+    sv[~ok] = 1.
+    su4 = su**4
+    sv4 = sv**4
+    uxw = np.cross(u, w)
+    vxw = np.cross(v, w)
+    cu_ = cu[:,None]
+    cv_ = cv[:,None]
+    terms = np.zeros((8,len(cu),3,3))
+    terms[0] = _outer(uxw, w*cu_ - u)/(lu**2*su4)[:,None,None]
+    terms[1] = _outer(vxw, -w*cv_ + v)/(lv**2*sv4)[:,None,None]
+    terms[2] = _outer(uxw, w - 2*u*cu_ + w*cu_**2)/(2*lu*lw*su4)[:,None,None]
+    terms[3] = _outer(vxw, w - 2*v*cv_ + w*cv_**2)/(2*lv*lw*sv4)[:,None,None]
+    terms[4] = _outer(uxw, u + u*cu_**2 - 3*w*cu_ + w*cu_**3)/(2*lw**2*su4)[:,None,None]
+    terms[5] = _outer(vxw, -v - v*cv_**2 + 3*w*cv_ - w*cv_**3)/(2*lw**2*sv4)[:,None,None]
+    terms[:6] += terms[:6].transpose(0,1,3,2)
+    terms[6] = np.einsum('ijk,nk->nij', _AMAT, (-w*cu_ + u)/(lu*lw*su**2)[:,None])
+    terms[7] = np.einsum('ijk,nk->nij', _AMAT, ( w*cv_ - v)/(lv*lw*sv**2)[:,None])
+    deriv2 = np.einsum('tab,tnij->naibj', _DIHEDRAL_COEFS, terms)
+    deriv2[~ok] = 0.
+    return deriv2
+
 def logArray(mat, precision=3, fmt="f"):
     fmt="%% .%i%s" % (precision, fmt)
     if len(mat.shape) == 1:
@@ -10,11 +10,12 @@ sys.path.append(path.dirname( path.dirname( path.abspath(__file__))))
 
 import numpy as np
 import itertools
-from pkg_resources import parse_version
 from collections import OrderedDict, defaultdict
 
 try:
     import networkx as nx
+    # only the major version matters, pkg_resources.parse_version is slow to import
+    NX2 = int(nx.__version__.split('.')[0]) >= 2
 except ImportError:
     nifty.logger.warning("NetworkX cannot be imported (topology tools won't work).  Most functionality should still work though.")
 
@@ -213,7 +214,7 @@ class Topology():
             element = atoms[i]
             a = element.symbol
             G.add_node(i)
-            if parse_version(nx.__version__) >= parse_version('2.0'):
+            if NX2:
                 nx.set_node_attributes(G,{i:a}, name='e')
                 nx.set_node_attributes(G,{i:xyz[i]}, name='x')
             else:
@@ -262,7 +263,7 @@ class Topology():
         for i, a_dict in enumerate(atoms):
             a = a_dict.symbol
             G.add_node(i)
-            if parse_version(nx.__version__) >= parse_version('2.0'):
+            if NX2:
                 nx.set_node_attributes(G,{i:a}, name='e')
                 nx.set_node_attributes(G,{i:xyz[i]}, name='x')
             else:
@@ -1,4 +1,22 @@
-from .de_gsm import DE_GSM
-from .se_gsm import SE_GSM
-from .se_cross import SE_Cross
-from .base_gsm import Base_Method
+import importlib
+
+# The string methods are imported when first used, so a job only loads the one it runs
+_classes = {
+        'DE_GSM': '.de_gsm',
+        'SE_GSM': '.se_gsm',
+        'SE_Cross': '.se_cross',
+        'Base_Method': '.base_gsm',
+        }
+__all__ = list(_classes)
+
+
+def __getattr__(name):
+    if name not in _classes:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_classes[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
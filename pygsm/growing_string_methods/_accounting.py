@@ -0,0 +1,99 @@
+from __future__ import print_function
+import time
+from collections import OrderedDict
+
+from utilities import nifty, profiler
+
+'''
+Accounting of the electronic structure calls of a string and the QM budget of a run.
+
+The PES objects count every energy and gradient request on the profiler: 'gradients'
+are calculations the lot really ran (one per geometry, all states at once), 'lot memo
+hits' are requests the lot answered from the geometry it had just computed and 'pes
+cache hits' are requests answered from the results evaluate_nodes or a restart put on
+the PES. Like the lot timers they are filed under the node, phase and iteration of the
+string, so gradient_accounting(by='node') is the cost of every node.
+
+With max_gradients or max_wall_time the string stops after the growth or opt iteration
+past which one more iteration, as expensive as the last one, would overrun the budget.
+The checkpoint of that iteration is written, so the run is continued with
+-restart_file scratch/checkpoint_{ID}.npz.
+'''
+
+# accounting key -> profiler counter
+COUNTERS = OrderedDict([
+        ('gradients', 'gradients'),
+        ('lot_memo_hits', 'lot memo hits'),
+        ('pes_cache_hits', 'pes cache hits'),
+        ])
+
+# profiler timers of the lot calls, summed into lot_time
+LOT_TIMERS = ['lot.get_energy', 'lot.get_gradient', 'lot.run_batch', 'lot.dispatch']
+
+
+def _accounting_row(totals):
+    row = OrderedDict((key, totals[name][0] if name in totals else 0) for key, name in COUNTERS.items())
+    row['lot_time'] = sum(totals[name][1] for name in LOT_TIMERS if name in totals)
+    return row
+
+
+class Accounting:
+
+    def gradient_accounting(self, by=None):
+        '''
+        OrderedDict(gradients, lot_memo_hits, pes_cache_hits, lot_time (s)) of everything recorded
+        by the profiler, or with by='node', 'phase' or 'iteration' one of them per label
+        '''
+        totals = profiler.get_profiler().totals(by)
+        if by is None:
+            return _accounting_row(totals)
+        return OrderedDict((label, _accounting_row(t)) for label, t in totals.items())
+
+    def gradient_count(self):
+        ''' electronic structure calculations so far '''
+        totals = profiler.get_profiler().totals()
+        return totals['gradients'][0] if 'gradients' in totals else 0
+
+    def start_budget(self):
+        ''' the budget and the cost of the current iteration are counted from here '''
+        self.budget_start = (self.gradient_count(), time.time())
+        self.iteration_start = self.budget_start
+        self.budget_stop = None
+
+    def start_budget_iteration(self):
+        self.iteration_start = (self.gradient_count(), time.time())
+
+    def budget_exhausted(self):
+        '''
+        True if one more iteration, as expensive as the one since start_budget_iteration, would
+        exceed max_gradients or max_wall_time. The reason is kept in budget_stop.
+        '''
+        max_gradients = self.options['max_gradients']
+        max_wall_time = self.options['max_wall_time']
+        if max_gradients is None and max_wall_time is None:
+            return False
+        ngrads, now = self.gradient_count(), time.time()
+        used = ngrads-self.budget_start[0]
+        last = ngrads-self.iteration_start[0]
+        elapsed = now-self.budget_start[1]
+        last_time = now-self.iteration_start[1]
+        if max_gradients is not None and used+last > max_gradients:
+            self.budget_stop = "{} of max_gradients={} used, the last iteration took {}".format(used, max_gradients, last)
+        elif max_wall_time is not None and elapsed+last_time > max_wall_time:
+            self.budget_stop = "{:.1f} s of max_wall_time={:.1f} s used, the last iteration took {:.1f} s".format(elapsed, max_wall_time, last_time)
+        return self.budget_stop is not None
+
+    def print_budget_stop(self):
+        nifty.printcool("Stopping GSM, QM budget exhausted\n {}\n continue with -restart_file {}".format(self.budget_stop, self.checkpoint_file()))
+
+    def print_accounting(self):
+        ''' the gradient accounting per phase and per node '''
+        header = " {:<10s} {:>9s} {:>10s} {:>10s} {:>12s}"
+        line = " {:<10s} {:>9d} {:>10d} {:>10d} {:>12.3f}"
+        print(" Electronic structure calls")
+        for by in ['phase', 'node']:
+            print(header.format(by, 'gradients', 'memo hits', 'cache hits', 'lot time (s)'))
+            for label, row in self.gradient_accounting(by).items():
+                print(line.format('-' if label is None else str(label), *row.values()))
+        row = self.gradient_accounting()
+        print(line.format('total', *row.values()))
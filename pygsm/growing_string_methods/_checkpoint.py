@@ -0,0 +1,201 @@
+from __future__ import print_function
+import os
+import json
+import numpy as np
+
+from utilities import nifty, block_matrix, profiler
+from wrappers import Molecule
+
+'''
+Binary checkpoint of the whole string.
+
+Everything needed to continue an opt_iters cycle is stored in one npz file: the node
+coordinates, the energies and Cartesian gradients of every surface of the node PES,
+the DLC bases and Hessians, the optimizer state and the climb/find flags of the string.
+The gradient accounting of the run so far (_accounting.py) is stored along as json.
+The file is written to a temporary name and then moved over the old checkpoint so that a
+job killed while writing never leaves a truncated file behind.
+
+On restart the energies and gradients are put into the PES caches, so resuming does
+not repeat any electronic structure calculation.
+'''
+
+# string attributes that are restored as is
+STRING_ATTRS = [
+        'nnodes', 'nn', 'nR', 'nP', 'n0', 'emax', 'climb', 'find', 'climber', 'finder',
+        'done_growing', 'end_early', 'tscontinue', 'ts_exsteps', 'nclimb', 'nhessreset',
+        'hessrcount', 'hess_consistently_neg', 'newclimbscale', 'emaxp', 'dE_iter',
+        ]
+
+# optimizer options that opt_iters and restart_string change per node
+OPTIMIZER_OPTIONS = ['DMAX', 'SCALEQN']
+
+# optimizer arrays (lbfgs) besides the iteration history
+OPTIMIZER_ARRAYS = ['xyzp', 'gp_prim', 'cstep_prim']
+
+
+def _surfaces(PES):
+    ''' the plain PES objects whose energies and gradients are computed by a lot '''
+    if hasattr(PES, 'PES1'):
+        return _surfaces(PES.PES1) + _surfaces(PES.PES2)
+    return [PES]
+
+
+class Checkpoint:
+
+    def checkpoint_file(self):
+        return os.path.join('scratch', 'checkpoint_{:03d}.npz'.format(self.ID))
+
+    @profiler.timed('io.write_checkpoint')
+    def write_checkpoint(self, oi=0, filename=None):
+        if filename is None:
+            filename = self.checkpoint_file()
+
+        data = {'oi': oi, 'present': np.array([node is not None for node in self.nodes])}
+        data['active'] = np.array(self.active, dtype=bool)
+        for key in STRING_ATTRS:
+            data[key] = getattr(self, key)
+        data['tgrads'] = self.gradient_count()
+        data['accounting'] = json.dumps({
+            'total': self.gradient_accounting(),
+            'by_phase': {str(k): v for k, v in self.gradient_accounting('phase').items()},
+            'by_node': {str(k): v for k, v in self.gradient_accounting('node').items()},
+            })
+        if self.TS_cartesian_hessian is not None:
+            data['TS_cartesian_hessian_node'] = self.TS_cartesian_hessian[0]
+            data['TS_cartesian_hessian'] = self.TS_cartesian_hessian[1]
+
+        for n, node in enumerate(self.nodes):
+            if node is None:
+                continue
+            prefix = 'node{}_'.format(n)
+            data[prefix+'xyz'] = node.xyz
+            for i, surface in enumerate(_surfaces(node.PES)):
+                data[prefix+'E{}'.format(i)] = surface.get_energy(node.xyz)
+                data[prefix+'grad{}'.format(i)] = surface.get_gradient(node.xyz)
+            data[prefix+'gradrms'] = node.gradrms
+            data[prefix+'bdist'] = node.bdist
+            data[prefix+'newHess'] = node.newHess
+            if node.Hessian is not None:
+                data[prefix+'Hessian'] = node.Hessian
+            if node.Primitive_Hessian is not None:
+                data[prefix+'Primitive_Hessian'] = node.Primitive_Hessian
+            if isinstance(node.coord_basis, block_matrix):
+                data[prefix+'nblocks'] = node.coord_basis.num_blocks
+                for b, block in enumerate(node.coord_basis.matlist):
+                    data[prefix+'Vecs{}'.format(b)] = block
+                data[prefix+'cnorms'] = node.coord_basis.cnorms
+
+            data.update(self.optimizer_state(n))
+
+        tmpfile = filename + '.tmp.npz'
+        np.savez(tmpfile, **data)
+        os.replace(tmpfile, filename)
+
+    def optimizer_state(self, n):
+        optimizer = self.optimizer[n]
+        prefix = 'opt{}_'.format(n)
+        data = {}
+        for key, value in vars(optimizer).items():
+            if isinstance(value, (bool, int, float, np.number)):
+                data[prefix+'attr_'+key] = value
+        for key in OPTIMIZER_OPTIONS:
+            data[prefix+'option_'+key] = optimizer.options[key]
+        for key in OPTIMIZER_ARRAYS:
+            if getattr(optimizer, key, None) is not None:
+                data[prefix+key] = getattr(optimizer, key)
+        if getattr(optimizer, 'lm', None):
+            data[prefix+'lm_alpha'] = np.array([it.alpha for it in optimizer.lm])
+            data[prefix+'lm_s_prim'] = np.array([it.s_prim for it in optimizer.lm])
+            data[prefix+'lm_y_prim'] = np.array([it.y_prim for it in optimizer.lm])
+        return data
+
+    def restore_optimizer_state(self, n, data):
+        optimizer = self.optimizer[n]
+        prefix = 'opt{}_'.format(n)
+        for key in data.files:
+            if not key.startswith(prefix):
+                continue
+            name = key[len(prefix):]
+            if name.startswith('attr_'):
+                setattr(optimizer, name[5:], data[key].item())
+            elif name.startswith('option_'):
+                optimizer.options[name[7:]] = data[key].item()
+            elif name in OPTIMIZER_ARRAYS:
+                setattr(optimizer, name, data[key])
+        if prefix+'lm_alpha' in data.files:
+            from optimizers.lbfgs import iterationData
+            optimizer.lm = [iterationData(alpha, s, y) for alpha, s, y in zip(
+                data[prefix+'lm_alpha'], data[prefix+'lm_s_prim'], data[prefix+'lm_y_prim'])]
+
+    def restart_from_checkpoint(self, filename, rtype=2):
+        ''' Resume the string from a checkpoint written by write_checkpoint, no QM is recomputed '''
+        nifty.printcool("Restarting string from checkpoint {}".format(filename))
+        data = np.load(filename)
+
+        nnodes = int(data['nnodes'])
+        if nnodes != self.nnodes:
+            print(" checkpoint has {} nodes, string was set up with {}".format(nnodes, self.nnodes))
+            product = self.nodes[-1]
+            self.nodes = self.nodes[:nnodes] + [None]*(nnodes-len(self.nodes))
+            self.nodes[-1] = product
+            self.optimizer = self.optimizer[:nnodes] + [
+                self.optimizer[0].__class__(self.optimizer[0].options.copy()) for n in range(nnodes-len(self.optimizer))]
+            self.ictan = [None]*nnodes
+            self.active = [False]*nnodes
+
+        for key in STRING_ATTRS:
+            if key in data.files:
+                setattr(self, key, data[key].item())
+        self.active = [bool(a) for a in data['active']]
+        if 'TS_cartesian_hessian' in data.files:
+            self.TS_cartesian_hessian = (int(data['TS_cartesian_hessian_node']), data['TS_cartesian_hessian'])
+
+        present = data['present']
+        previous = self.nodes[0]
+        for n in range(nnodes):
+            if not present[n]:
+                self.nodes[n] = None
+                continue
+            prefix = 'node{}_'.format(n)
+            xyz = data[prefix+'xyz']
+            if self.nodes[n] is None or 0 < n < nnodes-1:
+                self.nodes[n] = Molecule.copy_from_options(previous, xyz, new_node_id=n, copy_wavefunction=False)
+            node = self.nodes[n]
+            node.xyz = xyz.copy()
+
+            if prefix+'nblocks' in data.files:
+                blocks = [data[prefix+'Vecs{}'.format(b)] for b in range(int(data[prefix+'nblocks']))]
+                node.coord_basis = block_matrix(blocks, data[prefix+'cnorms'])
+                node.coord_obj.clearCache()
+            if prefix+'Primitive_Hessian' in data.files:
+                node.Primitive_Hessian = data[prefix+'Primitive_Hessian']
+            if prefix+'Hessian' in data.files:
+                node.Hessian = data[prefix+'Hessian']
+            node.newHess = int(data[prefix+'newHess'])
+            node.gradrms = data[prefix+'gradrms'].item()
+            if prefix+'bdist' in data.files:
+                node.bdist = data[prefix+'bdist'].item()
+
+            for i, surface in enumerate(_surfaces(node.PES)):
+                surface.cache_batch_result(xyz, data[prefix+'E{}'.format(i)].item(), data[prefix+'grad{}'.format(i)])
+
+            self.restore_optimizer_state(n, data)
+            previous = node
+
+        self.nodes[0].V0 = self.nodes[0].energy
+        self.isRestarted = True
+        if self.done_growing:
+            # the opt iterations continue after the one of the checkpoint
+            self.first_opt_iter = int(data['oi'])+1
+        if self.__class__.__name__ != "SE_Cross":
+            self.set_finder(rtype)
+
+        print(" checkpoint written at {} iter {}".format('opt' if self.done_growing else 'growth', int(data['oi'])))
+        if 'tgrads' in data.files:
+            print(" {} gradients were computed before the checkpoint".format(int(data['tgrads'])))
+        print(" V_profile: ", end=' ')
+        energies = self.energies
+        for n in range(self.nnodes):
+            print(" {:7.3f}".format(float(energies[n])), end=' ')
+        print()
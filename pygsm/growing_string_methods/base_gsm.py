@@ -19,10 +19,17 @@ from coordinate_systems import DelocalizedInternalCoordinates
 from coordinate_systems import rotate
 from ._print_opt import Print
 from ._analyze_string import Analyze
+from ._checkpoint import Checkpoint,_surfaces
+from ._accounting import Accounting
 from optimizers import beales_cg,eigenvector_follow
 from optimizers._linesearch import double_golden_section
 from coordinate_systems import Distance,Angle,Dihedral,OutOfPlane,TranslationX,TranslationY,TranslationZ,RotationA,RotationB,RotationC
 from coordinate_systems.rotate import get_quat,calc_fac_dfac
+from potential_energy_surfaces import PES
+from level_of_theories.base_lot import Lot
+from level_of_theories.gradient_dispatcher import GradientTask
+
+log = logs.get_logger('gsm')
 #from .eckart_align import Eckart_align
 
 # TODO interpolate is still sloppy. It shouldn't create a new molecule node itself 
@@ -39,7 +46,7 @@ def worker(arg):
 
 
 
-class Base_Method(Print,Analyze,object):
+class Base_Method(Print,Analyze,Checkpoint,Accounting,object):
 
     @staticmethod
     def default_options():
@@ -180,6 +187,56 @@ class Base_Method(Print,Analyze,object):
                 doc='A number for identification'
                 )
 
+        opt.add_option(
+                key='TS_hessian',
+                value='RP',
+                required=False,
+                allowed_values=['RP','exact','davidson'],
+                doc='How to form the TS node Hessian. RP modifies the guess Hessian along the reaction path \
+                        using the energies of the neighboring nodes (get_eigenv_finite). exact computes the \
+                        Cartesian Hessian once (analytic if the lot has one, otherwise finite difference) \
+                        and transforms it into the current DLC basis (get_eigenv_exact). davidson finds the \
+                        lowest mode with finite difference Hessian vector products starting from the tangent \
+                        and puts its curvature into the guess Hessian (get_eigenv_davidson).'
+                )
+
+        opt.add_option(
+                key='gradient_dispatcher',
+                value=None,
+                required=False,
+                doc='A level_of_theories.gradient_dispatcher.GradientDispatcher. If given, the energies and gradients \
+                        of all nodes that are evaluated together (evaluate_nodes) are scattered over its queue \
+                        (local processes or Work Queue workers) and gathered into the node PES caches.'
+                )
+
+        opt.add_option(
+                key='profile_report',
+                value=None,
+                required=False,
+                allowed_types=[str],
+                doc='Prefix of the profile files. At the end of go_gsm the timers and counters of the run \
+                        (utilities.profiler) are printed and, if this is given, written per node and iteration \
+                        to {prefix}.json and {prefix}.csv.'
+                )
+
+        opt.add_option(
+                key='max_gradients',
+                value=None,
+                required=False,
+                allowed_types=[int],
+                doc='QM budget of the run: stop go_gsm, with a checkpoint to restart from, after the iteration \
+                        past which one more would need more than this many electronic structure calculations'
+                )
+
+        opt.add_option(
+                key='max_wall_time',
+                value=None,
+                required=False,
+                allowed_types=[int,float],
+                doc='Wall time budget of the run in seconds, counted from the construction of the string, \
+                        like max_gradients'
+                )
+
         Base_Method._default_options = opt
         return Base_Method._default_options.copy()
 
@@ -211,17 +268,23 @@ class Base_Method(Print,Analyze,object):
         self.BDIST_RATIO=self.options['BDIST_RATIO']
         self.ID = self.options['ID']
         self.use_multiprocessing = self.options['use_multiprocessing']
+        self.TS_hessian = self.options['TS_hessian']
+        self.gradient_dispatcher = self.options['gradient_dispatcher']
         self.optimizer=[]
         optimizer = options['optimizer']
         for count in range(self.nnodes):
             self.optimizer.append(optimizer.__class__(optimizer.options.copy()))
         self.print_level = options['print_level']
+        self.start_budget()
 
         # Set initial values
         self.nn = 2
         self.nR = 1
         self.nP = 1        
         self.emax = 0.0
+        self.emaxp = 0.0
+        self.dE_iter = 1000.
+        self.first_opt_iter = 0  # index of the first opt iteration, past the checkpoint on restart
 
         # TSnode is now a property
         self.climb = False 
@@ -244,6 +307,7 @@ class Base_Method(Print,Analyze,object):
         self.hessrcount=0   # are these used?!  TODO
         self.hess_consistently_neg = 0
         self.newclimbscale=2.
+        self.TS_cartesian_hessian = None  # (node index, Cartesian Hessian) for TS_hessian=exact
 
         # create newic object
         self.newic  = Molecule.copy_from_options(self.nodes[0])
@@ -293,10 +357,12 @@ class Base_Method(Print,Analyze,object):
     def opt_iters(self,max_iter=30,nconstraints=1,optsteps=1,rtype=2):
         nifty.printcool("In opt_iters")
 
-        self.nclimb=0
-        self.nhessreset=10  # are these used??? TODO 
-        self.hessrcount=0   # are these used?!  TODO
-        self.newclimbscale=2.
+        # a string restarted from a checkpoint continues with its counters
+        if not self.isRestarted:
+            self.nclimb=0
+            self.nhessreset=10  # are these used??? TODO 
+            self.hessrcount=0   # are these used?!  TODO
+            self.newclimbscale=2.
 
         self.set_finder(rtype)
         #self.store_energies()
@@ -314,14 +380,15 @@ class Base_Method(Print,Analyze,object):
                 self.optimizer[i].conv_Ediff = self.options['CONV_Ediff']*factor
 
         # enter loop
-        for oi in range(max_iter):
+        last_iter = self.first_opt_iter+max_iter-1
+        for oi in range(self.first_opt_iter,last_iter+1):
+            profiler.get_profiler().set_labels(phase='opt',iteration=oi)
+            self.start_budget_iteration()
 
             nifty.printcool("Starting opt iter %i" % oi)
             if self.climb and not self.find: print(" CLIMBING")
             elif self.find: print(" TS SEARCHING")
 
-            sys.stdout.flush()
-
             # stash previous TSnode  
             self.pTSnode = self.TSnode
             self.emaxp = self.emax
@@ -334,11 +401,8 @@ class Base_Method(Print,Analyze,object):
             #self.store_energies()
 
             print()
-            print(" V_profile: ", end=' ')
             energies = self.energies
-            for n in range(self.nnodes):
-                print(" {:7.3f}".format(float(energies[n])), end=' ')
-            print()
+            log.info(" V_profile: %s", logs.Lazy(logs.format_values,energies))
 
             #TODO resetting
             #TODO special SSM criteria if TSNode is second to last node
@@ -387,27 +451,27 @@ class Base_Method(Print,Analyze,object):
             form_TS_hess = self.set_stage(totalgrad,sum_gradrms,ts_cgradq,ts_gradrms,fp)
 
             # => Reparam the String <= #
-            if oi!=max_iter-1:
+            if oi!=last_iter:
                 self.ic_reparam(nconstraints=nconstraints)
 
             # Modify TS Hess if necessary
             if form_TS_hess:
                 self.get_tangents_1e()
-                self.get_eigenv_finite(self.TSnode)
+                self.get_TS_hessian(self.TSnode)
                 if self.optimizer[self.TSnode].options['DMAX']>0.1:
                     self.optimizer[self.TSnode].options['DMAX']=0.1
 
-            elif self.find and not self.optimizer[n].maxol_good:
+            elif self.find and not self.optimizer[self.TSnode].maxol_good:
                 # reform Hess for TS if not good
                 self.get_tangents_1e()
-                self.get_eigenv_finite(self.TSnode)
+                self.get_TS_hessian(self.TSnode)
 
 
             elif self.find and (self.optimizer[self.TSnode].nneg > 3 or self.optimizer[self.TSnode].nneg==0 or self.hess_consistently_neg > 3) and ts_gradrms >self.options['CONV_TOL']:
                 if self.hessrcount<1 and self.pTSnode == self.TSnode:
                     print(" resetting TS node coords Ut (and Hessian)")
                     self.get_tangents_1e()
-                    self.get_eigenv_finite(self.TSnode)
+                    self.get_TS_hessian(self.TSnode)
                     self.nhessreset=10
                     self.hessrcount=1
                 else:
@@ -419,7 +483,7 @@ class Base_Method(Print,Analyze,object):
             elif self.find and self.optimizer[self.TSnode].nneg > 1 and ts_gradrms < self.options['CONV_TOL']:
                  print(" nneg > 1 and close to converging -- reforming Hessian")                
                  self.get_tangents_1e()                                                         
-                 self.get_eigenv_finite(self.TSnode)                    
+                 self.get_TS_hessian(self.TSnode)
             elif self.find and self.optimizer[self.TSnode].nneg <= 3:
                 self.hessrcount-=1
 
@@ -432,10 +496,7 @@ class Base_Method(Print,Analyze,object):
             #self.store_energies()
             energies = self.energies
             self.emax= energies[self.TSnode]
-            print(" V_profile (after reparam): ", end=' ')
-            for n in range(self.nnodes):
-                print(" {:7.3f}".format(float(energies[n])), end=' ')
-            print()
+            log.info(" V_profile (after reparam): %s", logs.Lazy(logs.format_values,energies))
 
             if self.pTSnode!=self.TSnode and self.climb:
                 #self.optimizer[self.TSnode] = beales_cg(self.optimizer[self.TSnode].options.copy())
@@ -462,9 +523,13 @@ class Base_Method(Print,Analyze,object):
 
             # => write Convergence to file <= #
             self.write_xyz_files(base='opt_iters',iters=oi,nconstraints=nconstraints)
+            self.write_checkpoint(oi)
 
-            #TODO prints tgrads and jobGradCount
-            print("opt_iter: {:2} totalgrad: {:4.3} gradrms: {:5.4} max E({}) {:5.4}".format(oi,float(totalgrad),float(gradrms),self.TSnode,float(self.emax)))
+            tgrads = self.gradient_count()
+            log.info("opt_iter: %2d totalgrad: %4.3g gradrms: %5.4g max E(%d) %5.4g tgrads: %d iter grads: %d", oi, totalgrad, gradrms, self.TSnode, self.emax, tgrads, tgrads-self.iteration_start[0])
+            logs.event('opt_iter', totalgrad=float(totalgrad), gradrms=float(gradrms), TSnode=self.TSnode, emax=float(self.emax), energies=energies, tgrads=tgrads)
+            if self.budget_exhausted():
+                break
             print('\n')
 
         ## Optimize TS node to a finer convergence
@@ -495,8 +560,14 @@ class Base_Method(Print,Analyze,object):
         #            break
 
 
-        print(" Printing string to opt_converged_000.xyz")
-        self.write_xyz_files(base='opt_converged',iters=0,nconstraints=nconstraints)
+        profiler.get_profiler().set_labels(phase=None,iteration=None)
+        if self.budget_stop is not None:
+            self.print_budget_stop()
+        else:
+            print(" Printing string to opt_converged_000.xyz")
+            self.write_xyz_files(base='opt_converged',iters=0,nconstraints=nconstraints)
+        with profiler.get_profiler().timer('io.flush'):
+            trajectory.get_trajectory_writer().flush()
         sys.stdout.flush()
         return
 
@@ -542,18 +613,14 @@ class Base_Method(Print,Analyze,object):
         self.dqmaga = dqmaga
         self.ictan = ictan
 
-        if self.print_level>1:
-            print('------------printing ictan[:]-------------')
+        if log.isEnabledFor(logs.DEBUG):
+            log.debug('------------printing ictan[:]-------------')
             for n in range(n0+1,self.nnodes):
-                print("ictan[%i]" %n)
-                print(ictan[n].T)
+                log.debug("ictan[%i]", n)
+                log.debug("%s", ictan[n].T)
         if self.print_level>0:
-            print('------------printing dqmaga---------------')
-            for n in range(n0+1,self.nnodes):
-                print(" {:5.4}".format(dqmaga[n]),end='')
-                if (n)%5==0:
-                    print()
-            print()
+            log.info('------------printing dqmaga---------------')
+            log.info("%s", logs.Lazy(logs.format_values,dqmaga[n0+1:]," {:5.4}"))
 
 
     # for some reason this fxn doesn't work when called outside gsm
@@ -643,15 +710,13 @@ class Base_Method(Print,Analyze,object):
                 raise RuntimeError
         
 
-        if self.print_level>1:
-            print('------------printing ictan[:]-------------')
+        if log.isEnabledFor(logs.DEBUG):
+            log.debug('------------printing ictan[:]-------------')
             for n in range(n0+1,self.nnodes):
-                print(self.ictan[n].T)
+                log.debug("%s", self.ictan[n].T)
         if self.print_level>0:
-            print('------------printing dqmaga---------------')
-            for n in range(n0+1,self.nnodes):
-                print(" {:5.4}".format(dqmaga[n]),end='')
-            print()
+            log.info('------------printing dqmaga---------------')
+            log.info("%s", logs.Lazy(logs.format_values,dqmaga[n0+1:]," {:5.4}"))
         self.dqmaga = dqmaga
 
     def get_tangents_1g(self):
@@ -663,23 +728,20 @@ class Base_Method(Print,Analyze,object):
         dqmaga = [0.]*self.nnodes
         ncurrent,nlist = self.make_nlist()
 
-        if self.print_level>1:
-            print("ncurrent, nlist")
-            print(ncurrent)
-            print(nlist)
+        log.debug("ncurrent, nlist")
+        log.debug("%s", ncurrent)
+        log.debug("%s", nlist)
 
         for n in range(ncurrent):
-            print(" ictan[{}]".format(nlist[2*n]))
+            log.info(" ictan[%s]", nlist[2*n])
             ictan0,_ = Base_Method.tangent(
                     node1=self.nodes[nlist[2*n]],
                     node2=self.nodes[nlist[2*n+1]],
                     driving_coords=self.driving_coords,
                     )
 
-            if self.print_level>1:
-                print("forming space for", nlist[2*n+1])
-            if self.print_level>1:
-                print("forming tangent for ",nlist[2*n])
+            log.debug("forming space for %s", nlist[2*n+1])
+            log.debug("forming tangent for  %s", nlist[2*n])
 
             if (ictan0[:]==0.).all():
                 print(" ICTAN IS ZERO!")
@@ -706,12 +768,8 @@ class Base_Method(Print,Analyze,object):
         self.dqmaga = dqmaga
 
         if self.print_level>0:
-            print('------------printing dqmaga---------------')
-            for n in range(self.nnodes):
-                print(" {:5.3}".format(dqmaga[n]), end=' ')
-                if (n+1)%5==0:
-                    print()
-            print() 
+            log.info('------------printing dqmaga---------------')
+            log.info("%s", logs.Lazy(logs.format_values,dqmaga," {:5.3} "))
        
         if False:
             for n in range(ncurrent):
@@ -730,8 +788,9 @@ class Base_Method(Print,Analyze,object):
         self.set_active(self.nR-1, self.nnodes-self.nP)
 
         for n in range(iters):
+            profiler.get_profiler().set_labels(phase='growth',iteration=n)
+            self.start_budget_iteration()
             nifty.printcool("Starting growth iter %i" % n)
-            sys.stdout.flush()
             self.opt_steps(maxopt)
             totalgrad,gradrms,sum_gradrms = self.calc_grad()
             self.emax = self.energies[self.TSnode]
@@ -772,7 +831,13 @@ class Base_Method(Print,Analyze,object):
             self.set_active(self.nR-1, self.nnodes-self.nP)
             self.ic_reparam_g()
             self.get_tangents_1g()
-            print(" gopt_iter: {:2} totalgrad: {:4.3} gradrms: {:5.4} max E: {:5.4}\n".format(n,float(totalgrad),float(gradrms),float(self.emax)))
+            log.info(" gopt_iter: %2d totalgrad: %4.3g gradrms: %5.4g max E: %5.4g tgrads: %d\n", n, totalgrad, gradrms, self.emax, self.gradient_count())
+            logs.event('growth_iter', totalgrad=float(totalgrad), gradrms=float(gradrms), emax=float(self.emax), nR=self.nR, nP=self.nP, tgrads=self.gradient_count())
+            if self.budget_exhausted():
+                self.write_checkpoint(n)
+                break
+
+        profiler.get_profiler().set_labels(phase=None,iteration=None)
 
         # create newic object
         print(" creating newic molecule--used for ic_reparam")
@@ -798,8 +863,57 @@ class Base_Method(Print,Analyze,object):
 
         return new_xyz 
 
+    @profiler.timed('evaluate_nodes')
+    def evaluate_nodes(self,nodes):
+        '''
+        Compute the energies and gradients of several nodes at once before they are used one by one.
+        Lots that evaluate many geometries natively get them in one run_batch call and the results
+        are cached on the node PES objects, file based lots with more than one worker are submitted
+        together to the worker pool. With a gradient dispatcher every node is a task on its queue.
+        Otherwise nothing is done and the nodes are evaluated as needed. Nodes whose geometry the
+        batch cache or the lot already holds are skipped.
+        '''
+        nodes = [ n for n in nodes if self.nodes[n] is not None and not all(surface.holds(self.nodes[n].xyz) for surface in _surfaces(self.nodes[n].PES)) ]
+        if len(nodes)<2:
+            return
+        lot = self.nodes[nodes[0]].PES.lot
+        if self.gradient_dispatcher is not None:
+            tasks = [ GradientTask(key=(self.ID,n),surfaces=_surfaces(self.nodes[n].PES),xyz=self.nodes[n].xyz) for n in nodes ]
+            with profiler.get_profiler().shared_timer('lot.dispatch',nodes):
+                results = self.gradient_dispatcher.map(tasks)
+            for n in nodes:
+                with profiler.get_profiler().scope(node=n):
+                    profiler.get_profiler().count('gradients')
+            for task in tasks:
+                for surface,(E,grad) in zip(task.surfaces,results[task.key]):
+                    surface.cache_batch_result(task.xyz,E,grad)
+        elif type(lot).run_batch is not Lot.run_batch:
+            pes_nodes = [ n for n in nodes if type(self.nodes[n].PES) is PES ]
+            if len(pes_nodes)<2:
+                return
+            xyz_stack = np.array([ self.nodes[n].xyz for n in pes_nodes ])
+            # always batch on the lot of the reactant node, which keeps the per node state of run_batch
+            batch_PES = self.nodes[0].PES if type(self.nodes[0].PES) is PES else self.nodes[pes_nodes[0]].PES
+            energies,gradients = batch_PES.get_energies_gradients(xyz_stack,nodes=pes_nodes)
+            for n,xyz,E,grad in zip(pes_nodes,xyz_stack,energies,gradients):
+                self.nodes[n].PES.cache_batch_result(xyz,E,grad)
+        elif hasattr(lot,'write_job') and lot.options['nworkers']>1:
+            lots = [ self.nodes[n].PES.lot for n in nodes ]
+            with profiler.get_profiler().shared_timer('lot.dispatch',nodes):
+                for n,node_lot in zip(nodes,lots):
+                    node_lot.submit(self.nodes[n].geometry)
+                for node_lot in lots:
+                    node_lot.collect()
+            for n in nodes:
+                with profiler.get_profiler().scope(node=n):
+                    profiler.get_profiler().count('gradients')
+
     def opt_steps(self,opt_steps):
 
+        # the first step of every node needs its gradient
+        if not self.use_multiprocessing:
+            self.evaluate_nodes([ n for n in range(self.nnodes) if self.nodes[n] and self.active[n] ])
+
         refE=self.nodes[0].energy
 
         if self.use_multiprocessing:
@@ -841,26 +955,28 @@ class Base_Method(Print,Analyze,object):
                     nifty.printcool("Optimizing node {}".format(n))
                     opt_type = self.set_opt_type(n)
                     osteps = self.mult_steps(n,opt_steps)
-                    self.optimizer[n].optimize(
-                            molecule=self.nodes[n],
-                            refE=refE,
-                            opt_type=opt_type,
-                            opt_steps=osteps,
-                            ictan=self.ictan[n],
-                            xyzframerate=1,
-                            )
+                    with profiler.get_profiler().scope(node=n), profiler.get_profiler().timer('optimize'):
+                        self.optimizer[n].optimize(
+                                molecule=self.nodes[n],
+                                refE=refE,
+                                opt_type=opt_type,
+                                opt_steps=osteps,
+                                ictan=self.ictan[n],
+                                xyzframerate=1,
+                                )
 
         if self.product_geom_fixed==False and self.done_growing:
             fp = self.find_peaks(2)
             #BUG 1/24/2020
             if self.energies[self.nnodes-1]>self.energies[self.nnodes-2] and fp>0 and self.nodes[self.nnodes-1].gradrms>self.options['CONV_TOL']:
-                self.optimizer[self.nnodes-1].optimize(
-                        molecule=self.nodes[self.nnodes-1],
-                        refE=refE,
-                        opt_type='UNCONSTRAINED',
-                        opt_steps=osteps,
-                        ictan=None,
-                        )
+                with profiler.get_profiler().scope(node=self.nnodes-1), profiler.get_profiler().timer('optimize'):
+                    self.optimizer[self.nnodes-1].optimize(
+                            molecule=self.nodes[self.nnodes-1],
+                            refE=refE,
+                            opt_type='UNCONSTRAINED',
+                            opt_steps=osteps,
+                            ictan=None,
+                            )
 
 
     def set_stage(self,totalgrad,sumgradrms, ts_cgradq,ts_gradrms,fp):
@@ -1337,6 +1453,7 @@ class Base_Method(Print,Analyze,object):
             return new_node
 
 
+    @profiler.timed('ic_reparam')
     def ic_reparam(self,ic_reparam_steps=8,n0=0,nconstraints=1,rtype=0):
         nifty.printcool("reparametrizing string nodes")
         ictalloc = self.nnodes+1
@@ -1365,9 +1482,9 @@ class Base_Method(Print,Analyze,object):
         for i in range(ic_reparam_steps):
             self.get_tangents_1(n0=n0)
 
-            # copies of original ictan
-            ictan0 = np.copy(self.ictan)
-            ictan = np.copy(self.ictan)
+            # copies of original ictan, a list since the end nodes have no tangent
+            ictan0 = [np.copy(t) for t in self.ictan]
+            ictan = [np.copy(t) for t in self.ictan]
 
             if self.print_level>0:
                 print(" printing spacings dqmaga:")
@@ -1507,6 +1624,7 @@ class Base_Method(Print,Analyze,object):
         print()
         print("  disprms: {:1.3}\n".format(disprms))
 
+    @profiler.timed('ic_reparam_g')
     def ic_reparam_g(self,ic_reparam_steps=4,n0=0,reparam_interior=True):  #see line 3863 of gstring.cpp
         """
         
@@ -1623,6 +1741,68 @@ class Base_Method(Print,Analyze,object):
         #Failed = check_array(self.nnodes,self.dqmaga)
         #If failed, do exit 1
 
+    def get_TS_hessian(self,en):
+        ''' Forms the TS node Hessian according to the TS_hessian option'''
+        if self.TS_hessian=='exact':
+            self.get_eigenv_exact(en)
+        elif self.TS_hessian=='davidson':
+            self.get_eigenv_davidson(en)
+        else:
+            self.get_eigenv_finite(en)
+
+    def get_eigenv_exact(self,en):
+        ''' Forms the Hessian of node en from a Cartesian Hessian transformed into the current DLC basis.
+        The Cartesian Hessian is only computed when the TS node changes, otherwise the stored one
+        is re-transformed at the current geometry.
+        '''
+        if self.TS_cartesian_hessian is None or self.TS_cartesian_hessian[0]!=en:
+            print(" computing Cartesian Hessian of node %i" % en)
+            self.TS_cartesian_hessian = (en,self.nodes[en].PES.get_hessian(self.nodes[en].xyz))
+        else:
+            print(" transforming stored Cartesian Hessian of node %i" % en)
+
+        # Update TS node coord basis
+        self.nodes[en].update_coordinate_basis(constraints=None)
+        self.nodes[en].form_Hessian_from_cartesian(self.TS_cartesian_hessian[1])
+
+        if log.isEnabledFor(logs.DEBUG):
+            eigen,tmph = np.linalg.eigh(self.nodes[en].Hessian)
+            log.debug(" eigenvalues of new Hess")
+            log.debug("%s", eigen)
+
+    def get_eigenv_davidson(self,en):
+        ''' Modifies the guess Hessian of node en with the lowest Hessian mode from a Davidson
+        search on finite difference Hessian vector products, started from the reaction path tangent.
+        '''
+        print(" modifying %i Hessian with Davidson lowest mode" % en)
+        node = self.nodes[en]
+
+        # Update TS node coord basis
+        Vecs = node.update_coordinate_basis(constraints=None)
+        node.form_Hessian_in_basis()
+
+        # tangent in the DLC basis and in Cartesians
+        xyz = node.xyz
+        tan = block_matrix.dot(block_matrix.transpose(Vecs),self.ictan[en])
+        tan = tan/np.linalg.norm(tan)
+        Bmat = block_matrix.full_matrix(node.coord_obj.wilsonB(xyz))
+        Ginv = block_matrix.full_matrix(node.coord_obj.GInverse(xyz))
+        guess = np.linalg.multi_dot([Bmat.T,Ginv,tan])
+
+        eigenvalue,mode = node.PES.get_lowest_eigenmode(xyz,guess)
+
+        # lowest mode in the DLC basis 
+        t = np.dot(Bmat,mode)
+        tnorm = np.linalg.norm(t)
+        t = t/tnorm
+        c = eigenvalue/tnorm**2
+        Ht = np.dot(node.Hessian,t)
+        tHt = np.dot(t.T,Ht)
+        print(" tHt %1.3f c: %1.3f overlap with tangent %1.2f" % (tHt,c,abs(np.dot(t.T,tan))))
+
+        node.Hessian += (c-tHt)*np.outer(t,t)
+        node.newHess = 5
+
     def get_eigenv_finite(self,en):
         ''' Modifies Hessian using RP direction'''
         print("modifying %i Hessian with RP" % en)
@@ -1707,6 +1887,18 @@ class Base_Method(Print,Analyze,object):
     def set_V0(self):
         raise NotImplementedError 
 
+    def write_profile(self):
+        ''' print the timers and counters of the run (utilities.profiler) and write them to the profile_report files '''
+        prof = profiler.get_profiler()
+        nifty.printcool("Profile")
+        prof.print_report()
+        self.print_accounting()
+        if self.options['profile_report'] is not None:
+            prof.write_json(self.options['profile_report']+'.json')
+            prof.write_csv(self.options['profile_report']+'.csv')
+            print(" Wrote the profile to {0}.json and {0}.csv".format(self.options['profile_report']))
+        sys.stdout.flush()
+
     def mult_steps(self,n,opt_steps):
         exsteps=1
         tsnode = int(self.TSnode)
@@ -1762,6 +1954,8 @@ class Base_Method(Print,Analyze,object):
         print("*********************************************************************")
    
     def restart_string(self,xyzfile='restart.xyz',rtype=2,reparametrize=False,restart_energies=True):
+        if xyzfile.endswith('.npz'):
+            return self.restart_from_checkpoint(xyzfile,rtype)
         nifty.printcool("Restarting string from file")
         self.growth_direction=0
         with open(xyzfile) as f:
@@ -1836,6 +2030,7 @@ class Base_Method(Print,Analyze,object):
             self.write_xyz_files(iters=1,base='grown_string1',nconstraints=1)
 
         if restart_energies:
+            self.evaluate_nodes(list(range(nstructs-1)))
             # initial energy
             self.nodes[0].V0 = self.nodes[0].energy 
             self.energies[0] = 0.
@@ -1846,11 +2041,8 @@ class Base_Method(Print,Analyze,object):
                 self.energies[struct] = self.nodes[struct].energy - self.nodes[0].V0
                 print(" Relative energy of node %i is %5.4f" % (struct,self.energies[struct]))
 
-            print(" V_profile: ", end=' ')
             energies= self.energies
-            for n in range(self.nnodes):
-                print(" {:7.3f}".format(float(energies[n])), end=' ')
-            print()
+            log.info(" V_profile: %s", logs.Lazy(logs.format_values,energies))
 
             #print(" grms_profile: ", end=' ')
             #for n in range(self.nnodes):
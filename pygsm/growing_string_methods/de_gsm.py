@@ -53,14 +53,20 @@ class DE_GSM(Base_Method):
         """
         self.set_V0()
 
-        if not self.isRestarted:
-            if self.growth_direction==0:
-                self.add_GSM_nodes(2)
-            elif self.growth_direction==1:
-                self.add_GSM_nodeR(1)
-            elif self.growth_direction==2:
-                self.add_GSM_nodeP(1)
+        # a checkpoint written during growth continues growing
+        if not self.isRestarted or not self.done_growing:
+            if not self.isRestarted:
+                if self.growth_direction==0:
+                    self.add_GSM_nodes(2)
+                elif self.growth_direction==1:
+                    self.add_GSM_nodeR(1)
+                elif self.growth_direction==2:
+                    self.add_GSM_nodeP(1)
             oi = self.growth_iters(iters=max_iters,maxopt=opt_steps) 
+            if self.budget_stop is not None:
+                self.print_budget_stop()
+                self.write_profile()
+                return self.nnodes,self.energies
             nifty.printcool("Done Growing the String!!!")
             self.done_growing = True
             #nifty.printcool("initial ic_reparam")
@@ -78,6 +84,7 @@ class DE_GSM(Base_Method):
                 self.opt_iters(max_iter=opt_iters,optsteps=opt_steps,rtype=rtype)
         else:
             print("Exiting early")
+        self.write_profile()
         print("Finished GSM!") 
 
         return self.nnodes,self.energies
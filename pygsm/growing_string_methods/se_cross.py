@@ -37,11 +37,16 @@ class SE_Cross(SE_GSM):
         _,self.nodes[0].bdist = Base_Method.tangent(self.nodes[0],None,driving_coords=self.driving_coords)
         print(" Initial bdist is %1.3f" %self.nodes[0].bdist)
 
-        # interpolate first node
-        self.add_GSM_nodeR()
+        # interpolate first node, unless continuing from a checkpoint
+        if not self.isRestarted:
+            self.add_GSM_nodeR()
 
         # grow string
         self.growth_iters(iters=max_iters,maxopt=opt_steps,nconstraints=1)
+        if self.budget_stop is not None:
+            self.print_budget_stop()
+            self.write_profile()
+            return
         print(' SE_Cross growth phase over')
         print(' Warning last node still not fully optimized')
 
@@ -97,6 +102,7 @@ class SE_Cross(SE_GSM):
                     opt_steps=200,
                     )
             self.write_xyz_files(iters=1,base="grown_string",nconstraints=1)
+        self.write_profile()
 
     
     def converged(self,n,opt_type):
@@ -104,12 +104,18 @@ class SE_GSM(Base_Method):
         """
         self.set_V0()
 
-        if self.isRestarted==False:
-            self.nodes[0].gradrms = 0.
-            self.nodes[0].V0 = self.nodes[0].energy
-            print(" Initial energy is %1.4f" % self.nodes[0].energy)
-            self.add_GSM_nodeR()
+        # a checkpoint written during growth continues growing
+        if self.isRestarted==False or not self.done_growing:
+            if self.isRestarted==False:
+                self.nodes[0].gradrms = 0.
+                self.nodes[0].V0 = self.nodes[0].energy
+                print(" Initial energy is %1.4f" % self.nodes[0].energy)
+                self.add_GSM_nodeR()
             self.growth_iters(iters=max_iters,maxopt=opt_steps)
+            if self.budget_stop is not None:
+                self.print_budget_stop()
+                self.write_profile()
+                return
             if self.tscontinue:
                 if self.pastts==1: #normal over the hill
                     self.add_GSM_nodeR(1)
@@ -158,6 +164,7 @@ class SE_GSM(Base_Method):
         else:
             print("Exiting early")
 
+        self.write_profile()
         print("Finished GSM!")  
 
 
@@ -5,4 +5,24 @@
 #from orca import Orca
 #from openmm import OpenMM
 #from .pdynamo import pDynamo
-from .nanoreactor_engine import nanoreactor_engine
+import importlib
+
+# Backends are imported when first used (main.py imports the module of -package directly),
+# most of them need a heavy optional package
+_classes = {
+        'nanoreactor_engine': '.nanoreactor_engine',
+        'ModelPotential': '.model_potential',
+        }
+__all__ = list(_classes)
+
+
+def __getattr__(name):
+    if name not in _classes:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_classes[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
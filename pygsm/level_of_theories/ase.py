@@ -6,6 +6,8 @@ Written by Tamas K. Stenczel in 2021
 """
 import importlib
 
+import numpy as np
+
 try:
     from ase import Atoms
     from ase.calculators.calculator import Calculator
@@ -19,6 +21,8 @@ except ModuleNotFoundError:
     print("ASE not installed, ASE-based calculators will not work")
 
 from .base_lot import Lot, LoTError
+from utilities import manage_xyz
+from utilities.units import KCAL_MOL_PER_AU
 
 
 class ASELoT(Lot):
@@ -32,6 +36,9 @@ class ASELoT(Lot):
 
         self.ase_calculator = calculator
 
+        # one Atoms object per node, built on the first run and afterwards only moved
+        self.ase_atoms = None
+
     @classmethod
     def from_options(cls, calculator: Calculator, **kwargs):
         """ Returns an instance of this class with default options updated from values in kwargs"""
@@ -69,13 +76,50 @@ class ASELoT(Lot):
         # construct from the constructor
         return cls.from_options(calc_class(**calculator_kwargs), **kwargs)
 
+    def node_atoms(self, geom):
+        """The Atoms object of this node at geom
+
+        Parameters
+        ----------
+        geom : np.ndarray, shape=(N, 3) or list-of-list geometry
+
+        Returns
+        -------
+        atoms : ase.Atoms
+            the persistent Atoms of the node with the calculator attached
+        """
+        positions = geom if isinstance(geom, np.ndarray) else manage_xyz.xyz_to_np(geom)
+        if self.ase_atoms is None:
+            numbers = [atomic_numbers[a] for a in manage_xyz.get_atoms(self.geom)]
+            self.ase_atoms = geom_to_ase(numbers, positions)
+            self.ase_atoms.calc = self.ase_calculator
+        else:
+            # in place, the calculator notices the change and keeps its state
+            self.ase_atoms.set_positions(positions)
+        return self.ase_atoms
+
     def run(self, geom, mult, ad_idx, runtype='gradient'):
         # run ASE
-        self.run_ase_atoms(xyz_to_ase(geom), mult, ad_idx, runtype)
+        self.run_ase_atoms(self.node_atoms(geom), mult, ad_idx, runtype)
+
+    def run_batch(self, geoms, multiplicity, state, keys=None):
+        """Energies (kcal/mol) and gradients (Hartree/Angstrom) of many geometries
+
+        One Atoms object is attached to the calculator once and only its positions are
+        updated, so the calculator's caches and internal state are kept between configurations.
+        """
+        results = []
+        for geom in geoms:
+            atoms = self.node_atoms(geom)
+            energy = atoms.get_potential_energy() / units.Ha * KCAL_MOL_PER_AU
+            gradient = - atoms.get_forces() / units.Ha
+            results.append((energy, gradient))
+        return results
 
     def run_ase_atoms(self, atoms: Atoms, mult, ad_idx, runtype='gradient'):
-        # set the calculator
-        atoms.set_calculator(self.ase_calculator)
+        # set the calculator, only if needed since it resets the calculator
+        if atoms.calc is not self.ase_calculator:
+            atoms.calc = self.ase_calculator
 
         # perform gradient calculation if needed
         if runtype == "gradient":
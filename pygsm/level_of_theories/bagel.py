@@ -14,9 +14,11 @@ sys.path.append(path.dirname( path.dirname( path.abspath(__file__))))
 try:
     from .base_lot import Lot
     from .file_options import File_Options
+    from .worker_pool import Job
 except:
     from base_lot import Lot
     from file_options import File_Options
+    from worker_pool import Job
 from utilities import *
 
 class BAGEL(Lot):
@@ -25,7 +27,7 @@ class BAGEL(Lot):
         super(BAGEL,self).__init__(options)
 
         print(" making folder scratch/{}".format(self.node_id))
-        os.system('mkdir -p scratch/{}'.format(self.node_id))
+        self.worker_pool.scratch_dir(self.node_id)
 
         # regular options
         self.file_options.set_active('basis','6-31g',str,'')
@@ -90,20 +92,27 @@ class BAGEL(Lot):
         file_options = File_Options.copy(lot.file_options)
         options['file_options'] = file_options
 
+        new_lot = cls(lot.options.copy().set_values(options))
         if node_id != lot.node_id and copy_wavefunction:
-            old_path = 'scratch/{}/orbs.archive'.format(lot.node_id)
-            new_path = 'scratch/{}/orbs.archive'.format(node_id)
-            cmd = 'cp -r ' + old_path +' ' + new_path
-            print(" copying scr files\n {}".format(cmd))
-            os.system(cmd)
-            os.system('wait')
-        return cls(lot.options.copy().set_values(options))
+            lot.register_orbitals()
+            new_lot.load_neighbor_orbitals(prefer=lot.node_id)
+        return new_lot
+
+    def orbital_files(self,node_id):
+        return ['scratch/{}/orbs.archive'.format(node_id)]
+
+    def load_neighbor_orbitals(self,prefer=None):
+        ''' seed the orbitals from a converged neighbor and read them as the reference '''
+        if self.seed_orbitals(prefer) is not None and 'load_ref' not in self.file_options.ActiveOptions:
+            self.file_options.set_active('load_ref','scratch/{}/orbs'.format(self.node_id),str,'')
+            self.load_ref = self.file_options.load_ref
 
     def go(self,geom,runtype='gradient'):
         # first write the file, run it, and the read the output
         # filenames
         inpfilename = 'scratch/{}/bagel.json'.format(self.node_id)
         outfilename = 'scratch/{}/output.dat'.format(self.node_id)
+        self.load_neighbor_orbitals()
         inpfile = open(inpfilename,'w')
 
         # Header
@@ -215,9 +224,7 @@ class BAGEL(Lot):
 
         # Run BAGEL
         ### RUN THE CALCULATION ###
-        cmd = "BAGEL {} > {}".format(inpfilename,outfilename)
-        os.system(cmd)
-        os.system('wait')
+        self.worker_pool.run(Job(key=(self.ID,self.node_id,runtype),cmd=['BAGEL',inpfilename],stdout=outfilename),check=False)
 
 
         # Parse the output for Energies
@@ -282,6 +289,7 @@ class BAGEL(Lot):
         # Turn on guess for calculations after running
         if 'load_ref' not in self.file_options.ActiveOptions:
             self.file_options.set_active('load_ref','scratch/{}/orbs'.format(self.node_id),str,'')
+        self.register_orbitals()
         return
         # Done go
 
@@ -1,5 +1,7 @@
 # standard library imports
 import os
+import shutil
+import threading
 
 # third party 
 import numpy as np
@@ -8,11 +10,17 @@ import numpy as np
 from utilities import manage_xyz,options,elements,nifty
 try:
     from .file_options import File_Options
+    from .worker_pool import get_worker_pool
 except:
     from file_options import File_Options
+    from worker_pool import get_worker_pool
 
 ELEMENT_TABLE = elements.ElementData()
 
+# converged wavefunction files of every node, {ID: {node_id: [paths]}}
+ORBITAL_REGISTRY = {}
+_orbital_lock = threading.Lock()
+
 #TODO take out all job-specific data -- encourage external files since those are most customizable
 #TODO fix tuple searches
 
@@ -173,6 +181,15 @@ class Lot(object):
                      TeraChem Cloud requires a TeraChem client and options dictionary.'
                 )
 
+        opt.add_option(
+                key='nworkers',
+                value=1,
+                required=False,
+                allowed_types=[int],
+                doc='number of calculations the shared worker pool of file based level of theories \
+                        (QChem, Orca, Molpro, BAGEL) runs at the same time'
+                )
+
         opt.add_option(
                 key='file_options',
                 value=None,
@@ -326,6 +343,72 @@ class Lot(object):
     def copy(cls,lot,options,copy_wavefunction=True):
         return cls(lot.options.copy().set_values(options))
 
+    def orbital_files(self,node_id):
+        '''
+        Wavefunction files (or directories) the program reads as a guess and writes on
+        convergence for node_id. Lots that keep orbitals on disk override this,
+        the default has none and the registry below does nothing.
+        '''
+        return []
+
+    @staticmethod
+    def _orbitals_exist(paths):
+        if not paths:
+            return False
+        for p in paths:
+            if os.path.isdir(p):
+                if not os.listdir(p):
+                    return False
+            elif not os.path.isfile(p):
+                return False
+        return True
+
+    def register_orbitals(self):
+        ''' record the converged wavefunction of this node so other nodes can use it as a guess '''
+        paths = self.orbital_files(self.node_id)
+        if self._orbitals_exist(paths):
+            with _orbital_lock:
+                ORBITAL_REGISTRY.setdefault(self.ID,{})[self.node_id] = paths
+
+    def nearest_orbitals(self,prefer=None):
+        '''
+        node_id of the converged wavefunction to start from, prefer if it has one
+        (e.g. the node this lot was copied from) otherwise the nearest converged neighbor
+        '''
+        with _orbital_lock:
+            converged = [ n for n in ORBITAL_REGISTRY.get(self.ID,{}) if n != self.node_id ]
+        if not converged:
+            return None
+        if prefer in converged:
+            return prefer
+        return min(converged,key=lambda n: (abs(n-self.node_id),n))
+
+    def seed_orbitals(self,prefer=None):
+        '''
+        Copy a neighbor's converged wavefunction to this node if it has none of its own.
+        Returns the node_id the guess came from or None.
+        '''
+        new_paths = self.orbital_files(self.node_id)
+        missing = [ i for i,p in enumerate(new_paths) if not self._orbitals_exist([p]) ]
+        if not missing:
+            return None
+        source = self.nearest_orbitals(prefer)
+        if source is None:
+            return None
+        with _orbital_lock:
+            old_paths = ORBITAL_REGISTRY[self.ID][source]
+        print(" seeding orbitals of node {} from node {}".format(self.node_id,source))
+        for i in missing:
+            old,new = old_paths[i],new_paths[i]
+            if os.path.isdir(old):
+                shutil.copytree(old,new,dirs_exist_ok=True)
+            else:
+                dirname = os.path.dirname(new)
+                if dirname and not os.path.isdir(dirname):
+                    os.makedirs(dirname)
+                shutil.copy2(old,new)
+        return source
+
     def check_multiplicity(self,multiplicity):
         if multiplicity > self.n_electrons + 1:
             raise ValueError("Spin multiplicity too high.")
@@ -377,6 +460,62 @@ class Lot(object):
             self.run(geom,7)
         self.hasRanForCurrentCoords=True
 
+    def run_batch(self,geoms,multiplicity,state,keys=None):
+        '''
+        Energies (kcal/mol) and gradients (Ha/ang) of several geometries, returned as a list of (E,grad).
+        geoms can be geometries or (natoms,3) coordinates. keys, if given, name every geometry across
+        calls (e.g. its string node) for lots that restart a geometry from its previous result.
+        The default evaluates them one after the other on this lot, lots that can evaluate many
+        configurations at once override it.
+        '''
+        results = []
+        for geom in geoms:
+            coords = geom if isinstance(geom,np.ndarray) else manage_xyz.xyz_to_np(geom)
+            E = self.get_energy(coords,multiplicity,state)
+            grad = self.get_gradient(coords,multiplicity,state)
+            results.append((E,np.reshape(grad,(-1,3))))
+        return results
+
+    @property
+    def worker_pool(self):
+        return get_worker_pool(self.options['nworkers'])
+
+    def job_multiplicities(self):
+        ''' multiplicities that get their own job, in the order runall runs them '''
+        return [ m for m in [1,3,2,4,5,6,7] if self.search_tuple(self.states,m) ]
+
+    def submit(self,geom):
+        '''
+        Start the calculation of all states at geom without waiting for it.
+        File based lots that implement write_job(geom,multiplicity) and parse_job(job)
+        are queued on the shared worker pool, call collect() for the results.
+        Other lots just run here.
+        '''
+        self.currentCoords = manage_xyz.xyz_to_np(geom)
+        if not hasattr(self,'write_job'):
+            self.runall(geom)
+            return
+        self.hasRanForCurrentCoords=False
+        self._jobs = []
+        for multiplicity in self.job_multiplicities():
+            job = self.write_job(geom,multiplicity)
+            self.worker_pool.submit(job)
+            self._jobs.append(job)
+
+    def collect(self):
+        ''' Wait for the jobs started by submit and parse them '''
+        jobs = getattr(self,'_jobs',[])
+        if not jobs:
+            return
+        # like run, a failed program is left to the parser of its output
+        self.worker_pool.collect([job.key for job in jobs],check=False)
+        self.E=[]
+        self.grada = []
+        for job in jobs:
+            self.parse_job(job)
+        self._jobs = []
+        self.hasRanForCurrentCoords=True
+
     def search_PES_tuple(self,tups, multiplicity,state):
         '''returns tuple in list of tuples that matches multiplicity and state'''
         return [tup for tup in tups if multiplicity==tup[0] and state==tup[1]]
@@ -1,80 +1,114 @@
 # standard library imports
-# local application imports
-sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
-from utilities import manage_xyz
 import sys
 import os
 from os import path
-import subprocess
 import re
+import shutil
 
 # third party
 import numpy as np
 
+# local application imports
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from utilities import manage_xyz, units
 try:
     from .base_lot import Lot
+    from .worker_pool import Job
 except:
     from base_lot import Lot
+    from worker_pool import Job
+
+'''
+DFTB+ level of theory.
+
+Every node runs dftb+ in its own directory scratch/{node_id}, which holds the
+dftb_in.hsd copied from lot_inp_file and the geometry as tmp.gen (the input must
+read the geometry with GenFormat { <<< "tmp.gen" }). Nothing changes the working
+directory of the process, so the nodes can run at the same time from the worker
+pool threads (nworkers>1).
+'''
+
+_energy_pattern = re.compile(r'^Total energy:\s+([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)\s+H', re.M)
 
 
 class DFTB(Lot):
 
     def __init__(self, options):
         super(DFTB, self).__init__(options)
-        os.system('rm -f dftb_jobs.txt')
-        print(" making folder scratch/{}".format(self.node_id))
-        os.system('mkdir -p scratch/{}'.format(self.node_id))
-        os.system('cp {} scratch/{}'.format(self.lot_inp_file, self.node_id))
+        self.rundir = self.worker_pool.scratch_dir(self.node_id)
+        print(" running dftb+ in {}".format(self.rundir))
+        shutil.copy(self.lot_inp_file, path.join(self.rundir, 'dftb_in.hsd'))
+
+        # species of the gen file, in order of first appearance
+        atoms = np.array(self.atoms)
+        _, first, species = np.unique(atoms, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        self.species = atoms[first[order]]
+        self.species_idx = np.argsort(order)[species] + 1
+
+    @classmethod
+    def copy(cls, lot, options, copy_wavefunction=True):
+        return cls(lot.options.copy().set_values(options))
+
+    def write_gen(self, coords, filename):
+        ''' write (natoms,3) coordinates (Angstrom) as a cluster (C) gen file '''
+        natoms = len(coords)
+        table = np.empty((natoms, 5), dtype=object)
+        table[:, 0] = np.arange(1, natoms+1)
+        table[:, 1] = self.species_idx
+        table[:, 2:] = coords
+        with open(filename, 'w') as f:
+            f.write('%d C\n%s\n' % (natoms, ' '.join(self.species)))
+            f.write(('%5d %3d %20.12f %20.12f %20.12f\n' * natoms) % tuple(table.ravel()))
 
     def run(self, geom):
-        owd = os.getcwd()
-        manage_xyz.write_xyz('scratch/{}/tmp.xyz'.format(self.node_id), geom, scale=1.0)
-        os.system('./xyz2gen scratch/{}/tmp.xyz'.format(self.node_id))
-        os.chdir('scratch/{}'.format(self.node_id))
-        os.system('pwd')
-        cmd = "dftb+"
-        proc = subprocess.Popen(cmd,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                )
-        stdout, stderr = proc.communicate()
-        # with open('dftb_jobs.txt','a') as out:
-        #     out.write(stdout)
-        #     out.write(stderr)
-
-        ofilepath = "detailed.out"
-        with open(ofilepath, 'r') as ofile:
-            olines = ofile.readlines()
+        job = self.write_job(geom)
+        self.worker_pool.run(job,check=False)
+        self.parse_job(job)
+        return
 
-        self.E = []
-        temp = 0
-        tmpgrada = []
-        tmpgrad = []
-        pattern = re.compile(r"Total energy:                     [-+]?[0-9]*\.?[0-9]+ H")
-        for line in olines:
-            for match in re.finditer(pattern, line):
-                tmpline = line.split()
-                self.E.append((1, 0, float(tmpline[2])))
-            if line == " Total Forces\n":
-                temp += 1
-            elif temp > 0:
-                tmpline = line.split()
-                tmpgrad.append([float(i) for i in tmpline])
-                temp += 1
-            if temp > len(self.atoms):
-                break
-        tmpgrada.append(tmpgrad)
+    def job_multiplicities(self):
+        # one dftb+ run gives all the states
+        return [None]
+
+    def write_job(self, geom, multiplicity=None):
+        ''' write the node's geometry and return the worker pool job that runs dftb+ '''
+        self.write_gen(manage_xyz.xyz_to_np(geom), path.join(self.rundir, 'tmp.gen'))
+        return Job(key=(self.ID, self.node_id, multiplicity), cmd=['dftb+'], cwd=self.rundir, stdout=path.join(self.rundir, 'dftb.out'))
+
+    def parse_job(self, job):
+        with open(path.join(self.rundir, 'detailed.out')) as f:
+            text = f.read()
+
+        energy = float(_energy_pattern.search(text).group(1))
 
+        # the forces are the natoms lines after 'Total Forces', older versions print x y z
+        # and newer ones the atom index first, so the last three columns are used
+        lines = text[text.index('Total Forces'):].splitlines()[1:len(self.atoms)+1]
+        forces = np.array(' '.join(lines).split(), dtype=float).reshape(len(self.atoms), -1)[:, -3:]
+
+        self.E = []
         self.grada = []
-        for count, i in enumerate(self.states):
-            if i[0] == 1:
-                self.grada.append((1, i[1], tmpgrada[count]))
-            if i[0] == 3:
-                self.grada.append((3, i[1], tmpgrada[count]))
+        for state in self.states:
+            self.E.append((state[0], state[1], energy))
+            self.grada.append((state[0], state[1], -forces))  # Hartree/Bohr
         self.hasRanForCurrentCoords = True
 
-        os.chdir(owd)
-        return
+    def get_energy(self, coords, multiplicity, state):
+        if self.hasRanForCurrentCoords == False or (coords != self.currentCoords).any():
+            self.currentCoords = coords.copy()
+            geom = manage_xyz.np_to_xyz(self.geom, self.currentCoords)
+            self.run(geom)
+        return self.search_PES_tuple(self.E, multiplicity, state)[0][2]*units.KCAL_MOL_PER_AU
+
+    def get_gradient(self, coords, multiplicity, state):
+        if self.hasRanForCurrentCoords == False or (coords != self.currentCoords).any():
+            self.currentCoords = coords.copy()
+            geom = manage_xyz.np_to_xyz(self.geom, self.currentCoords)
+            self.run(geom)
+        tmp = self.search_PES_tuple(self.grada, multiplicity, state)[0][2]
+        return np.asarray(tmp)*units.ANGSTROM_TO_AU  # hartree/ang
+
 
 if __name__ == '__main__':
     filepath = "../../data/ethylene.xyz"
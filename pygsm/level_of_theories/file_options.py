@@ -113,6 +113,9 @@ class File_Options(object):
         self.InactiveWarnings[key] = msg
 
     def __getattr__(self, key):
+        # the option dicts are looked up before they exist when unpickling
+        if key in ('ActiveOptions', 'InactiveOptions') or key.startswith('__'):
+            raise AttributeError(key)
         if key in self.ActiveOptions:
             return self.ActiveOptions[key]
         elif key in self.InactiveOptions:
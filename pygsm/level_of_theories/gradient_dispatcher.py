@@ -0,0 +1,220 @@
+# standard library imports
+import os
+import sys
+import time
+import pickle
+from os import path
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+# local application imports
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from utilities import nifty
+
+'''
+Distributed evaluation of string node energies and gradients.
+
+A GradientTask holds the PES surfaces of one node (the PES itself, or PES1 and PES2 of
+an Avg_PES/Penalty_PES, with their lots) and the coordinates to evaluate them at. The
+GradientDispatcher scatters the tasks of a whole string over a queue, resubmits tasks
+that failed or took longer than timeout, and gathers {key: [(E,grad) per surface]}.
+
+Queues have submit(handle,task), wait(interval) -> [(handle,ok,result or error)],
+cancel(handle) and shutdown(). Two are provided:
+
+LocalQueue       a pool of processes on this machine, the stand-in for testing. A task
+                 cancelled while running is stopped by restarting the pool.
+WorkQueueQueue   Work Queue (cctools) through the nifty helpers. The task is pickled
+                 to a file and evaluated by running this module on the worker, so the
+                 workers need the same pyGSM (and electronic structure code) installed.
+
+Tasks are evaluated on a copy of the lot, wavefunction files written by the remote
+calculation are not brought back.
+'''
+
+GradientTask = namedtuple('GradientTask', ['key', 'surfaces', 'xyz'])
+
+
+def evaluate_task(task):
+    ''' the energies (kcal/mol) and gradients (Ha/ang) of every surface of the task '''
+    return [(surface.get_energy(task.xyz), surface.get_gradient(task.xyz)) for surface in task.surfaces]
+
+
+class LocalQueue(object):
+    """ Evaluates the tasks in a pool of local processes """
+
+    def __init__(self, nworkers=None):
+        self.nworkers = nworkers
+        self.executor = ProcessPoolExecutor(max_workers=nworkers)
+        self.futures = {}
+        self.tasks = {}
+
+    def submit(self, handle, task):
+        try:
+            self.futures[handle] = self.executor.submit(evaluate_task, task)
+        except BrokenProcessPool:
+            # a worker died, the tasks it took down are retried by the dispatcher
+            self.executor = ProcessPoolExecutor(max_workers=self.nworkers)
+            self.futures[handle] = self.executor.submit(evaluate_task, task)
+        self.tasks[handle] = task
+
+    def wait(self, interval):
+        done, _ = wait(list(self.futures.values()), timeout=interval, return_when=FIRST_COMPLETED)
+        finished = []
+        for handle, future in list(self.futures.items()):
+            if future in done:
+                del self.futures[handle]
+                del self.tasks[handle]
+                error = future.exception()
+                finished.append((handle, error is None, future.result() if error is None else error))
+        return finished
+
+    def cancel(self, handle):
+        future = self.futures.pop(handle, None)
+        self.tasks.pop(handle, None)
+        if future is None or future.cancel():
+            return
+        # a running calculation is only stopped with its worker process. The pool can't
+        # terminate a single worker, so all of them are and the unfinished tasks are
+        # submitted again to a new pool
+        unfinished = [h for h, f in self.futures.items() if not f.done()]
+        self.terminate()
+        self.executor = ProcessPoolExecutor(max_workers=self.nworkers)
+        for h in unfinished:
+            self.futures[h] = self.executor.submit(evaluate_task, self.tasks[h])
+
+    def terminate(self):
+        for process in list(self.executor._processes.values()):
+            process.terminate()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self.terminate()
+
+
+class WorkQueueQueue(object):
+    """ Evaluates the tasks on Work Queue workers """
+
+    def __init__(self, port=9123, scratch='scratch/wq', name='pyGSM', python='python'):
+        if nifty.getWorkQueue() is None:
+            nifty.createWorkQueue(port, debug=False, name=name)
+        self.wq = nifty.getWorkQueue()
+        self.scratch = path.abspath(scratch)
+        if not path.isdir(self.scratch):
+            os.makedirs(self.scratch)
+        self.command = '{} {} task.pkl result.pkl'.format(python, path.abspath(__file__))
+        self.tags = {}
+
+    def files(self, tag):
+        return path.join(self.scratch, tag+'.task.pkl'), path.join(self.scratch, tag+'.result.pkl')
+
+    def submit(self, handle, task):
+        key, attempt = handle
+        tag = '_'.join(str(x) for x in (key if isinstance(key, tuple) else (key,)) + (attempt,))
+        taskfile, resultfile = self.files(tag)
+        with open(taskfile, 'wb') as f:
+            pickle.dump(task, f)
+        if path.exists(resultfile):
+            os.remove(resultfile)
+        nifty.queue_up_src_dest(self.wq, self.command, [(taskfile, 'task.pkl')], [(resultfile, 'result.pkl')], tag=tag, verbose=False)
+        self.tags[tag] = handle
+
+    def wait(self, interval):
+        task = self.wq.wait(int(max(interval, 1)))
+        if not task:
+            return []
+        for ids in nifty.getWQIds().values():
+            if task.id in ids:
+                ids.remove(task.id)
+        handle = self.tags.pop(task.tag, None)
+        if handle is None:
+            return []
+        taskfile, resultfile = self.files(task.tag)
+        if task.result != 0 or task.return_status != 0 or not path.exists(resultfile):
+            return [(handle, False, RuntimeError("task {} failed on {} (result {} return status {})".format(task.tag, task.hostname, task.result, task.return_status)))]
+        with open(resultfile, 'rb') as f:
+            return [(handle, True, pickle.load(f))]
+
+    def cancel(self, handle):
+        for tag, h in list(self.tags.items()):
+            if h == handle:
+                self.wq.cancel_by_tasktag(tag)
+                del self.tags[tag]
+
+    def shutdown(self):
+        nifty.destroyWorkQueue()
+
+
+class GradientDispatcher(object):
+    """ Scatter/gather of gradient tasks over a queue with retries and a per task timeout """
+
+    def __init__(self, queue, max_retries=2, timeout=None, wait_interval=1.):
+        self.queue = queue
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.wait_interval = wait_interval
+
+    @classmethod
+    def from_name(cls, name, nworkers=None, wq_port=9123, **kwargs):
+        if name == 'local':
+            return cls(LocalQueue(nworkers), **kwargs)
+        elif name == 'work_queue':
+            return cls(WorkQueueQueue(wq_port), **kwargs)
+        raise ValueError("unknown gradient dispatcher {}".format(name))
+
+    def map(self, tasks):
+        ''' evaluate all tasks and return {task.key: [(E,grad) per surface]} '''
+        attempts = {}
+        pending = {}
+        started = {}
+        results = {}
+
+        def submit(task, error=None):
+            attempts[task.key] = attempts.get(task.key, 0) + 1
+            if attempts[task.key] > self.max_retries+1:
+                raise RuntimeError("gradient task {} failed {} times: {}".format(task.key, attempts[task.key]-1, error))
+            if error is not None:
+                print(" gradient task {} failed ({}), resubmitting".format(task.key, error))
+            handle = (task.key, attempts[task.key])
+            self.queue.submit(handle, task)
+            pending[handle] = task
+            started[handle] = time.time()
+
+        for task in tasks:
+            submit(task)
+
+        while pending:
+            for handle, ok, value in self.queue.wait(self.wait_interval):
+                task = pending.pop(handle, None)
+                if task is None:
+                    continue  # given up on after a timeout
+                if ok:
+                    results[task.key] = value
+                else:
+                    submit(task, value)
+
+            if self.timeout is not None:
+                now = time.time()
+                for handle in [h for h in pending if now-started[h] > self.timeout]:
+                    task = pending.pop(handle)
+                    self.queue.cancel(handle)
+                    submit(task, "no result after {} s".format(self.timeout))
+
+        return results
+
+    def shutdown(self):
+        self.queue.shutdown()
+
+
+if __name__ == '__main__':
+    # remote side of WorkQueueQueue: python gradient_dispatcher.py task.pkl result.pkl
+    with open(sys.argv[1], 'rb') as f:
+        task = pickle.load(f)
+    for surface in task.surfaces:
+        dirname = path.join('scratch', str(surface.lot.node_id))
+        if not path.isdir(dirname):
+            os.makedirs(dirname)
+    result = evaluate_task(task)
+    with open(sys.argv[2], 'wb') as f:
+        pickle.dump(result, f)
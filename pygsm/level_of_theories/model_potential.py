@@ -0,0 +1,271 @@
+# standard library imports
+import sys
+from os import path
+
+# third party
+import numpy as np
+
+# local application imports
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from utilities import manage_xyz, units, elements
+try:
+    from .base_lot import Lot
+    from .file_options import File_Options
+except:
+    from base_lot import Lot
+    from file_options import File_Options
+
+ELEMENT_TABLE = elements.ElementData()
+
+# Muller-Brown parameters, Theor. Chim. Acta 53, 75 (1979)
+MB_A = np.array([-200., -100., -170., 15.])
+MB_a = np.array([-1., -1., -6.5, 0.7])
+MB_b = np.array([0., 0., 11., 0.6])
+MB_c = np.array([-10., -10., -6.5, 0.7])
+MB_x0 = np.array([1., 0., -0.5, -1.])
+MB_y0 = np.array([0., 0.5, 1.5, 1.])
+
+
+def find_bonds(xyz, atoms, fac=1.2):
+    ''' atom pairs closer than fac times the sum of the covalent radii and their distances '''
+    radii = np.array([ELEMENT_TABLE.from_symbol(a).covalent_radius for a in atoms])
+    i, j = np.triu_indices(len(atoms), 1)
+    r = np.linalg.norm(xyz[i]-xyz[j], axis=1)
+    bonded = r < fac*(radii[i]+radii[j])
+    return i[bonded], j[bonded], r[bonded]
+
+
+def find_angles(bonds, natoms):
+    ''' (i,j,k) index arrays of the angles i-j-k between bonded atoms '''
+    neighbors = [[] for _ in range(natoms)]
+    for a, b in zip(*bonds[:2]):
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+    angles = [(i, j, k) for j in range(natoms) for n, i in enumerate(neighbors[j]) for k in neighbors[j][n+1:]]
+    return tuple(np.array(x, dtype=int) for x in zip(*angles)) if angles else (np.zeros(0, dtype=int),)*3
+
+
+def angle_values(xyz, i, j, k):
+    u = xyz[..., i, :]-xyz[..., j, :]
+    w = xyz[..., k, :]-xyz[..., j, :]
+    cos = np.sum(u*w, axis=-1)/(np.linalg.norm(u, axis=-1)*np.linalg.norm(w, axis=-1))
+    return np.arccos(np.clip(cos, -1., 1.))
+
+
+def add_forces(grad, idx, f):
+    ''' add the per term vectors f (M,nterms,3) to the atoms idx of grad (M,natoms,3), repeated atoms add up '''
+    g = grad.transpose(1, 0, 2)
+    np.add.at(g, idx, f.transpose(1, 0, 2))
+
+
+class ModelPotential(Lot):
+    """
+    Analytic potentials evaluated with NumPy in this process, for testing and benchmarking
+    without an electronic structure code. Energies and gradients of many geometries are
+    computed at once in run_batch.
+
+    surface evb (default): a force field of Morse bonds, harmonic angles and Lennard-Jones
+    pairs is built for the reactant, from the geometry, and for the product, from the last
+    frame of the file reaction_xyz (lot_inp_file option, e.g. the DE-GSM input file). The
+    states are the eigenvalues of the empirical valence bond Hamiltonian
+        [[E_R, coupling], [coupling, E_P+product_shift]]
+    so state 0 is a double well with a barrier where the two force fields cross and state 1
+    the upper surface, which is enough to exercise Avg_PES and Penalty_PES. The coupling
+    changes by coupling_slope per Angstrom of radius of gyration away from the reactant,
+    nonzero slopes give the states a seam of conical intersections to optimize on. Without
+    reaction_xyz there is one state, the reactant force field.
+
+    surface muller_brown: the Muller-Brown surface in the x and y coordinates of every atom
+    (in units of mb_length Angstrom, with mb_scale Hartree per unit of energy) and a
+    harmonic well in z. One state.
+    """
+
+    def __init__(self, options):
+        super(ModelPotential, self).__init__(options)
+
+        self.file_options.set_active('surface', 'evb', str, 'model surface', allowed=['evb', 'muller_brown'])
+        evb = self.file_options.surface == 'evb'
+        self.file_options.set_active('reaction_xyz', None, str, 'xyz file whose last frame is the product', depend=evb)
+        self.file_options.set_active('k_bond', 0.3, float, 'bond force constant at the minimum (Hartree/Angstrom^2)', depend=evb)
+        self.file_options.set_active('morse_depth', 0.15, float, 'bond dissociation energy (Hartree)', depend=evb)
+        self.file_options.set_active('k_angle', 0.05, float, 'harmonic angle force constant (Hartree/radian^2)', depend=evb)
+        self.file_options.set_active('lj_epsilon', 2e-4, float, 'Lennard-Jones well depth of the nonbonded pairs (Hartree)', depend=evb)
+        self.file_options.set_active('lj_sigma', 1.5, float, 'Lennard-Jones sigma in units of the sum of the covalent radii', depend=evb)
+        self.file_options.set_active('coupling', 0.02, float, 'coupling of the reactant and product force fields (Hartree)', depend=evb)
+        self.file_options.set_active('coupling_slope', 0., float, 'change of the coupling with the radius of gyration (Hartree/Angstrom)', depend=evb)
+        self.file_options.set_active('product_shift', 0., float, 'energy of the product force field relative to the reactant (Hartree)', depend=evb)
+        self.file_options.set_active('mb_scale', 5e-4, float, 'Hartree per Muller-Brown energy unit', depend=not evb)
+        self.file_options.set_active('mb_length', 1., float, 'Angstrom per Muller-Brown length unit', depend=not evb)
+        self.file_options.set_active('k_z', 0.1, float, 'harmonic force constant in z (Hartree/Angstrom^2)', depend=not evb)
+
+        self.force_fields = []
+        if evb:
+            self.force_fields.append(self.build_force_field(manage_xyz.xyz_to_np(self.geom)))
+            if self.file_options.reaction_xyz is not None:
+                product = manage_xyz.read_xyzs(self.file_options.reaction_xyz)[-1]
+                self.force_fields.append(self.build_force_field(manage_xyz.xyz_to_np(product)))
+            self.reference_rg = self.radius_of_gyration(manage_xyz.xyz_to_np(self.geom)[None])[0][0]
+        self.nstates = len(self.force_fields) if evb else 1
+
+        for multiplicity, state in self.states:
+            if multiplicity != 1 or state >= self.nstates:
+                raise RuntimeError("ModelPotential {} has {} singlet state(s), can't do state {}".format(self.file_options.surface, self.nstates, (multiplicity, state)))
+
+    def build_force_field(self, xyz):
+        ''' bonds, angles and nonbonded pairs (beyond 1-3) with their reference values at xyz '''
+        natoms = len(self.atoms)
+        bonds = find_bonds(xyz, self.atoms)
+        angles = find_angles(bonds, natoms)
+
+        excluded = np.zeros((natoms, natoms), dtype=bool)
+        excluded[bonds[0], bonds[1]] = True
+        excluded[angles[0], angles[2]] = True
+        excluded |= excluded.T
+        i, j = np.triu_indices(natoms, 1)
+        keep = ~excluded[i, j]
+        radii = np.array([ELEMENT_TABLE.from_symbol(a).covalent_radius for a in self.atoms])
+        sigma = self.file_options.lj_sigma*(radii[i[keep]]+radii[j[keep]])
+
+        return {
+                'bonds': bonds,
+                'angles': angles + (angle_values(xyz, *angles),),
+                'pairs': (i[keep], j[keep], sigma),
+                }
+
+    def force_field_energy(self, coords, ff):
+        ''' energies (Hartree) and gradients (Hartree/Angstrom) of coords (M,natoms,3) '''
+        E = np.zeros(len(coords))
+        grad = np.zeros(coords.shape)
+
+        # Morse bonds with curvature k_bond at the reference length
+        i, j, r0 = ff['bonds']
+        De = self.file_options.morse_depth
+        a = np.sqrt(0.5*self.file_options.k_bond/De)
+        v = coords[:, i]-coords[:, j]
+        r = np.linalg.norm(v, axis=2)
+        x = np.exp(-a*(r-r0))
+        E += De*np.sum((1.-x)**2, axis=1)
+        f = (2.*De*a*x*(1.-x)/r)[:, :, None]*v
+        add_forces(grad, i, f)
+        add_forces(grad, j, -f)
+
+        # harmonic angles
+        i, j, k, theta0 = ff['angles']
+        u = coords[:, i]-coords[:, j]
+        w = coords[:, k]-coords[:, j]
+        nu = np.linalg.norm(u, axis=2)
+        nw = np.linalg.norm(w, axis=2)
+        cos = np.clip(np.sum(u*w, axis=2)/(nu*nw), -1., 1.)
+        theta = np.arccos(cos)
+        E += 0.5*self.file_options.k_angle*np.sum((theta-theta0)**2, axis=1)
+        # dE/dtheta * dtheta/dcos, guarded for linear angles
+        dE = -self.file_options.k_angle*(theta-theta0)/np.maximum(np.sqrt(1.-cos**2), 1e-8)
+        fu = dE[:, :, None]*(w/(nu*nw)[:, :, None] - (cos/nu**2)[:, :, None]*u)
+        fw = dE[:, :, None]*(u/(nu*nw)[:, :, None] - (cos/nw**2)[:, :, None]*w)
+        add_forces(grad, i, fu)
+        add_forces(grad, k, fw)
+        add_forces(grad, j, -fu-fw)
+
+        # Lennard-Jones between the nonbonded pairs
+        i, j, sigma = ff['pairs']
+        eps = self.file_options.lj_epsilon
+        if eps != 0. and len(i):
+            v = coords[:, i]-coords[:, j]
+            r = np.linalg.norm(v, axis=2)
+            s6 = (sigma/r)**6
+            E += 4.*eps*np.sum(s6**2-s6, axis=1)
+            f = (4.*eps*(6.*s6-12.*s6**2)/r**2)[:, :, None]*v
+            add_forces(grad, i, f)
+            add_forces(grad, j, -f)
+        return E, grad
+
+    @staticmethod
+    def radius_of_gyration(coords):
+        ''' unweighted radii of gyration (M,) of coords (M,natoms,3) and their gradients '''
+        centered = coords-coords.mean(axis=1)[:, None]
+        rg = np.sqrt(np.mean(np.sum(centered**2, axis=2), axis=1))
+        return rg, centered/(coords.shape[1]*rg)[:, None, None]
+
+    def muller_brown(self, coords):
+        ''' energies (Hartree) and gradients (Hartree/Angstrom) of coords (M,natoms,3) '''
+        L = self.file_options.mb_length
+        x = coords[:, :, 0, None]/L-MB_x0
+        y = coords[:, :, 1, None]/L-MB_y0
+        terms = MB_A*np.exp(MB_a*x**2 + MB_b*x*y + MB_c*y**2)
+        scale = self.file_options.mb_scale
+        kz = self.file_options.k_z
+        E = scale*np.sum(terms, axis=(1, 2)) + 0.5*kz*np.sum(coords[:, :, 2]**2, axis=1)
+        grad = np.empty(coords.shape)
+        grad[:, :, 0] = scale/L*np.sum(terms*(2.*MB_a*x + MB_b*y), axis=2)
+        grad[:, :, 1] = scale/L*np.sum(terms*(MB_b*x + 2.*MB_c*y), axis=2)
+        grad[:, :, 2] = kz*coords[:, :, 2]
+        return E[:, None], grad[:, None]
+
+    def evaluate(self, coords):
+        '''
+        energies (M,nstates) in Hartree and gradients (M,nstates,natoms,3) in Hartree/Angstrom
+        of coords (M,natoms,3), and the derivative coupling of states 0 and 1 (M,natoms,3) in
+        1/Angstrom or None
+        '''
+        if self.file_options.surface == 'muller_brown':
+            E, grad = self.muller_brown(coords)
+            return E, grad, None
+
+        ER, gR = self.force_field_energy(coords, self.force_fields[0])
+        if self.nstates == 1:
+            return ER[:, None], gR[:, None], None
+        EP, gP = self.force_field_energy(coords, self.force_fields[1])
+        EP = EP + self.file_options.product_shift
+        rg, gV = self.radius_of_gyration(coords)
+        V = self.file_options.coupling + self.file_options.coupling_slope*(rg-self.reference_rg)
+        gV *= self.file_options.coupling_slope
+
+        d = 0.5*(ER-EP)
+        s = np.sqrt(d**2 + V**2)
+        mix = (0.5*d[:, None, None]*(gR-gP) + V[:, None, None]*gV)/s[:, None, None]
+        E = np.stack([0.5*(ER+EP)-s, 0.5*(ER+EP)+s], axis=1)
+        grad = np.stack([0.5*(gR+gP)-mix, 0.5*(gR+gP)+mix], axis=1)
+        # gradient of the mixing angle of the two force fields
+        coup = (2.*d[:, None, None]*gV - V[:, None, None]*(gR-gP))/(4.*s**2)[:, None, None]
+        return E, grad, coup
+
+    def _evaluate_current(self, coords):
+        E, grad, coup = self.evaluate(coords[None])
+        self.E = [(multiplicity, state, E[0, state]) for multiplicity, state in self.states]
+        self.grada = [(multiplicity, state, grad[0, state]) for multiplicity, state in self.states]
+        self.coup = coup[0] if coup is not None else None
+        self.currentCoords = coords.copy()
+        self.hasRanForCurrentCoords = True
+
+    def get_energy(self, coords, multiplicity, state):
+        if self.hasRanForCurrentCoords == False or (coords != self.currentCoords).any():
+            self._evaluate_current(coords)
+        return self.search_PES_tuple(self.E, multiplicity, state)[0][2]*units.KCAL_MOL_PER_AU
+
+    def get_gradient(self, coords, multiplicity, state):
+        if self.hasRanForCurrentCoords == False or (coords != self.currentCoords).any():
+            self._evaluate_current(coords)
+        return self.search_PES_tuple(self.grada, multiplicity, state)[0][2].copy()  # hartree/ang
+
+    def get_coupling(self, coords, multiplicity, state1, state2):
+        if self.hasRanForCurrentCoords == False or (coords != self.currentCoords).any():
+            self._evaluate_current(coords)
+        if self.coup is None:
+            raise RuntimeError("ModelPotential {} has no second state to couple".format(self.file_options.surface))
+        return np.reshape(self.coup, (3*len(self.coup), 1))
+
+    def run_batch(self, geoms, multiplicity, state, keys=None):
+        coords = np.asarray([g if isinstance(g, np.ndarray) else manage_xyz.xyz_to_np(g) for g in geoms])
+        E, grad, coup = self.evaluate(coords)
+        return [(E[n, state]*units.KCAL_MOL_PER_AU, grad[n, state]) for n in range(len(coords))]
+
+
+if __name__ == '__main__':
+    filepath = '../../data/diels_alder.xyz'
+    geoms = manage_xyz.read_xyzs(filepath)
+    file_options = File_Options()
+    file_options.UserOptions['reaction_xyz'] = filepath
+    lot = ModelPotential.from_options(states=[(1, 0), (1, 1)], geom=geoms[0], file_options=file_options)
+    for geom in geoms:
+        xyz = manage_xyz.xyz_to_np(geom)
+        print(lot.get_energy(xyz, 1, 0), lot.get_energy(xyz, 1, 1))
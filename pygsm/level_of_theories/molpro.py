@@ -11,10 +11,11 @@ import numpy as np
 sys.path.append(path.dirname( path.dirname( path.abspath(__file__))))
 try:
     from .base_lot import Lot
+    from .worker_pool import Job
 except:
     from base_lot import Lot
+    from worker_pool import Job
 from utilities import *
-import subprocess 
 
 class Molpro(Lot):
 
@@ -50,9 +51,20 @@ class Molpro(Lot):
     # designed to do multiple multiplicities at once... maybe not such a good idea, that feature is currently broken
     #TODO 
     def run(self,geom):
+        job = self.write_job(geom)
+        self.worker_pool.run(job,check=False)
+        self.parse_job(job)
+        return
+
+    def job_multiplicities(self):
+        # one molpro job does all the states
+        return [None]
+
+    def write_job(self,geom,multiplicity=None):
+        ''' write the node's gopro input and return the worker pool job that runs it '''
 
-        #TODO gopro needs a number
-        tempfilename = 'scratch/gopro.com'
+        tempfilename = 'scratch/gopro_{:04d}_{:04d}.com'.format(self.ID,self.node_id)
+        self.seed_orbitals()
         tempfile = open(tempfilename,'w')
         tempfile.write(' file,2,mp_{:04d}_{:04d}\n'.format(self.ID,self.node_id))
         tempfile.write(' memory,{},m\n'.format(self.memory))
@@ -134,17 +146,18 @@ class Molpro(Lot):
         args = ['-W','scratch','-n',str(self.nproc),tempfilename,'-d',scratch]
         command=['molpro']
         command.extend(args)
-        output = subprocess.Popen(command, stdout=subprocess.PIPE, stderr = subprocess.PIPE).communicate()[0]
+        return Job(key=(self.ID,self.node_id,multiplicity),cmd=command)
 
-        #with open('molpro.stdout','a') as out:
-        #    with nifty.custom_redirection2(out):
-        #        os.system(cmd)
-        #process = Popen(['cat', 'test.py'], stdout=PIPE, stderr=PIPE)
-        #process = Popen([cmd], stdout=PIPE, stderr=PIPE)
-        #stdout, stderr = process.communicate()
+    def parse_job(self,job):
+        natoms = len(self.geom)
+        singlets=self.search_tuple(self.states,1)
+        len_singlets=len(singlets)
+        len_E_singlets=singlets[-1][1] +1 if singlets else 0
+        triplets=self.search_tuple(self.states,3)
+        len_triplets=len(triplets)
 
         # Now read the output
-        tempfileout='scratch/gopro.out'
+        tempfileout='scratch/gopro_{:04d}_{:04d}.out'.format(self.ID,self.node_id)
         pattern = re.compile(r'MCSCF STATE \d.1 Energy \s* ([-+]?[0-9]*\.?[0-9]+)')
         self.E = []
         tmp =[]
@@ -166,7 +179,7 @@ class Molpro(Lot):
                 if line.startswith("GRADIENT FOR STATE",7): #will work for SA-MC and RSPT2 HF
                     for i in range(3):
                         next(f)
-                    for i in range(len(geom)):
+                    for i in range(natoms):
                         findline = next(f,'').strip()
                         mobj = re.match(r'^\s*(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*$', findline)
                         tmpgrad.append([
@@ -179,7 +192,7 @@ class Molpro(Lot):
                 if line.startswith(" SA-MC NACME FOR STATES"):
                     for i in range(3):
                         next(f)
-                    for i in range(len(geom)):
+                    for i in range(natoms):
                         findline = next(f,'').strip()
                         mobj = re.match(r'^\s*(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*$', findline)
                         self.coup.append([
@@ -197,8 +210,8 @@ class Molpro(Lot):
         with open('scratch/E_{}.txt'.format(self.node_id),'w') as f:
             for E in self.E:
                 f.write('{} {} {:9.7f}\n'.format(E[0],E[1],E[2]))
+        self.register_orbitals()
         self.hasRanForCurrentCoords=True
-        return
 
     def get_energy(self,coords,multiplicity,state):
         if self.hasRanForCurrentCoords==False or (coords != self.currentCoords).any():
@@ -226,17 +239,20 @@ class Molpro(Lot):
             self.run(geom)
         return np.reshape(self.coup,(3*len(self.coup),1))*units.ANGSTROM_TO_AU
 
+    def orbital_files(self,node_id):
+        return ['scratch/mp_{:04d}_{:04d}'.format(self.ID,node_id)]
+
     @classmethod
     def copy(cls,lot,options,copy_wavefunction=True):
         """ create a copy of this lot object"""
         #print(" creating copy, new node id =",node_id)
         #print(" old node id = ",self.node_id)
         node_id = options.get('node_id',1)
+        new_lot = cls(lot.options.copy().set_values(options))
         if node_id != lot.node_id and copy_wavefunction and not lot.restart:
-            cmd = "cp scratch/mp_{:04d}_{:04d} scratch/mp_{:04d}_{:04d}".format(lot.ID,lot.node_id,lot.ID,node_id)
-            print(cmd)
-            os.system(cmd)
-        return cls(lot.options.copy().set_values(options))
+            lot.register_orbitals()
+            new_lot.seed_orbitals(prefer=lot.node_id)
+        return new_lot
 
 if __name__=='__main__':
     filepath="../../data/ethylene.xyz"
@@ -1,8 +1,10 @@
 # standard library imports
 from coordinate_systems import Dihedral
-from utilities import manage_xyz, nifty
+from utilities import manage_xyz, nifty, units
 import sys
+import threading
 from os import path
+from concurrent.futures import ThreadPoolExecutor
 
 # third party
 import numpy as np
@@ -19,6 +21,67 @@ except:
     from base_lot import Lot
 
 
+class ContextPool(object):
+    '''
+    OpenMM Contexts for the System of a simulation, one per thread, so that string nodes
+    can be evaluated at the same time instead of all taking turns on simulation.context.
+    The contexts use the platform (and its properties) and the periodic box of the simulation.
+    The force group mask used by getState is computed once.
+    '''
+
+    def __init__(self, simulation, force_groups=None):
+        self.simulation = simulation
+        self.system = simulation.system
+        self.platform = simulation.context.getPlatform()
+        self.properties = {key: self.platform.getPropertyValue(simulation.context, key) for key in self.platform.getPropertyNames()}
+        self.box_vectors = simulation.context.getState().getPeriodicBoxVectors()
+
+        # groups of the forces in the system, or the ones requested
+        if force_groups is None:
+            force_groups = set(force.getForceGroup() for force in self.system.getForces())
+        self.force_groups = sorted(force_groups)
+        self.groups = sum(1 << g for g in self.force_groups)
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.ncontexts = 0
+        self.executor = None
+        self.nthreads = 0
+
+    def context(self):
+        ''' the context of the calling thread, the main thread uses the one of the simulation '''
+        if threading.current_thread() is threading.main_thread():
+            return self.simulation.context
+        context = getattr(self.local, 'context', None)
+        if context is None:
+            integrator = openmm.VerletIntegrator(1.0)
+            with self.lock:
+                context = openmm.Context(self.system, integrator, self.platform, self.properties)
+                self.ncontexts += 1
+            context.setPeriodicBoxVectors(*self.box_vectors)
+            self.local.integrator = integrator
+            self.local.context = context
+        return context
+
+    def evaluate(self, coords):
+        ''' energy (kcal/mol) and gradient (kcal/mol/Angstrom) at coords (Angstrom) '''
+        context = self.context()
+        context.setPositions(0.1 * coords)  # coords are in angstrom
+        s = context.getState(getEnergy=True, getForces=True, groups=self.groups)
+        E = s.getPotentialEnergy().value_in_unit(openmm_units.kilocalories / openmm_units.moles)
+        F = s.getForces(asNumpy=True).value_in_unit(openmm_units.kilocalories/openmm_units.moles / openmm_units.angstroms)
+        return E, -1.0 * np.asarray(F)
+
+    def map(self, func, items, nthreads):
+        ''' func over items on nthreads worker threads, the threads (and their contexts) are kept between calls '''
+        if self.executor is None or self.nthreads < nthreads:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            self.executor = ThreadPoolExecutor(max_workers=nthreads)
+            self.nthreads = nthreads
+        return list(self.executor.map(func, items))
+
+
 class OpenMM(Lot):
     def __init__(self, options):
 
@@ -165,6 +228,13 @@ class OpenMM(Lot):
                     z0 = xyz[a, 2]*0.1  # Units are in nm
                     trforce.addParticle(a, [k, x0, y0, z0])
 
+    @property
+    def context_pool(self):
+        ''' shared by all nodes through job_data, like the simulation '''
+        if self.options['job_data'].get('context_pool', None) is None:
+            self.options['job_data']['context_pool'] = ContextPool(self.simulation, self.options['job_data'].get('force_groups', None))
+        return self.options['job_data']['context_pool']
+
     @property
     def simulation(self):
         return self.options['job_data']['simulation']
@@ -175,32 +245,39 @@ class OpenMM(Lot):
 
     def run(self, geom, mult, ad_idx, runtype='gradient'):
 
-        coords = manage_xyz.xyz_to_np(geom)
-
-        # Update coordinates of simulation (shallow-copied object)
-        xyz_nm = 0.1 * coords  # coords are in angstrom
-        self.simulation.context.setPositions(xyz_nm)
+        coords = geom if isinstance(geom, np.ndarray) else manage_xyz.xyz_to_np(geom)
 
         # actually compute (only applicable to ground-states,singlet mult)
         if mult != 1 or ad_idx > 1:
             raise RuntimeError('MM cant do excited states')
 
-        s = self.simulation.context.getState(
-            getEnergy=True,
-            getForces=True,
-        )
-        tmp = s.getPotentialEnergy()
-        E = tmp.value_in_unit(openmm_units.kilocalories / openmm_units.moles)
+        # the context of this thread, nodes running in other threads have their own
+        E, G = self.context_pool.evaluate(coords)
         self._Energies[(mult, ad_idx)] = self.Energy(E, 'kcal/mol')
 
-        F = s.getForces()
-        G = -1.0 * np.asarray(F.value_in_unit(openmm_units.kilocalories/openmm_units.moles / openmm_units.angstroms))
-
         self._Gradients[(mult, ad_idx)] = self.Gradient(G, 'kcal/mol/Angstrom')
         self.hasRanForCurrentCoords = True
 
         return
 
+    def run_batch(self, geoms, multiplicity, state, keys=None):
+        '''
+        Energies (kcal/mol) and gradients (Hartree/Angstrom) of many geometries,
+        spread over nproc threads that each evaluate on their own context
+        '''
+        if multiplicity != 1 or state > 1:
+            raise RuntimeError('MM cant do excited states')
+        pool = self.context_pool
+
+        def work(geom):
+            coords = geom if isinstance(geom, np.ndarray) else manage_xyz.xyz_to_np(geom)
+            E, G = pool.evaluate(coords)
+            return E, G / units.KCAL_MOL_PER_AU
+
+        if self.nproc > 1 and len(geoms) > 1:
+            return pool.map(work, geoms, self.nproc)
+        return [work(geom) for geom in geoms]
+
 
 if __name__ == "__main__":
     from openbabel import pybel as pb
@@ -9,6 +9,7 @@ import numpy as np
 # local application imports
 sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 from .base_lot import Lot
+from .worker_pool import Job
 
 class Orca(Lot):
 
@@ -36,22 +37,14 @@ class Orca(Lot):
                 inpstring += str(i)+' '
             inpstring += '\n'
         inpstring += '*'
-        tempfilename = 'tempORCAinp_{}'.format(multiplicity)
+        tempfilename = 'tempORCAinp_{}_{}_{}'.format(self.ID, self.node_id, multiplicity)
         tempfile = open(tempfilename, 'w')
         tempfile.write(inpstring)
         tempfile.close()
         return tempfilename
 
-    def run(self, geom, multiplicity, ad_idx, runtype='gradient'):
-
-        assert ad_idx == 0, "pyGSM ORCA doesn't currently support ad_idx!=0"
-
-        # Write input file
-        tempfilename = self.write_input_file(geom, multiplicity)
-
-        path2orca = os.popen('which orca').read().rstrip()
+    def run_scratch(self):
         user = os.environ['USER']
-        cwd = os.environ['PWD']
         try:
             slurmID = os.environ['SLURM_ARRAY_JOB_ID']
             try:
@@ -64,14 +57,32 @@ class Orca(Lot):
             orcascr = 'temporcarun'
             # runscr = '/tmp/'+user+'/'+orcascr
             runscr = '/tmp/'+pbsID+'/'+orcascr
+        return runscr
+
+    def orbital_files(self, node_id):
+        # ORCA restarts from a gbw file with the same basename as the input
+        runscr = self.run_scratch()
+        return ['{}/tempORCAinp_{}_{}_{}.gbw'.format(runscr, self.ID, node_id, m) for m in self.job_multiplicities()]
+
+    def run(self, geom, multiplicity, ad_idx, runtype='gradient'):
+
+        assert ad_idx == 0, "pyGSM ORCA doesn't currently support ad_idx!=0"
+
+        # Write input file
+        tempfilename = self.write_input_file(geom, multiplicity)
+
+        path2orca = os.popen('which orca').read().rstrip()
+        runscr = self.run_scratch()
 
         os.system('mkdir -p {}'.format(runscr))
+        self.seed_orbitals()
         os.system('mv {} {}/'.format(tempfilename, runscr))
-        cmd = 'cd {}; {} {} > {}/{}.log; cd {}'.format(runscr, path2orca, tempfilename, runscr, tempfilename, cwd)
-        os.system(cmd)
+        job = Job(key=(self.ID,self.node_id,multiplicity), cmd=[path2orca, tempfilename], cwd=runscr, stdout='{}/{}.log'.format(runscr, tempfilename))
+        self.worker_pool.run(job,check=False)
 
         # parse output
         self.parse(multiplicity, runscr, tempfilename)
+        self.register_orbitals()
 
         return
 
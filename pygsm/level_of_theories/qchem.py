@@ -9,8 +9,8 @@ import numpy as np
 # local application imports
 sys.path.append(path.dirname( path.dirname( path.abspath(__file__))))
 from .base_lot import Lot
+from .worker_pool import Job
 from utilities import *
-import subprocess 
 
 class QChem(Lot):
     def __init__(self,options):
@@ -73,9 +73,16 @@ class QChem(Lot):
         tempfile.close()
     
     def run(self,geom,multiplicity):
+        job = self.write_job(geom,multiplicity)
+        self.worker_pool.run(job,check=False)
+        self.parse_job(job)
+
+    def write_job(self,geom,multiplicity):
+        ''' write the input and return the worker pool job that runs it '''
 
         qcscratch = os.environ['QCSCRATCH']
         tempfilename = qcscratch + '/string_{:03d}/{}.{}/tempQCinp'.format(self.ID,self.node_id,multiplicity)
+        self.seed_orbitals()
 
         if self.calc_grad:
            self.write_preamble(geom,multiplicity,tempfilename)
@@ -92,10 +99,12 @@ class QChem(Lot):
                 'string_{:03d}/{}.{}'.format(self.ID,self.node_id,multiplicity)
                 ]
         cmd.extend(args)
-        output = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr = subprocess.PIPE).communicate()[0]
-        #print(cmd)
-        #os.system(cmd)
-       
+        return Job(key=(self.ID,self.node_id,multiplicity),cmd=cmd)
+
+    def parse_job(self,job):
+        qcscratch = os.environ['QCSCRATCH']
+        multiplicity = job.key[2]
+
         # PARSE OUTPUT #
         if self.calc_grad:
             efilepath = qcscratch + '/string_{:03d}/{}.{}/GRAD'.format(self.ID,self.node_id,multiplicity)
@@ -126,6 +135,8 @@ class QChem(Lot):
         else:
             raise NotImplementedError
 
+        self.register_orbitals()
+
         # write E to scratch
         with open('scratch/E_{}.txt'.format(self.node_id),'w') as f:
             for E in self.E:
@@ -164,18 +175,17 @@ class QChem(Lot):
         tmp = self.search_tuple(self.grada,multiplicity)
         return np.asarray(tmp[state][1])*units.ANGSTROM_TO_AU
 
+    def orbital_files(self,node_id):
+        qcscratch = os.environ['QCSCRATCH']
+        return [ qcscratch + '/string_{:03d}/{}.{}'.format(self.ID,node_id,m) for m in self.job_multiplicities() ]
+
     @classmethod
     def copy(cls,lot,options,copy_wavefunction=True):
-        base = os.environ['QCSCRATCH']
         node_id = options.get('node_id',1)
+        new_lot = cls(lot.options.copy().set_values(options))
 
         if node_id != lot.node_id:  #and copy_wavefunction: # other theories are more sensitive than qchem -- commenting out
-            for state in lot.states:
-                multiplicity = state[0]
-                efilepath_old=base+ '/string_{:03d}/{}.{}'.format(lot.ID,lot.node_id,multiplicity)
-                efilepath_new =base+ '/string_{:03d}/{}.{}'.format(lot.ID,node_id,multiplicity)
-                cmd = 'cp -r ' + efilepath_old +' ' + efilepath_new
-                print(" copying QCSCRATCH files\n {}".format(cmd))
-                os.system(cmd)
-        return cls(lot.options.copy().set_values(options))
+            lot.register_orbitals()
+            new_lot.seed_orbitals(prefer=lot.node_id)
+        return new_lot
 
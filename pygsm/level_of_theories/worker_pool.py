@@ -0,0 +1,114 @@
+# standard library imports
+import os
+import subprocess
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Worker pool shared by the file based level of theories (QChem, Orca, Molpro, BAGEL).
+
+The electronic structure programs have no server mode, so every energy/gradient is
+still a separate program run. What the pool keeps alive between calls are the runner
+threads, the per-node scratch directories (and with them the orbital/wavefunction
+files the programs read as guesses), and a uniform submit/collect interface so that
+the calculations of several nodes can be in flight at the same time.
+
+A Job is the command to run, the directory to run it in and an optional file that
+stdout is written to. The key identifies the job when collecting, the lots use
+(ID,node_id,multiplicity).
+'''
+
+Job = namedtuple('Job', ['key', 'cmd', 'cwd', 'stdout'])
+Job.__new__.__defaults__ = (None, None)
+
+
+class WorkerPool(object):
+    """ Thread pool running the external programs of file based level of theories """
+
+    def __init__(self, nworkers=1):
+        self.nworkers = nworkers
+        self.executor = ThreadPoolExecutor(max_workers=nworkers)
+        self.futures = {}
+        self.scratch_dirs = set()
+        self.lock = threading.Lock()
+
+    def scratch_dir(self, node_id, base='scratch'):
+        ''' persistent per-node scratch directory, only created once '''
+        dirname = os.path.join(base, str(node_id))
+        # remembered by absolute path, the pool outlives a change of working directory (campaigns)
+        absdir = os.path.abspath(dirname)
+        if absdir not in self.scratch_dirs:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            self.scratch_dirs.add(absdir)
+        return dirname
+
+    @staticmethod
+    def execute(job):
+        if job.stdout is not None:
+            with open(job.stdout, 'w') as out:
+                proc = subprocess.run(job.cmd, cwd=job.cwd, stdout=out, stderr=subprocess.PIPE, shell=isinstance(job.cmd, str))
+            output = None
+        else:
+            proc = subprocess.run(job.cmd, cwd=job.cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=isinstance(job.cmd, str))
+            output = proc.stdout
+        return proc.returncode, output, proc.stderr
+
+    def submit(self, job):
+        ''' Queue a job and return immediately '''
+        with self.lock:
+            if job.key in self.futures:
+                raise RuntimeError("job {} is already running".format(job.key))
+            self.futures[job.key] = self.executor.submit(self.execute, job)
+        return job.key
+
+    def collect(self, keys=None, check=True):
+        '''
+        Wait for the jobs with keys (all submitted jobs if None) and return {key: stdout}.
+        A failed job is reported, with check it also raises.
+        '''
+        with self.lock:
+            if keys is None:
+                keys = list(self.futures.keys())
+            futures = [(key, self.futures.pop(key)) for key in keys]
+        results = {}
+        for key, future in futures:
+            returncode, output, error = future.result()
+            if returncode != 0:
+                print(" job {} failed with return code {}".format(key, returncode))
+                if error:
+                    print(error.decode(errors='replace'))
+                if check:
+                    raise RuntimeError("job {} failed".format(key))
+            results[key] = output
+        return results
+
+    def run(self, job, check=True):
+        ''' Run a single job and wait for it '''
+        self.submit(job)
+        return self.collect([job.key], check)[job.key]
+
+    def resize(self, nworkers):
+        ''' grow the pool, jobs already queued finish on the old executor '''
+        if nworkers > self.nworkers:
+            old = self.executor
+            self.executor = ThreadPoolExecutor(max_workers=nworkers)
+            self.nworkers = nworkers
+            old.shutdown(wait=False)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+_pool = None
+
+
+def get_worker_pool(nworkers=None):
+    ''' The worker pool shared by all lot objects of this process '''
+    global _pool
+    if _pool is None:
+        _pool = WorkerPool(nworkers if nworkers is not None else 1)
+    elif nworkers is not None:
+        _pool.resize(nworkers)
+    return _pool
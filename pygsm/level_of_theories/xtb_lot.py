@@ -1,13 +1,14 @@
 # standard library imports
 import sys
 from os import path
+from concurrent.futures import ThreadPoolExecutor
 
 # third party
 import numpy as np
 from xtb.interface import Calculator
 from xtb.utils import get_method, get_solvent
 from xtb.interface import Environment
-from xtb.libxtb import VERBOSITY_FULL
+from xtb.libxtb import VERBOSITY_FULL, VERBOSITY_MUTED
 
 # local application imports
 sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
@@ -29,25 +30,58 @@ class xTB_lot(Lot):
             numbers.append(elem.atomic_num)
         self.numbers = np.asarray(numbers)
 
-    def run(self, geom, multiplicity, state, verbose=False):
-
-        # print('running!')
-        # sys.stdout.flush()
-        coords = manage_xyz.xyz_to_np(geom)
-
-        # convert to bohr
-        positions = coords * units.ANGSTROM_TO_AU
+        # the calculator of this node is built once and then only updated,
+        # the last result is the wavefunction guess of the next singlepoint
+        self.calc = None
+        self.res = None
+        # run_batch: key -> [calculator, result]
+        self.batch_calcs = {}
+
+    @classmethod
+    def copy(cls, lot, options, copy_wavefunction=True):
+        new_lot = cls(lot.options.copy().set_values(options))
+        if copy_wavefunction and lot.res is not None:
+            new_lot.res = lot.res.copy()
+        return new_lot
+
+    def new_calculator(self, positions):
         calc = Calculator(get_method(self.xTB_Hamiltonian), self.numbers, positions, charge=self.charge)
-
         calc.set_accuracy(self.xTB_accuracy)
         calc.set_electronic_temperature(self.xTB_electronic_temperature)
-
         if self.solvent is not None:
             calc.set_solvent(get_solvent(self.solvent))
+        calc.set_verbosity(VERBOSITY_MUTED)
+        return calc
 
-        calc.set_output('lot_jobs_{}.txt'.format(self.node_id))
-        res = calc.singlepoint()  # energy printed is only the electronic part
-        calc.release_output()
+    def singlepoint(self, coords, verbose=False):
+        ''' energy (Hartree) and gradient (Hartree/Bohr) at coords (Angstrom) with the node calculator '''
+
+        # convert to bohr
+        positions = coords * units.ANGSTROM_TO_AU
+        if self.calc is None:
+            self.calc = self.new_calculator(positions)
+        else:
+            self.calc.update(positions)
+
+        if verbose:
+            self.calc.set_verbosity(VERBOSITY_FULL)
+            self.calc.set_output('lot_jobs_{}.txt'.format(self.node_id))
+        try:
+            self.res = self.calc.singlepoint(self.res)  # energy printed is only the electronic part
+        except Exception:
+            # restarting from a bad wavefunction, e.g. after a large step
+            self.res = self.calc.singlepoint()
+        if verbose:
+            self.calc.release_output()
+            self.calc.set_verbosity(VERBOSITY_MUTED)
+        return self.res
+
+    def run(self, geom, multiplicity, state, verbose=False):
+
+        # print('running!')
+        # sys.stdout.flush()
+        coords = manage_xyz.xyz_to_np(geom)
+        res = self.singlepoint(coords, verbose)
 
         # energy in hartree
         self._Energies[(multiplicity, state)] = self.Energy(res.get_energy(), 'Hartree')
@@ -60,6 +94,37 @@ class xTB_lot(Lot):
 
         return res
 
+    def run_batch(self, geoms, multiplicity, state, keys=None, nproc=None):
+        '''
+        Energies (kcal/mol) and gradients (Hartree/Angstrom) of many geometries in one call.
+        Every key (e.g. string node) keeps its own calculator and wavefunction, so the next
+        call restarts each geometry from the previous result of its key. Without keys the
+        position in geoms is the key. The xtb library releases the GIL, so they run in threads.
+        '''
+        coords = [g if isinstance(g, np.ndarray) else manage_xyz.xyz_to_np(g) for g in geoms]
+        if keys is None:
+            keys = range(len(coords))
+        slots = [self.batch_calcs.setdefault(key, [None, None]) for key in keys]
+
+        def work(i):
+            slot = slots[i]
+            positions = coords[i] * units.ANGSTROM_TO_AU
+            if slot[0] is None:
+                slot[0] = self.new_calculator(positions)
+            else:
+                slot[0].update(positions)
+            try:
+                slot[1] = slot[0].singlepoint(slot[1])
+            except Exception:
+                slot[1] = slot[0].singlepoint()
+            return slot[1].get_energy()*units.KCAL_MOL_PER_AU, slot[1].get_gradient()*units.ANGSTROM_TO_AU
+
+        nproc = nproc if nproc is not None else self.nproc
+        if nproc > 1 and len(coords) > 1:
+            with ThreadPoolExecutor(max_workers=nproc) as executor:
+                return list(executor.map(work, range(len(coords))))
+        return [work(i) for i in range(len(coords))]
+
 
 if __name__ == "__main__":
 
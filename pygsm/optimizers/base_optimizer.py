@@ -10,6 +10,8 @@ sys.path.append(path.dirname( path.dirname( path.abspath(__file__))))
 from utilities import *
 from ._linesearch import backtrack,NoLineSearch
 
+log = logs.get_logger('optimizer')
+
 
 def sorted_eigh(mat, asc=False):
     """ 
@@ -170,7 +172,7 @@ class base_optimizer(object):
         opt.add_option(
                 key='print_level',
                 value=1,
-                doc="control the printout, 0 less, 1 more, 2 too much"
+                doc="control the printout, 0 less, 1 more, 2 too much (the optimizer log level is set to DEBUG)"
                 )
 
         opt.add_option(
@@ -486,13 +488,11 @@ class base_optimizer(object):
         if molecule.newHess>0: SCALE = self.options['SCALEQN']*molecule.newHess
         if self.options['SCALEQN']>10.0: SCALE=10.0
 
-        if self.options['print_level']>1:
-            print("new_hess %i" % molecule.newHess)
+        log.debug("new_hess %i", molecule.newHess)
 
         new_rows = []
-        if self.options['print_level']>1:
-            print("constraints")
-            print(molecule.constraints.T)
+        log.debug("constraints")
+        log.debug("%s", molecule.constraints.T)
 
         P =np.eye(len(molecule.constraints),dtype=float) 
         for c in molecule.constraints.T:
@@ -503,16 +503,12 @@ class base_optimizer(object):
         gqe = np.dot(v_temp.T,g)
         lambda1 = self.set_lambda1('NOT-TS',e) 
 
-        if self.options['print_level']>1:
-            print(" eigenvalues ",e)
-        if self.options['print_level']>1:
-            print(" eigenvectors ",v_temp)
+        log.debug(' eigenvalues  %s', e)
+        log.debug(' eigenvectors  %s', v_temp)
 
-        if self.options['print_level']>1:
-            print(" g ",g.T)
+        log.debug(' g  %s', g.T)
 
-        if self.options['print_level']>1:
-            print(" gqe ",gqe.T)
+        log.debug(' gqe  %s', gqe.T)
 
         dqe0 = -gqe.flatten()/(e+lambda1)/SCALE
         dqe0 = [ np.sign(i)*self.options['MAXAD'] if abs(i)>self.options['MAXAD'] else i for i in dqe0 ]
@@ -529,8 +525,7 @@ class base_optimizer(object):
 
         #print("check overlap")
         #print(np.dot(dq.T,molecule.constraints))
-        if self.options['print_level']>1:
-            print(" dq ",dq.T)
+        log.debug(' dq  %s', dq.T)
         return np.reshape(dq,(-1,1))
 
     # need to modify this only for the DLC region
@@ -622,11 +617,10 @@ class base_optimizer(object):
 
         if molecule.coord_obj.__class__.__name__=='DelocalizedInternalCoordinates':
             molecule.update_Primitive_Hessian(change=change)
-            if self.options['print_level']>1:
-                print("change")
-                print(change)
-                print(" updated primitive internals Hessian")
-                print(molecule.Primitive_Hessian)
+            log.debug("change")
+            log.debug("%s", change)
+            log.debug(" updated primitive internals Hessian")
+            log.debug("%s", molecule.Primitive_Hessian)
             if mode=='BFGS':
                 molecule.form_Hessian_in_basis()
             if mode=='BOFILL':
@@ -645,10 +639,9 @@ class base_optimizer(object):
             raise NotImplementedError
 
     def update_bfgsp(self,molecule):
-        if self.options['print_level']>1:
-            print("In update bfgsp")
-            print('dx_prim ',self.dx_prim.T)
-            print('dg_prim ',self.dg_prim.T)
+        log.debug("In update bfgsp")
+        log.debug('dx_prim  %s', self.dx_prim.T)
+        log.debug('dg_prim  %s', self.dg_prim.T)
 
         Hdx = np.dot(molecule.Primitive_Hessian, self.dx_prim)
         dxHdx = np.dot(np.transpose(self.dx_prim),Hdx)
@@ -656,12 +649,11 @@ class base_optimizer(object):
         dgtdx = np.dot(np.transpose(self.dg_prim),self.dx_prim)
         change = np.zeros_like(molecule.Primitive_Hessian)
 
-        if self.options['print_level']>1:
-            print("Hdx")
-            print(Hdx.T)
-            print("dgtdx: %1.8f dxHdx: %1.8f dgdg" % (dgtdx,dxHdx))
-            print("dgdg")
-            print(dgdg)
+        log.debug("Hdx")
+        log.debug("%s", Hdx.T)
+        log.debug("dgtdx: %1.8f dxHdx: %1.8f dgdg", dgtdx, dxHdx)
+        log.debug("dgdg")
+        log.debug("%s", dgdg)
 
         if dgtdx>0.:
             if dgtdx<0.001: dgtdx=0.001
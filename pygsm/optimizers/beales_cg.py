@@ -15,6 +15,8 @@ import numpy as np
 from ._linesearch import backtrack,NoLineSearch,double_golden_section
 from .base_optimizer import base_optimizer
 from utilities import *
+
+log = logs.get_logger('optimizer')
 from .eigenvector_follow import eigenvector_follow
 
 
@@ -41,6 +43,13 @@ class beales_cg(base_optimizer):
         energies=[]
         geoms.append(molecule.geometry)
         energies.append(molecule.energy-refE)
+
+        # frames are appended to the trajectory in the background
+        traj = trajectory.get_trajectory_writer()
+        xyzfile = 'opt_{}.xyz'.format(molecule.node_id)
+        traj.open(xyzfile)
+        traj.append(xyzfile,geoms[0],energies[0])
+
         self.initial_step = True
         self.disp = 1000.
         self.Ediff = 1000.
@@ -74,7 +83,8 @@ class beales_cg(base_optimizer):
         update_hess=False
 
         for ostep in range(opt_steps):
-            print(" On opt step {} ".format(ostep+1))
+            log.info(" On opt step %s ", ostep+1)
+            profiler.get_profiler().count('optimizer steps')
 
             if update_hess and self.options['update_hess_in_bg']:
                 if opt_type!='TS':
@@ -104,11 +114,11 @@ class beales_cg(base_optimizer):
 
             # normalize the direction
             stepsize = np.linalg.norm(d)
-            print(" stepsize = %1.2f"% stepsize)
+            log.info(" stepsize = %1.2f", stepsize)
             d = d/stepsize #normalize
             if stepsize>self.DMAX:
                 stepsize=self.DMAX
-                print(" reducing step, new step = %1.2f" %stepsize)
+                log.info(" reducing step, new step = %1.2f", stepsize)
 
             # store
             xp = x.copy()
@@ -121,10 +131,9 @@ class beales_cg(base_optimizer):
             constraint_steps = self.get_constraint_steps(molecule,opt_type,g)
 
             # line search
-            print(" Linesearch")
-            sys.stdout.flush()
+            log.info(" Linesearch")
             ls = self.Linesearch(n, x, fx, g, d, stepsize, xp, constraint_steps,self.linesearch_parameters,molecule,verbose)
-            print(" Done linesearch")
+            log.info(" Done linesearch")
 
 
             # save new values from linesearch
@@ -153,7 +162,7 @@ class beales_cg(base_optimizer):
            
             # dE 
             dEstep = fx - fxp
-            print(" dEstep=%5.4f" %dEstep)
+            log.info(" dEstep=%5.4f", dEstep)
 
             # revert to the previous point
             if ls['status'] < 0 or dEstep>0.:
@@ -186,7 +195,7 @@ class beales_cg(base_optimizer):
             if ostep % xyzframerate==0:
                 geoms.append(molecule.geometry)
                 energies.append(molecule.energy-refE)
-                manage_xyz.write_xyzs_w_comments('opt_{}.xyz'.format(molecule.node_id),geoms,energies,scale=1.)
+                traj.append(xyzfile,geoms[-1],energies[-1])
 
             # save variables for update Hessian! 
             if not molecule.coord_obj.__class__.__name__=='CartesianCoordinates' or self.options['update_hess_in_bg']:
@@ -197,7 +206,8 @@ class beales_cg(base_optimizer):
                 raise NotImplementedError(" ef not implemented for CART")
 
             if self.options['print_level']>0:
-                print(" Opt step: %d E: %5.4f gradrms: %1.5f ss: %1.3f DMAX: %1.3f" % (ostep+1,fx-refE,molecule.gradrms,step,self.options['DMAX']))
+                log.info(" Opt step: %d E: %5.4f gradrms: %1.5f ss: %1.3f DMAX: %1.3f", ostep+1, fx-refE, molecule.gradrms, step, self.options['DMAX'])
+            logs.event('opt_step', node=molecule.node_id,step=ostep+1,energy=fx-refE,gradrms=molecule.gradrms,ss=step,DMAX=self.options['DMAX'])
             self.buf.write(u' Opt step: %d E: %5.4f gradrms: %1.5f ss: %1.3f DMAX: %1.3f\n' % (ostep+1,fx-refE,molecule.gradrms,step,self.options['DMAX']))
 
             #gmax = np.max(g)/ANGSTROM_TO_AU/units.KCAL_MOL_PER_AU
@@ -212,7 +222,7 @@ class beales_cg(base_optimizer):
             molecule.gradrms = np.sqrt(np.dot(g.T,g)/n)
             gmax = float(np.max(g))
             disp = float(np.linalg.norm((xyz-xyzp).flatten()))
-            print(" gmax %5.4f disp %5.4f Ediff %5.4f gradrms %5.4f\n" % (gmax,disp,dEstep,molecule.gradrms))
+            log.info(" gmax %5.4f disp %5.4f Ediff %5.4f gradrms %5.4f\n", gmax, disp, dEstep, molecule.gradrms)
 
             self.converged=False
             if self.opt_cross and abs(dE)<self.conv_dE and molecule.gradrms < self.conv_grms and abs(gmax) < self.conv_gmax and abs(dEstep) < self.conv_Ediff and abs(disp) < self.conv_disp and ls['status']==0:
@@ -225,14 +235,13 @@ class beales_cg(base_optimizer):
                 if ostep % xyzframerate!=0:
                     geoms.append(molecule.geometry)
                     energies.append(molecule.energy-refE)
-                    manage_xyz.write_xyzs_w_comments('opt_{}.xyz'.format(molecule.node_id),geoms,energies,scale=1.)
+                    traj.append(xyzfile,geoms[-1],energies[-1])
                 break
 
             #update DLC  --> this changes q, g, Hint
             if not molecule.coord_obj.__class__.__name__=='CartesianCoordinates':
                 if opt_type == 'SEAM' or opt_type=="MECI":
-                    print(" updating DLC") 
-                    sys.stdout.flush()
+                    log.info(" updating DLC")
                     #if opt_type=="ICTAN":
                     constraints = self.get_constraint_vectors(molecule,opt_type,ictan)
                     molecule.update_coordinate_basis(constraints=constraints)
@@ -242,13 +251,12 @@ class beales_cg(base_optimizer):
                     fx = molecule.energy
                     dE = molecule.difference_energy
                     if dE != 1000.:
-                        print(" difference energy is %5.4f" % dE)
+                        log.info(" difference energy is %5.4f", dE)
                     g = molecule.gradient.copy()
                     if nconstraints>0:
                         g = g - np.dot(g.T,molecule.constraints)*molecule.constraints
                     g_prim = block_matrix.dot(molecule.coord_basis,g)
-                    print(" Done update")
-            sys.stdout.flush()
+                    log.info(" Done update")
 
         print(" opt-summary")
         print(self.buf.getvalue())
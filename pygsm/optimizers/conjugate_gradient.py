@@ -16,6 +16,8 @@ from ._linesearch import backtrack,NoLineSearch
 from .base_optimizer import base_optimizer
 from utilities import *
 
+log = logs.get_logger('optimizer')
+
 class conjugate_gradient(base_optimizer):
 
     def optimize(self,molecule,refE=0.,opt_type='UNCONSTRAINED',opt_steps=3,ictan=None):
@@ -61,7 +63,8 @@ class conjugate_gradient(base_optimizer):
             return geoms,energies
 
         for ostep in range(opt_steps):
-            print(" On opt step {} ".format(ostep+1))
+            log.info(" On opt step %s ", ostep+1)
+            profiler.get_profiler().count('optimizer steps')
 
             if self.initial_step==True:
                 # d: store the negative gradient of the object function on point x.
@@ -76,7 +79,7 @@ class conjugate_gradient(base_optimizer):
                 deltanew = np.dot(dnew.T,dnew)
                 deltaold=np.dot(-gp_prim.T,-gp_prim)
                 beta = deltanew/deltaold
-                print(" beta = %1.2f" % beta)
+                log.info(" beta = %1.2f", beta)
                 d_prim = dnew + beta*d_prim
 
             # form in DLC basis (does nothing if cartesian)
@@ -84,11 +87,11 @@ class conjugate_gradient(base_optimizer):
 
             # normalize the direction
             actual_step = np.linalg.norm(d)
-            print(" actual_step= %1.2f"% actual_step)
+            log.info(" actual_step= %1.2f", actual_step)
             d = d/actual_step #normalize
             if actual_step>self.options['DMAX']:
                 step=self.options['DMAX']
-                print(" reducing step, new step = %1.2f" %step)
+                log.info(" reducing step, new step = %1.2f", step)
             else:
                 step=actual_step
 
@@ -103,9 +106,9 @@ class conjugate_gradient(base_optimizer):
             constraint_steps = self.get_constraint_steps(molecule,opt_type,g)
 
             # line search
-            print(" Linesearch")
+            log.info(" Linesearch")
             ls = self.Linesearch(n, x, fx, g, d, step, xp, gp,constraint_steps,self.linesearch_parameters,molecule)
-            print(" Done linesearch")
+            log.info(" Done linesearch")
             
             # revert to the previous point
             if ls['status'] < 0:
@@ -133,7 +136,7 @@ class conjugate_gradient(base_optimizer):
 
             # dE 
             dEstep = fx - fxp
-            print(" dEstep=%5.4f" %dEstep)
+            log.info(" dEstep=%5.4f", dEstep)
 
             # update molecule xyz
             xyz = molecule.update_xyz(x-xp)
@@ -141,7 +144,8 @@ class conjugate_gradient(base_optimizer):
             energies.append(molecule.energy-refE)
 
             if self.options['print_level']>0:
-                print(" Opt step: %d E: %5.4f gradrms: %1.5f ss: %1.3f DMAX: %1.3f" % (ostep+1,fx-refE,molecule.gradrms,step,self.options['DMAX']))
+                log.info(" Opt step: %d E: %5.4f gradrms: %1.5f ss: %1.3f DMAX: %1.3f", ostep+1, fx-refE, molecule.gradrms, step, self.options['DMAX'])
+            logs.event('opt_step', node=molecule.node_id,step=ostep+1,energy=fx-refE,gradrms=molecule.gradrms,ss=step,DMAX=self.options['DMAX'])
             self.buf.write(u' Opt step: %d E: %5.4f gradrms: %1.5f ss: %1.3f DMAX: %1.3f\n' % (ostep+1,fx-refE,molecule.gradrms,step,self.options['DMAX']))
 
             #gmax = np.max(g)/units.ANGSTROM_TO_AU/KCAL_MOL_PER_AU
@@ -149,8 +153,8 @@ class conjugate_gradient(base_optimizer):
             gmax = np.max(g)/units.ANGSTROM_TO_AU
             self.disp = np.max(x - xp)/units.ANGSTROM_TO_AU
             self.Ediff = fx -fxp / KCAL_MOL_PER_AU
-            print(" maximum displacement component %1.2f (au)" % self.disp)
-            print(" maximum gradient component %1.2f (au)" % gmax)
+            log.info(" maximum displacement component %1.2f (au)", self.disp)
+            log.info(" maximum gradient component %1.2f (au)", gmax)
 
             # check for convergence TODO
             molecule.gradrms = np.sqrt(np.dot(g[nconstraints:].T,g[nconstraints:])/n)
@@ -175,7 +179,7 @@ class conjugate_gradient(base_optimizer):
                 fx = molecule.energy
                 dE = molecule.difference_energy
                 if dE != 1000.:
-                    print(" difference energy is %5.4f" % dE)
+                    log.info(" difference energy is %5.4f", dE)
                 g = molecule.gradient.copy()
                 molecule.form_Hessian_in_basis()
             print()
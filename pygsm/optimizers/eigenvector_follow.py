@@ -16,6 +16,8 @@ from ._linesearch import backtrack,NoLineSearch,golden_section
 from .base_optimizer import base_optimizer
 from utilities import *
 
+log = logs.get_logger('optimizer')
+
 class eigenvector_follow(base_optimizer):
 
     def optimize(
@@ -37,6 +39,12 @@ class eigenvector_follow(base_optimizer):
         geoms.append(molecule.geometry)
         energies.append(molecule.energy-refE)
 
+        # frames are appended to the trajectory in the background
+        traj = trajectory.get_trajectory_writer()
+        xyzfile = 'opt_{}.xyz'.format(molecule.node_id)
+        traj.open(xyzfile)
+        traj.append(xyzfile,geoms[0],energies[0])
+
         # stash/initialize some useful attributes
         self.check_inputs(molecule,opt_type,ictan)
         nconstraints=self.get_nconstraints(opt_type)
@@ -81,7 +89,8 @@ class eigenvector_follow(base_optimizer):
 
         # ====>  Do opt steps <======= #
         for ostep in range(opt_steps):
-            print(" On opt step {} for node {}".format(ostep+1,molecule.node_id))
+            log.info(" On opt step %s for node %s", ostep+1, molecule.node_id)
+            profiler.get_profiler().count('optimizer steps')
 
             # update Hess
             if update_hess:
@@ -179,7 +188,7 @@ class eigenvector_follow(base_optimizer):
 
             # control step size 
             dEstep = fx - fxp
-            print(" dEstep=%5.4f" %dEstep)
+            log.info(" dEstep=%5.4f", dEstep)
             ratio = dEstep/dEpre
             molecule.gradrms = np.sqrt(np.dot(gc.T,gc)/n)
             if ls['status'] !=-2:  
@@ -190,7 +199,7 @@ class eigenvector_follow(base_optimizer):
             if ostep % xyzframerate==0:
                 geoms.append(molecule.geometry)
                 energies.append(molecule.energy-refE)
-                manage_xyz.write_xyzs_w_comments('opt_{}.xyz'.format(molecule.node_id),geoms,energies,scale=1.)
+                traj.append(xyzfile,geoms[-1],energies[-1])
 
             # save variables for update Hessian! 
             if not molecule.coord_obj.__class__.__name__=='CartesianCoordinates':
@@ -208,14 +217,15 @@ class eigenvector_follow(base_optimizer):
                 raise NotImplementedError(" ef not implemented for CART")
 
             if self.options['print_level']>0:
-                print(" Node: %d Opt step: %d E: %5.4f predE: %5.4f ratio: %1.3f gradrms: %1.5f ss: %1.3f DMAX: %1.3f" % (molecule.node_id,ostep+1,fx-refE,dEpre,ratio,molecule.gradrms,step,self.DMAX))
+                log.info(" Node: %d Opt step: %d E: %5.4f predE: %5.4f ratio: %1.3f gradrms: %1.5f ss: %1.3f DMAX: %1.3f", molecule.node_id, ostep+1, fx-refE, dEpre, ratio, molecule.gradrms, step, self.DMAX)
+            logs.event('opt_step', node=molecule.node_id,step=ostep+1,energy=fx-refE,predE=dEpre,ratio=ratio,gradrms=molecule.gradrms,ss=step,DMAX=self.DMAX)
             self.buf.write(u' Node: %d Opt step: %d E: %5.4f predE: %5.4f ratio: %1.3f gradrms: %1.5f ss: %1.3f DMAX: %1.3f\n' % (molecule.node_id,ostep+1,fx-refE,dEpre,ratio,molecule.gradrms,step,self.DMAX))
 
             # check for convergence TODO
             fx = molecule.energy
             dE = molecule.difference_energy
             if dE< 1000.:
-                print(" difference energy is %5.4f" % dE)
+                log.info(" difference energy is %5.4f", dE)
             gmax = float(np.max(np.absolute(gc)))
             disp = float(np.linalg.norm((xyz-xyzp).flatten()))
             xnorm = np.sqrt(np.dot(x.T, x))
@@ -223,7 +233,7 @@ class eigenvector_follow(base_optimizer):
             if xnorm < 1.0:
             	xnorm = 1.0
 
-            print(" gmax %5.4f disp %5.4f Ediff %5.4f gradrms %5.4f\n" % (gmax,disp,dEstep,molecule.gradrms))
+            log.info(" gmax %5.4f disp %5.4f Ediff %5.4f gradrms %5.4f\n", gmax, disp, dEstep, molecule.gradrms)
             self.converged=False
 
             #TODO turn back on conv_DE
@@ -242,7 +252,7 @@ class eigenvector_follow(base_optimizer):
                 if ostep % xyzframerate!=0:
                     geoms.append(molecule.geometry)
                     energies.append(molecule.energy-refE)
-                    manage_xyz.write_xyzs_w_comments('opt_{}.xyz'.format(molecule.node_id),geoms,energies,scale=1.)
+                    traj.append(xyzfile,geoms[-1],energies[-1])
                 break
 
             #update DLC  --> this changes q, g, Hint
@@ -257,7 +267,6 @@ class eigenvector_follow(base_optimizer):
                     for c in molecule.constraints.T:
                         gc -= np.dot(gc.T,c[:,np.newaxis])*c[:,np.newaxis]
             print()
-            sys.stdout.flush()
        
         print(" opt-summary {}".format(molecule.node_id))
         print(self.buf.getvalue())
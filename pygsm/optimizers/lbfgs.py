@@ -10,13 +10,14 @@ except:
 
 # third party
 import numpy as np
-from scipy.optimize.lbfgsb import LbfgsInvHessProduct
 
 # local application imports
 from ._linesearch import backtrack,NoLineSearch
 from .base_optimizer import base_optimizer
 from utilities import *
 
+log = logs.get_logger('optimizer')
+
 class iterationData:
     """docstring for iterationData"""
     def __init__(self, alpha, s, y):
@@ -50,6 +51,12 @@ class lbfgs(base_optimizer):
         energies=[]
         geoms.append(molecule.geometry)
         energies.append(molecule.energy-refE)
+
+        # frames are appended to the trajectory in the background
+        traj = trajectory.get_trajectory_writer()
+        xyzfile = 'opt_{}.xyz'.format(molecule.node_id)
+        traj.open(xyzfile)
+        traj.append(xyzfile,geoms[0],energies[0])
         self.check_inputs(molecule,opt_type,ictan)
         nconstraints=self.get_nconstraints(opt_type)
         self.buf = StringIO()
@@ -107,7 +114,8 @@ class lbfgs(base_optimizer):
                 self.lm.append(iterationData(0.0, s_prim.flatten(), y_prim.flatten()))
        
         for ostep in range(opt_steps):
-            print(" On opt step {} ".format(ostep+1))
+            log.info(" On opt step %s ", ostep+1)
+            profiler.get_profiler().count('optimizer steps')
 
 
             SCALE =self.options['SCALEQN']
@@ -124,6 +132,8 @@ class lbfgs(base_optimizer):
                 bound = min(self.k, maxcor)
                 s_prim = np.array([self.lm[i].s_prim.flatten() for i in range(maxcor)])
                 y_prim = np.array([self.lm[i].y_prim.flatten() for i in range(maxcor)])
+                # scipy.optimize takes a third of a second to import, only pay for it when used
+                from scipy.optimize.lbfgsb import LbfgsInvHessProduct
                 hess_inv = LbfgsInvHessProduct(s_prim[:bound],y_prim[:bound])
                 # compute the negative gradients
                 d_prim = -g_prim
@@ -140,11 +150,11 @@ class lbfgs(base_optimizer):
 
             # normalize the direction
             actual_step = np.linalg.norm(d)
-            print(" actual_step= %1.5f"% actual_step)
+            log.info(" actual_step= %1.5f", actual_step)
             d = d/actual_step #normalize
             if actual_step>self.DMAX:
                 step=self.DMAX
-                print(" reducing step, new step = %1.5f" %step)
+                log.info(" reducing step, new step = %1.5f", step)
             else:
                 step=actual_step
 
@@ -183,9 +193,9 @@ class lbfgs(base_optimizer):
             #if abs(dEpre)<0.05:
             #    dEpre = np.sign(dEpre)*0.05
             ratio = dEstep/dEpre
-            print(" dEstep=%5.4f" %dEstep)
-            print(" dEpre=%5.4f" %dEpre)
-            print(" ratio=%5.4f" %ratio)
+            log.info(" dEstep=%5.4f", dEstep)
+            log.info(" dEpre=%5.4f", dEpre)
+            log.info(" ratio=%5.4f", ratio)
 
             # revert to the privious point
             if ls['status'] < 0 or (ratio<0. and opt_type!='CLIMB'):
@@ -245,7 +255,7 @@ class lbfgs(base_optimizer):
 
             dE = molecule.difference_energy
             if dE < 100.:
-                print(" difference energy is %5.4f" % dE)
+                log.info(" difference energy is %5.4f", dE)
             molecule.gradrms = np.sqrt(np.dot(gc.T,gc)/num_coords)
 
 
@@ -279,15 +289,16 @@ class lbfgs(base_optimizer):
             if ostep % xyzframerate==0:
                 geoms.append(molecule.geometry)
                 energies.append(molecule.energy-refE)
-                manage_xyz.write_xyzs_w_comments('opt_{}.xyz'.format(molecule.node_id),geoms,energies,scale=1.)
+                traj.append(xyzfile,geoms[-1],energies[-1])
 
             if self.options['print_level']>0:
-                print(" Node: %d Opt step: %d E: %5.4f predE: %5.4f ratio: %1.3f gradrms: %1.5f ss: %1.3f DMAX: %1.3f" % (molecule.node_id,ostep+1,fx-refE,dEpre,ratio,molecule.gradrms,step,self.DMAX))
+                log.info(" Node: %d Opt step: %d E: %5.4f predE: %5.4f ratio: %1.3f gradrms: %1.5f ss: %1.3f DMAX: %1.3f", molecule.node_id, ostep+1, fx-refE, dEpre, ratio, molecule.gradrms, step, self.DMAX)
+            logs.event('opt_step', node=molecule.node_id,step=ostep+1,energy=fx-refE,predE=dEpre,ratio=ratio,gradrms=molecule.gradrms,ss=step,DMAX=self.DMAX)
             self.buf.write(u' Node: %d Opt step: %d E: %5.4f predE: %5.4f ratio: %1.3f gradrms: %1.5f ss: %1.3f DMAX: %1.3f\n' % (molecule.node_id,ostep+1,fx-refE,dEpre,ratio,molecule.gradrms,step,self.DMAX))
 
             gmax = float(np.max(np.absolute(gc)))
             disp = float(np.linalg.norm((xyz-self.xyzp).flatten()))
-            print(" gmax %5.4f disp %5.4f dEstep %5.4f gradrms %5.4f\n" % (gmax,disp,dEstep,molecule.gradrms))
+            log.info(" gmax %5.4f disp %5.4f dEstep %5.4f gradrms %5.4f\n", gmax, disp, dEstep, molecule.gradrms)
             self.converged=False
             if self.opt_cross and abs(dE)<self.conv_dE and molecule.gradrms < self.conv_grms and abs(gmax) < self.conv_gmax and abs(dEstep) < self.conv_Ediff and abs(disp) < self.conv_disp and ls['status']==0:
                 self.converged=True
@@ -304,7 +315,7 @@ class lbfgs(base_optimizer):
                 if ostep % xyzframerate!=0:
                     geoms.append(molecule.geometry)
                     energies.append(molecule.energy-refE)
-                    manage_xyz.write_xyzs_w_comments('opt_{}.xyz'.format(molecule.node_id),geoms,energies,scale=1.)
+                    traj.append(xyzfile,geoms[-1],energies[-1])
                 break
             #print " ########## DONE WITH TOTAL STEP #########"
 
@@ -1,5 +1,22 @@
-#__all__=['PES','Avg_PES','Penalty_PES']
-from .pes import PES
-from .avg_pes import Avg_PES
-from .penalty_pes import Penalty_PES
-#from .md_penalty_pes import MD_Penalty_PES
+import importlib
+
+# The PES types are imported when first used, so a job only loads the one it runs
+_classes = {
+        'PES': '.pes',
+        'Avg_PES': '.avg_pes',
+        'Penalty_PES': '.penalty_pes',
+        #'MD_Penalty_PES': '.md_penalty_pes',
+        }
+__all__ = list(_classes)
+
+
+def __getattr__(name):
+    if name not in _classes:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_classes[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -285,26 +285,16 @@ class Avg_PES(PES):
 
 
     def fill_energy_grid2d(self,
-            xyz_grid
+            xyz_grid,
+            nproc=1,
+            outfile=None,
             ):
+        ''' Energies of both states on a grid of geometries, see PES.fill_energy_grid2d '''
+        energies = self._fill_grid2d(xyz_grid,2,nproc,outfile)
+        return energies[...,0],energies[...,1]
 
-        assert xyz_grid.shape[-1] == len(self.lot.geom)*3, "xyz nneds to be 3*natoms long"
-        assert xyz_grid.ndim == 3, " xyzgrid needs to be a tensor with 3 dimensions"
-
-        E1 = np.zeros((xyz_grid.shape[0],xyz_grid.shape[1]))
-        E2 = np.zeros((xyz_grid.shape[0],xyz_grid.shape[1]))
-
-        rc=0
-        for mat in xyz_grid:
-            cc=0
-            for row in mat:
-                xyz = np.reshape(row,(-1,3))
-                E1[rc,cc] = self.PES1.get_energy(xyz)
-                E2[rc,cc] = self.PES2.get_energy(xyz)
-                cc+=1
-            rc+=1
-         
-        return E1,E2
+    def grid_point_energies(self,xyz):
+        return [self.PES1.get_energy(xyz),self.PES2.get_energy(xyz)]
 
 
 if __name__ == '__main__':
@@ -1,6 +1,8 @@
 # standard library imports
 import sys
+import os
 from os import path
+import multiprocessing as mp
 
 # third party
 import numpy as np
@@ -89,6 +91,8 @@ class PES(object):
         self.FORCE = self.options['FORCE']
         self.RESTRAINTS = self.options['RESTRAINTS']
         self._dE=1000.
+        # (xyz,E,grad) from a batched evaluation, used by get_energy/get_gradient at those coordinates
+        self.batch_cache = None
         #print ' PES object parameters:'
         #print ' Multiplicity:',self.multiplicity,'ad_idx:',self.ad_idx
 
@@ -136,27 +140,124 @@ class PES(object):
         return xyz_grid,xv,yv
 
 
-    #def fill_energy_grid2d(self,xyz_grid):
     def fill_energy_grid2d(self,
-            xyz_grid
+            xyz_grid,
+            nproc=1,
+            outfile=None,
             ):
+        ''' Energies (kcal/mol) on a grid of geometries e.g. from create_2dgrid or 
+        DelocalizedInternalCoordinates.create2dxyzgrid.
 
+        Params:
+            xyz_grid ((ny,nx,3*natoms) np.ndarray) 
+            nproc number of processes to distribute the grid points over
+            outfile .npy file the energies are streamed to as they are computed. Points that 
+                are already in the file (not NaN) are not recomputed, so an interrupted scan can be resumed 
+
+        Returns:
+            energies ((ny,nx) np.ndarray)
+        '''
+        return self._fill_grid2d(xyz_grid,1,nproc,outfile)[...,0]
+
+    def grid_point_energies(self,xyz):
+        ''' energies stored at each grid point by fill_energy_grid2d '''
+        return [self.get_energy(xyz)]
+
+    def _fill_grid2d(self,xyz_grid,nvalues,nproc,outfile):
         assert xyz_grid.shape[-1] == len(self.lot.geom)*3, "xyz nneds to be 3*natoms long"
         assert xyz_grid.ndim == 3, " xyzgrid needs to be a tensor with 3 dimensions"
 
-        energies = np.zeros((nx,ny))
-        rc=0
-        for mat in xyz_grid:
-            cc=0
-            for row in mat:
-                xyz = np.reshape(row,(-1,3))
-                energies[rc,cc] = self.lot.get_energy(xyz,self.multiplicity,self.ad_idx)
-                cc+=1
-            rc+=1
-         
-        return energies
+        shape = (xyz_grid.shape[0],xyz_grid.shape[1],nvalues)
+        if outfile is None:
+            energies = np.full(shape,np.nan)
+        elif path.exists(outfile):
+            energies = np.lib.format.open_memmap(outfile,mode='r+')
+            if energies.shape != shape:
+                raise RuntimeError("{} has shape {} but the grid needs {}".format(outfile,energies.shape,shape))
+            print(" read %i of %i grid points from %s" % (np.sum(~np.isnan(energies).any(axis=-1)),shape[0]*shape[1],outfile))
+        else:
+            energies = np.lib.format.open_memmap(outfile,mode='w+',dtype=float,shape=shape)
+            energies[:] = np.nan
+            energies.flush()
+
+        tasks = [ (rc,cc,np.reshape(xyz_grid[rc,cc],(-1,3))) for rc in range(shape[0]) for cc in range(shape[1]) if np.isnan(energies[rc,cc]).any() ]
+
+        def store(rc,cc,values):
+            energies[rc,cc] = values
+            if outfile is not None:
+                energies.flush()
+
+        if nproc>1 and len(tasks)>1:
+            print(" distributing %i grid points over %i processes" % (len(tasks),nproc))
+            counter = mp.Value('i',0)
+            pool = mp.Pool(processes=nproc,initializer=_init_pes_worker,initargs=(self,counter))
+            try:
+                for rc,cc,values in pool.imap_unordered(_grid_point,tasks):
+                    store(rc,cc,values)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for task in tasks:
+                store(*_grid_point(task,self))
+
+        return np.array(energies)
+
+    def get_energies_gradients(self,xyz_stack,nodes=None):
+        '''
+        Energies (kcal/mol) and gradients (Ha/ang) of a stack of geometries (nimages,natoms,3)
+        in one call to the lot. Returns energies (nimages,) and gradients (nimages,3*natoms,1)
+        The gradient and an equal share of the lot time of every geometry are filed under its
+        entry of nodes, by default the current node of the profiler. Given nodes are also the
+        keys of the geometries for lot.run_batch.
+        '''
+        prof = profiler.get_profiler()
+        keys = nodes
+        if nodes is None:
+            nodes = [prof.labels()[0]]*len(xyz_stack)
+        if self.FORCE is not None or self.RESTRAINTS is not None:
+            results = []
+            for n,xyz in zip(nodes,xyz_stack):
+                with prof.scope(node=n):
+                    results.append((self.get_energy(xyz),self.get_gradient(xyz)))
+        else:
+            with prof.shared_timer('lot.run_batch',nodes):
+                results = self.lot.run_batch([np.asarray(xyz) for xyz in xyz_stack],self.multiplicity,self.ad_idx,keys=keys)
+            for n in nodes:
+                with prof.scope(node=n):
+                    prof.count('gradients')
+        energies = np.array([ E for E,_ in results ])
+        gradients = np.array([ np.reshape(grad,(-1,1)) for _,grad in results ])
+        return energies,gradients
+
+    def cache_batch_result(self,xyz,E,grad):
+        self.batch_cache = (np.copy(xyz),E,np.copy(grad))
+
+    def cached(self,xyz):
+        if self.batch_cache is not None and np.array_equal(self.batch_cache[0],xyz):
+            profiler.get_profiler().count('pes cache hits')
+            return self.batch_cache
+        return None
+
+    def lot_holds(self,xyz):
+        ''' True if the lot has just computed xyz '''
+        return getattr(self.lot,'hasRanForCurrentCoords',False) and np.array_equal(getattr(self.lot,'currentCoords',None),xyz)
+
+    def holds(self,xyz):
+        ''' True if the energy and gradient at xyz need no new calculation, from the batch cache or the lot '''
+        return (self.batch_cache is not None and np.array_equal(self.batch_cache[0],xyz)) or self.lot_holds(xyz)
+
+    def count_lot_call(self,xyz):
+        ''' file a call of the lot at xyz as a 'lot memo hit' if it has just computed xyz, otherwise as one of the 'gradients' '''
+        if self.lot_holds(xyz):
+            profiler.get_profiler().count('lot memo hits')
+        else:
+            profiler.get_profiler().count('gradients')
 
     def get_energy(self,xyz):
+        cache = self.cached(xyz)
+        if cache is not None:
+            return cache[1]
         fdE=0.
         if self.FORCE is not None:
             for i in self.FORCE:
@@ -172,22 +273,41 @@ class PES(object):
                 a=i[0]
                 force=i[1]   # In kcal/mol/Ang^2?
                 kdE += 0.5*force*(xyz[a] - self.reference_xyz[a])**2
-        return self.lot.get_energy(xyz,self.multiplicity,self.ad_idx) +fdE +kdE   # Kcal/mol
+        self.count_lot_call(xyz)
+        with profiler.get_profiler().timer('lot.get_energy'):
+            E = self.lot.get_energy(xyz,self.multiplicity,self.ad_idx)
+        return E +fdE +kdE   # Kcal/mol
+
 
+    def get_hessian(self,xyz):
+        ''' Cartesian Hessian in Ha/ang^2, consistent with get_gradient.
+        Uses the analytic Hessian of the lot if it has one, otherwise the finite difference Hessian.
+        '''
+        if hasattr(self.lot,'get_hessian'):
+            return self.lot.get_hessian(xyz,self.multiplicity,self.ad_idx)
+        # finite difference hessian product is in Ha/(bohr*ang)
+        return self.get_finite_difference_hessian(xyz)*units.ANGSTROM_TO_AU
 
-    def get_finite_difference_hessian(self,coords,qm_region=None):
+    def get_finite_difference_hessian(self,coords,qm_region=None,nproc=1,fd_type='central',symmetrize=False,checkpoint=None,FD_STEP_LENGTH=0.001):
         ''' Calculate Finite Differnce Hessian
 
         Params:
             coords ((natoms,3) np.ndarray - system coordinates  (x,y,z)
             qm_region list of QM atoms in a QMMM simulation to obtain environment perturbed Hessian with the size of the QM region
+            nproc number of processes to distribute the displaced gradients over. Each process works on its own 
+                copy of the PES (lot node_id = FD_NODE_ID_OFFSET + process) so file based lots don't share scratch files 
+            fd_type 'central' uses +/- displacements (2 gradients per row), 'forward' reuses the gradient at coords 
+                for every row (1 gradient per row + 1)
+            symmetrize return (H+H^T)/2 
+            checkpoint npz file that the finished rows are written to, if it exists for the same coords the 
+                finished rows are read back and only the missing rows are computed
 
         Returns:
             Hessian (N1,N1) np.ndarray 
 
         '''
+        assert fd_type in ['central','forward'], "fd_type must be central or forward"
         if qm_region is None:
-            hess = np.zeros((len(coords)*3,len(coords)*3))
             n1_region = [ x for x in range(3*len(coords)) ]
         else:
             n1_region =[]
@@ -196,27 +316,60 @@ class PES(object):
                     n1_region.append(n*3+j)
             print('n1_region')
             print(n1_region)
-            #hess = np.zeros((len(coords[qm_region])*3,len(coords[qm_region])*3))
-            hess = np.zeros((len(n1_region),len(n1_region)))
+        n1_region = np.asarray(n1_region)
+        hess = np.zeros((len(n1_region),len(n1_region)))
+        done = np.zeros(len(n1_region),dtype=bool)
         print("hess shape", hess.shape)
 
-        def gen_row(n):
-            vec = np.zeros(coords.shape[0]*3)
-            vec[n] = 1.
-            return vec
-       
-        n_actual = 0
-        for n in range(len(coords)*3):
-            if n in n1_region:
-                print("on hessian product ",n)
-                row = gen_row(n)
-                ans = self.get_finite_difference_hessian_product(coords,row)
-                #hess[n_actual] = np.squeeze(self.get_finite_difference_hessian_product(coords,row))
-                hess[n_actual] = np.squeeze(ans[n1_region])
-                n_actual +=1
+        if checkpoint is not None and path.exists(checkpoint):
+            data = np.load(checkpoint)
+            if data['hess'].shape==hess.shape and np.array_equal(data['region'],n1_region) and np.allclose(data['coords'],coords) and str(data['fd_type'])==fd_type:
+                hess = data['hess'].copy()
+                done = data['done'].copy()
+                print(" read %i of %i Hessian rows from %s" % (np.sum(done),len(done),checkpoint))
+            else:
+                print(" %s is for a different Hessian, ignoring" % checkpoint)
+
+        def save_rows():
+            if checkpoint is not None:
+                tmpfile = checkpoint+'.tmp.npz'
+                np.savez(tmpfile,hess=hess,done=done,coords=coords,region=n1_region,fd_type=fd_type)
+                os.replace(tmpfile,checkpoint)
+
+        todo = [ i for i in range(len(n1_region)) if not done[i] ]
+        grad0 = None
+        if fd_type=='forward' and todo:
+            grad0 = self.get_gradient(coords)/units.ANGSTROM_TO_AU
+        tasks = [ (i,n1_region[i],coords,FD_STEP_LENGTH,grad0) for i in todo ]
+
+        if nproc>1 and len(tasks)>1:
+            print(" distributing %i Hessian rows over %i processes" % (len(tasks),nproc))
+            counter = mp.Value('i',0)
+            pool = mp.Pool(processes=nproc,initializer=_init_pes_worker,initargs=(self,counter))
+            try:
+                for i,ans in pool.imap_unordered(_fd_hessian_row,tasks):
+                    hess[i] = np.squeeze(ans)[n1_region]
+                    done[i] = True
+                    save_rows()
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for task in tasks:
+                print("on hessian product ",task[1])
+                i,ans = _fd_hessian_row(task,self)
+                hess[i] = np.squeeze(ans)[n1_region]
+                done[i] = True
+                save_rows()
+
+        if symmetrize:
+            hess = 0.5*(hess + hess.T)
         return hess
 
-    def get_finite_difference_hessian_product(self,coords,direction,FD_STEP_LENGTH=0.001):
+    def get_finite_difference_hessian_product(self,coords,direction,FD_STEP_LENGTH=0.001,grad0=None):
+        ''' Hessian vector product by finite difference of the gradient along direction.
+        If grad0 (the gradient at coords in a.u.) is given a forward difference is used.
+        '''
 
         # format the direction
         direction = direction/np.linalg.norm(direction)
@@ -225,14 +378,37 @@ class PES(object):
         # fd step
         fdstep = direction*FD_STEP_LENGTH
         fwd_coords = coords+fdstep
-        bwd_coords = coords-fdstep
 
         # calculate grad fwd and bwd in a.u. (Bohr/Ha)
         grad_fwd = self.get_gradient(fwd_coords)/units.ANGSTROM_TO_AU
+        if grad0 is not None:
+            return (grad_fwd-grad0)/FD_STEP_LENGTH
+
+        bwd_coords = coords-fdstep
         grad_bwd = self.get_gradient(bwd_coords)/units.ANGSTROM_TO_AU
     
         return (grad_fwd-grad_bwd)/(FD_STEP_LENGTH*2)
 
+    def get_lowest_eigenmode(self,coords,guess,max_iter=8,tol=1e-3,fd_type='central',FD_STEP_LENGTH=0.001):
+        ''' Davidson search for the lowest Hessian eigenmode using finite difference Hessian vector products
+        instead of the full Hessian. Costs one (forward) or two (central) gradients per iteration.
+
+        Params:
+            coords ((natoms,3) np.ndarray) - system coordinates
+            guess ((natoms,3) or (3*natoms,1) np.ndarray) - starting direction e.g. the reaction path tangent
+
+        Returns:
+            eigenvalue (Ha/ang^2), normalized Cartesian eigenvector (3*natoms,1)
+        '''
+        grad0 = None
+        if fd_type=='forward':
+            grad0 = self.get_gradient(coords)/units.ANGSTROM_TO_AU
+        def matvec(v):
+            return self.get_finite_difference_hessian_product(coords,v,FD_STEP_LENGTH,grad0)*units.ANGSTROM_TO_AU
+        guess = np.reshape(guess,(-1,1))
+        eigenvalue,mode,rnorm = math_utils.davidson_lowest_eigenpair(matvec,guess,max_iter=max_iter,tol=tol)
+        return eigenvalue,mode
+
     @staticmethod
     def normal_modes(
             geom,       # Optimized geometry in au
@@ -293,7 +469,12 @@ class PES(object):
         return w, Q 
     
     def get_gradient(self,xyz):
-        tmp =self.lot.get_gradient(xyz,self.multiplicity,self.ad_idx)
+        cache = self.cached(xyz)
+        if cache is not None:
+            return np.copy(cache[2])
+        self.count_lot_call(xyz)
+        with profiler.get_profiler().timer('lot.get_gradient'):
+            tmp =self.lot.get_gradient(xyz,self.multiplicity,self.ad_idx)
         grad = tmp
         if self.FORCE is not None:
             for i in self.FORCE:
@@ -325,6 +506,34 @@ class PES(object):
         atomic_num = [ele.atomic_num for ele in elements]
         self.checked_input =True
 
+
+# Offset of the lot node_id of the PES copies used by the parallel finite difference Hessian and grid scans
+FD_NODE_ID_OFFSET = 1000
+
+# each process of the finite difference Hessian and grid pools holds its own copy of the PES
+_worker_pes = None
+
+def _init_pes_worker(pes,counter):
+    global _worker_pes
+    with counter.get_lock():
+        k = counter.value
+        counter.value += 1
+    _worker_pes = type(pes).create_pes_from(pes,options={'node_id':FD_NODE_ID_OFFSET+k})
+
+def _fd_hessian_row(task,pes=None):
+    i,n,coords,FD_STEP_LENGTH,grad0 = task
+    if pes is None:
+        pes = _worker_pes
+    row = np.zeros(coords.shape[0]*3)
+    row[n] = 1.
+    return i,pes.get_finite_difference_hessian_product(coords,row,FD_STEP_LENGTH,grad0)
+
+def _grid_point(task,pes=None):
+    rc,cc,xyz = task
+    if pes is None:
+        pes = _worker_pes
+    return rc,cc,pes.grid_point_energies(xyz)
+
 if __name__ == '__main__':
 
     QCHEM=True
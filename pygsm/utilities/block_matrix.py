@@ -1,5 +1,4 @@
 import numpy as np
-from scipy.linalg import block_diag
 from .math_utils import orthogonalize, conjugate_orthogonalize
 
 
@@ -18,12 +17,13 @@ class block_matrix(object):
             lines.append(str(m))
             count += 1
             if count > 10:
-                print('truncating printout')
+                lines.append(' ... truncated, {} more blocks'.format(self.num_blocks-count))
                 break
         return '\n'.join(lines)
 
     @staticmethod
     def full_matrix(A):
+        from scipy.linalg import block_diag  # deferred only to keep scipy.linalg out of the startup time
         return block_diag(*A.matlist)
 
     @property
@@ -1,5 +1,4 @@
 import numpy as np
-from scipy.linalg import block_diag
 from .nifty import printcool,pvec1d
 import sys
 from .math_utils import orthogonalize,conjugate_orthogonalize
@@ -26,6 +25,7 @@ class block_tensor(object):
 
     @staticmethod
     def full_matrix(A):
+        from scipy.linalg import block_diag  # deferred only to keep scipy.linalg out of the startup time
         return block_diag(*A.matlist)
 
     @property
@@ -0,0 +1,209 @@
+import sys
+import json
+import atexit
+import time
+import logging
+import threading
+
+try:
+    from . import profiler
+except:
+    import profiler
+
+'''
+Leveled logging of the hot loops and a structured event stream.
+
+Each subsystem (gsm, optimizer, coordinates, lot, pes) logs to its own logger,
+pygsm.<subsystem>, so their levels can be set separately, e.g. -log_levels
+optimizer=DEBUG,coordinates=WARNING. The messages are %-style templates with their
+arguments passed separately, so a message below the level of its logger is never
+formatted: log.debug(" eigenvalues %s", e) costs one level check when debug is off.
+For arguments that are expensive to build use Lazy.
+
+The records are written to the sys.stdout of the moment without decoration, so
+they interleave with the remaining print output as before, and stdout is flushed on
+warnings or at most every flush_interval seconds instead of after every line.
+
+event(name, **fields) adds one JSON line (time, the profiler labels node, phase and
+iteration, and the fields) to the events file given to configure. Without an events
+file it returns at once. Every event name is rate limited: at most events_rate events
+per second after a burst of events_burst, the number dropped in between is reported in
+the next event of that name.
+'''
+
+SUBSYSTEMS = ['gsm', 'optimizer', 'coordinates', 'lot', 'pes']
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+
+
+class Lazy(object):
+    ''' log.debug("%s", Lazy(func, *args)) calls func only if the message is formatted '''
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+def format_values(values, fmt=" {:7.3f}"):
+    ''' e.g. the energies of a V_profile on one line '''
+    return ''.join(fmt.format(float(v)) for v in values)
+
+
+class StdoutHandler(logging.Handler):
+    ''' writes the bare message to the current sys.stdout, flushes on warnings or every flush_interval seconds '''
+
+    def __init__(self, flush_interval=1.):
+        super(StdoutHandler, self).__init__()
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+
+    def emit(self, record):
+        try:
+            stream = sys.stdout
+            stream.write(self.format(record)+'\n')
+            now = time.time()
+            if record.levelno >= WARNING or now-self.last_flush > self.flush_interval:
+                stream.flush()
+                self.last_flush = now
+        except Exception:
+            self.handleError(record)
+
+
+class RateLimiter(object):
+    ''' token bucket per key: burst events at once, then rate per second '''
+
+    def __init__(self, rate=10., burst=100):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def allow(self, key):
+        ''' (allowed, number dropped since the last allowed one) '''
+        now = time.time()
+        with self.lock:
+            tokens, last, dropped = self.buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens+(now-last)*self.rate)
+            if tokens < 1.:
+                self.buckets[key] = (tokens, now, dropped+1)
+                return False, dropped+1
+            self.buckets[key] = (tokens-1., now, 0)
+            return True, dropped
+
+
+class EventStream(object):
+
+    def __init__(self, filename, rate=10., burst=100):
+        self.file = open(filename, 'a')
+        self.limiter = RateLimiter(rate, burst)
+        self.lock = threading.Lock()
+        self.start = time.time()
+        atexit.register(self.close)
+
+    def write(self, name, fields):
+        allowed, dropped = self.limiter.allow(name)
+        if not allowed:
+            return
+        record = {'t': round(time.time()-self.start, 6), 'event': name}
+        record.update(zip(profiler.Profiler.LABELS, profiler.get_profiler().labels()))
+        if dropped:
+            record['dropped'] = dropped
+        record.update(fields)
+        line = json.dumps(record, default=_jsonable)
+        with self.lock:
+            self.file.write(line+'\n')
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def _jsonable(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+_events = None
+_handler = None
+
+
+def _setup():
+    global _handler
+    if _handler is None:
+        _handler = StdoutHandler()
+        root = logging.getLogger('pygsm')
+        root.addHandler(_handler)
+        root.setLevel(INFO)
+        root.propagate = False
+
+
+def get_logger(subsystem):
+    ''' the logger of one of SUBSYSTEMS '''
+    assert subsystem in SUBSYSTEMS, "unknown subsystem {}".format(subsystem)
+    _setup()
+    return logging.getLogger('pygsm.'+subsystem)
+
+
+def parse_level(level):
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(level.upper())
+    if not isinstance(value, int):
+        raise ValueError("unknown log level {}".format(level))
+    return value
+
+
+def set_level(level, subsystem=None):
+    ''' level of one subsystem, or of all of them that have not been set on their own '''
+    _setup()
+    name = 'pygsm' if subsystem is None else 'pygsm.'+subsystem
+    assert subsystem is None or subsystem in SUBSYSTEMS, "unknown subsystem {}".format(subsystem)
+    logging.getLogger(name).setLevel(parse_level(level))
+
+
+def parse_levels(levels):
+    ''' {subsystem: level} from a string like "optimizer=DEBUG,coordinates=WARNING" '''
+    if not levels:
+        return {}
+    return dict((subsystem.strip(), value.strip()) for subsystem, value in (item.split('=') for item in levels.split(',') if item.strip()))
+
+
+def configure(level=None, levels=None, events_file=None, events_rate=10., events_burst=100, flush_interval=None):
+    '''
+    level       : level of all subsystems (DEBUG, INFO, WARNING, ...), INFO if None
+    levels      : per subsystem levels, a dict or a string like "optimizer=DEBUG,coordinates=WARNING"
+    events_file : append the event stream to this file (json lines)
+
+    The levels of every call replace all earlier ones, e.g. of the previous job of a campaign worker.
+    '''
+    global _events
+    _setup()
+    set_level(level if level is not None else INFO)
+    if isinstance(levels, str):
+        levels = parse_levels(levels)
+    levels = levels or {}
+    for subsystem in levels:
+        assert subsystem in SUBSYSTEMS, "unknown subsystem {}".format(subsystem)
+    for subsystem in SUBSYSTEMS:
+        set_level(levels.get(subsystem, logging.NOTSET), subsystem)
+    if flush_interval is not None:
+        _handler.flush_interval = flush_interval
+    if events_file is not None:
+        if _events is not None:
+            _events.close()
+        _events = EventStream(events_file, events_rate, events_burst)
+
+
+def event(name, **fields):
+    ''' one record of the structured event stream, nothing is done without an events file '''
+    if _events is None:
+        return
+    _events.write(name, fields)
@@ -5,9 +5,98 @@ try:
 except:
     import units
 
-import re
 #import openbabel as ob
 
+# => Geometry container <= #
+
+
+class Geometry(object):
+    """ Compact geometry: an immutable array of atomic symbols and a float64 (natoms,3) coordinate view
+
+    It can be used wherever a geom (list of (atom symbol, x,y,z) tuples) is expected,
+    indexing and iterating still give the tuples, but the functions of this module
+    (xyz_to_np, get_atoms, np_to_xyz, combine_atom_xyz and the writers) work on
+    the arrays directly and never build per-atom tuples.
+
+    The coordinates are not copied, a Geometry made from an array changes with it.
+    """
+
+    __slots__ = ('atoms', 'xyz')
+
+    def __init__(self, atoms, xyz):
+        if isinstance(atoms, np.ndarray) and not atoms.flags.writeable:
+            self.atoms = atoms
+        else:
+            self.atoms = np.array(atoms, dtype=str)
+            self.atoms.flags.writeable = False
+        self.xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+        assert len(self.atoms) == len(self.xyz), "number of atoms and coordinates differ"
+
+    @classmethod
+    def from_geom(cls, geom):
+        if isinstance(geom, Geometry):
+            return geom
+        return cls([atom[0] for atom in geom], [atom[1:4] for atom in geom])
+
+    def __len__(self):
+        return len(self.atoms)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return Geometry(self.atoms[idx], self.xyz[idx])
+        x, y, z = self.xyz[idx]
+        return (str(self.atoms[idx]), x, y, z)
+
+    def __iter__(self):
+        for atom, (x, y, z) in zip(self.atoms, self.xyz):
+            yield (str(atom), x, y, z)
+
+    def copy(self):
+        return Geometry(self.atoms, self.xyz.copy())
+
+    def __repr__(self):
+        return 'Geometry(natoms={})'.format(len(self))
+
+
+def _xyz_lines(geom, scale=1.):
+    """ The '%-2s %14.6f %14.6f %14.6f' atom lines of geom as one string, formatted in one operation """
+    if not isinstance(geom, Geometry):
+        geom = Geometry.from_geom(geom)
+    natoms = len(geom)
+    if natoms == 0:
+        return ''
+    table = np.empty((natoms, 4), dtype=object)
+    table[:, 0] = geom.atoms
+    table[:, 1:] = scale*geom.xyz if scale != 1. else geom.xyz
+    return ('%-2s %14.6f %14.6f %14.6f\n' * natoms) % tuple(table.ravel())
+
+
+def _xyz_frames(geoms, comments, scale=1.):
+    """ The text of a multi-frame xyz file, assembled in memory and written with one call """
+    return ''.join(['%d\n%s\n' % (len(geom), comment) + _xyz_lines(geom, scale) for geom, comment in zip(geoms, comments)])
+
+
+def _parse_atom_lines(lines, natoms, scale=1.):
+    """ Parse natoms*nframes 'symbol x y z' lines at once, returns the symbols of the first frame (natoms,) and xyz (nframes,natoms,3) """
+    tokens = ' '.join(lines).split()
+    symbols = Geometry(tokens[0:4*natoms:4], np.zeros((natoms, 3))).atoms
+    del tokens[0::4]
+    xyz = np.array(tokens, dtype=np.float64).reshape(-1, natoms, 3)
+    if scale != 1.:
+        xyz *= scale
+    return symbols, xyz
+
+
+def _frames(lines, natoms, offset, stride):
+    """ atom lines of the frames starting at offset, one frame every stride lines """
+    nframes = max(0, (len(lines) - offset + stride - natoms) // stride)
+    frames = []
+    for i in range(nframes):
+        sa = offset + i*stride
+        frames.extend(lines[sa:sa+natoms])
+    return frames, nframes
+
+
 # => XYZ File Utility <= #
 
 
@@ -20,22 +109,18 @@ def read_xyz(
         filename (str) - name of xyz file to read
 
     Returns:
-        geom ((natoms,4) np.ndarray) - system geometry (atom symbol, x,y,z)
+        geom (Geometry) - system geometry (atom symbol, x,y,z)
 
     """
 
-    lines = open(filename).readlines()
-    lines = lines[2:]
-    geom = []
-    for line in lines:
-        mobj = re.match(r'^\s*(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*$', line)
-        geom.append((
-            mobj.group(1),
-            scale*float(mobj.group(2)),
-            scale*float(mobj.group(3)),
-            scale*float(mobj.group(4)),
-        ))
-    return geom
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    try:
+        natoms = int(lines[0])
+    except ValueError:
+        natoms = len(lines) - 2
+    atoms, xyz = _parse_atom_lines(lines[2:2+natoms], natoms, scale)
+    return Geometry(atoms, xyz[0])
 
 
 def read_xyzs(
@@ -48,31 +133,55 @@ def read_xyzs(
         filename (str) - name of xyz file to read
 
     Returns:
-        geom ((natoms,4) np.ndarray) - system geometry (atom symbol, x,y,z)
+        geoms (list of Geometry) - system geometry (atom symbol, x,y,z) of every frame
 
     """
 
-    lines = open(filename).readlines()
+    with open(filename) as f:
+        lines = f.read().splitlines()
     natoms = int(lines[0])
-    total_lines = len(lines)
-    num_geoms = total_lines/(natoms+2)
+    atom_lines, nframes = _frames(lines, natoms, 2, natoms+2)
+    if nframes == 0:
+        return []
+    atoms, xyz = _parse_atom_lines(atom_lines, natoms, scale)
+    return [Geometry(atoms, frame) for frame in xyz]
 
-    geoms = []
-    sa = 2
-    for i in range(int(num_geoms)):
-        ea = sa+natoms
-        geom = []
-        for line in lines[sa:ea]:
-            mobj = re.match(r'^\s*(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*$', line)
-            geom.append((
-                mobj.group(1),
-                scale*float(mobj.group(2)),
-                scale*float(mobj.group(3)),
-                scale*float(mobj.group(4)),
-            ))
-        sa = ea+2
-        geoms.append(geom)
-    return geoms
+
+def iter_xyzs(
+    filename,
+    scale=1.,
+    chunk=100,
+):
+    """ Stream the frames of a multi-frame xyz file without reading the whole file
+
+    Params:
+        filename (str) - name of xyz file to read
+        chunk (int) - number of frames parsed at once
+
+    Yields:
+        geom (Geometry), comment (str) - every frame and its comment line
+
+    """
+
+    from itertools import islice
+    symbols = None
+    with open(filename) as f:
+        while True:
+            header = f.readline()
+            if not header.strip():
+                return
+            natoms = int(header)
+            block = [header.rstrip('\n')] + [line.rstrip('\n') for line in islice(f, chunk*(natoms+2)-1)]
+            nframes = len(block) // (natoms+2)
+            comments = [block[i*(natoms+2)+1] for i in range(nframes)]
+            atom_lines, _ = _frames(block, natoms, 2, natoms+2)
+            atoms, xyz = _parse_atom_lines(atom_lines, natoms, scale)
+            if symbols is None:
+                symbols = atoms
+            for frame, comment in zip(xyz, comments):
+                yield Geometry(symbols, frame), comment
+            if nframes < chunk:
+                return
 
 
 def read_molden_geoms(
@@ -80,7 +189,8 @@ def read_molden_geoms(
     scale=1.
 ):
 
-    lines = open(filename).readlines()
+    with open(filename) as f:
+        lines = f.read().splitlines()
     natoms = int(lines[2])
     nlines = len(lines)
 
@@ -88,23 +198,17 @@ def read_molden_geoms(
     num_geoms = (nlines-6) / (natoms+5)
     num_geoms = int(num_geoms)
     print(num_geoms)
-    geoms = []
 
+    atom_lines = []
     sa = 4
-    for i in range(int(num_geoms)):
+    for i in range(num_geoms):
         ea = sa+natoms
-        geom = []
-        for line in lines[sa:ea]:
-            mobj = re.match(r'^\s*(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*$', line)
-            geom.append((
-                mobj.group(1),
-                scale*float(mobj.group(2)),
-                scale*float(mobj.group(3)),
-                scale*float(mobj.group(4)),
-            ))
+        atom_lines.extend(lines[sa:ea])
         sa = ea+2
-        geoms.append(geom)
-    return geoms
+    if num_geoms == 0:
+        return []
+    atoms, xyz = _parse_atom_lines(atom_lines, natoms, scale)
+    return [Geometry(atoms, frame) for frame in xyz]
 
 
 def read_molden_Energy(
@@ -159,33 +263,24 @@ def write_molden_geoms(
 ):
     with open(filename, 'w') as f:
         f.write("[Molden Format]\n[Geometries] (XYZ)\n")
-        for geom in geoms:
-            f.write('%d\n\n' % len(geom))
-            for atom in geom:
-                f.write('%-2s %14.6f %14.6f %14.6f\n' % (
-                    atom[0],
-                    atom[1],
-                    atom[2],
-                    atom[3],
-                ))
+        f.write(_xyz_frames(geoms, [''] * len(geoms)))
         f.write("[GEOCONV]\n")
         f.write('energy\n')
         V0 = energies[0]
-        for energy in energies:
-            f.write('{}\n'.format(energy-V0))
+        f.write(''.join(['{}\n'.format(energy-V0) for energy in energies]))
         f.write("max-force\n")
-        for grad in gradrms:
-            f.write('{}\n'.format(float(grad)))
+        f.write(''.join(['{}\n'.format(float(grad)) for grad in gradrms]))
         # rint(" WARNING: Printing dE as max-step in molden output ")
         f.write("max-step\n")
-        for dE in dEs:
-            f.write('{}\n'.format(float(dE)))
+        f.write(''.join(['{}\n'.format(float(dE)) for dE in dEs]))
 
 
 def get_atoms(
         geom,
 ):
 
+    if isinstance(geom, Geometry):
+        return geom.atoms.tolist()
     atoms = []
     for atom in geom:
         atoms.append(atom[0])
@@ -205,16 +300,8 @@ def write_xyz(
         geom ((natoms,4) np.ndarray) - system geometry (atom symbol, x,y,z)
 
     """
-    fh = open(filename, 'w')
-    fh.write('%d\n' % len(geom))
-    fh.write('{}\n'.format(comment))
-    for atom in geom:
-        fh.write('%-2s %14.6f %14.6f %14.6f\n' % (
-            atom[0],
-            scale*atom[1],
-            scale*atom[2],
-            scale*atom[3],
-        ))
+    with open(filename, 'w') as fh:
+        fh.write('%d\n%s\n' % (len(geom), comment) + _xyz_lines(geom, scale))
 
 
 def write_xyzs(
@@ -232,16 +319,8 @@ def write_xyzs(
 
     """
 
-    fh = open(filename, 'w')
-    for geom in geoms:
-        fh.write('%d\n\n' % len(geom))
-        for atom in geom:
-            fh.write('%-2s %14.6f %14.6f %14.6f\n' % (
-                atom[0],
-                scale*atom[1],
-                scale*atom[2],
-                scale*atom[3],
-            ))
+    with open(filename, 'w') as fh:
+        fh.write(_xyz_frames(geoms, [''] * len(geoms), scale))
 
 
 def write_std_multixyz(
@@ -252,16 +331,7 @@ def write_std_multixyz(
         dEs,
 ):
     with open(filename, 'w') as f:
-        for E, geom in zip(energies, geoms):
-            f.write('%d\n' % len(geom))
-            f.write('%.6f\n' % (E*units.KJ_MOL_TO_AU))
-            for atom in geom:
-                f.write('%-2s %14.6f %14.6f %14.6f\n' % (
-                    atom[0],
-                    atom[1],
-                    atom[2],
-                    atom[3],
-                ))
+        f.write(_xyz_frames(geoms, ['%.6f' % (E*units.KJ_MOL_TO_AU) for E in energies]))
 
 
 def write_amber_xyz(
@@ -297,17 +367,8 @@ def write_xyzs_w_comments(
 
     """
 
-    fh = open(filename, 'w')
-    for geom, comment in zip(geoms, comments):
-        fh.write('%d\n' % len(geom))
-        fh.write('%s\n' % comment)
-        for atom in geom:
-            fh.write('%-2s %14.6f %14.6f %14.6f\n' % (
-                atom[0],
-                scale*atom[1],
-                scale*atom[2],
-                scale*atom[3],
-            ))
+    with open(filename, 'w') as fh:
+        fh.write(_xyz_frames(geoms, comments, scale))
 
 
 def xyz_to_np(
@@ -323,6 +384,8 @@ def xyz_to_np(
 
     """
 
+    if isinstance(geom, Geometry):
+        return geom.xyz.copy()
     xyz2 = np.zeros((len(geom), 3))
     for A, atom in enumerate(geom):
         xyz2[A, 0] = atom[1]
@@ -343,20 +406,14 @@ def np_to_xyz(
         xyz2 ((natoms,3) np.ndarray) - system geometry (x,y,z)
 
     Returns:
-        geom2 ((natoms,4) np.ndarray) - new system geometry
-            (atom symbol, x,y,z)
+        geom2 (Geometry) - new system geometry
+            (atom symbol, x,y,z), a view of xyz2
 
     """
 
-    geom2 = []
-    for A, atom in enumerate(geom):
-        geom2.append((
-            atom[0],
-            xyz2[A, 0],
-            xyz2[A, 1],
-            xyz2[A, 2],
-        ))
-    return geom2
+    if isinstance(geom, Geometry):
+        return Geometry(geom.atoms, xyz2)
+    return Geometry(get_atoms(geom), xyz2)
 
 
 def combine_atom_xyz(
@@ -369,19 +426,11 @@ def combine_atom_xyz(
         geom ((natoms,3) np.ndarray) - system geometry (atom symbol, x,y,z)
 
     Returns:
-        geom2 ((natoms,4) np.ndarray) - new system geometry
-            (atom symbol, x,y,z)
+        geom2 (Geometry) - new system geometry
+            (atom symbol, x,y,z), a view of xyz
 
     """
-    geom2 = []
-    for A, atom in enumerate(atoms):
-        geom2.append((
-            atom,
-            xyz[A, 0],
-            xyz[A, 1],
-            xyz[A, 2],
-        ))
-    return geom2
+    return Geometry(atoms, xyz)
 
 
 def write_fms90(
@@ -215,3 +215,50 @@ def orthogonalize(vecs, numCvecs=0):
         print(dots - np.eye(dots.shape[0], dtype=float))
         raise RuntimeError("error in orthonormality")
     return basis
+
+
+def davidson_lowest_eigenpair(matvec, guess, max_iter=10, tol=1e-3, precond=None, verbose=True):
+    """
+    Davidson search for the lowest eigenpair of a symmetric operator that is
+    only available through matrix-vector products (e.g. finite-difference
+    Hessian-vector products). Each iteration costs one call of matvec.
+
+    Params:
+        matvec - function returning A.v for a normalized vector v
+        guess - starting vector
+        precond - optional function (r,theta) -> correction vector
+    Returns:
+        theta - lowest eigenvalue estimate
+        x - normalized eigenvector estimate (same shape as guess)
+        rnorm - norm of the residual A.x - theta*x
+    """
+    shape = np.shape(guess)
+    v = np.asarray(guess, dtype=float).flatten()
+    v /= np.linalg.norm(v)
+    V = [v]
+    AV = [np.asarray(matvec(v.reshape(shape)), dtype=float).flatten()]
+    for it in range(max_iter):
+        Vm = np.array(V).T
+        AVm = np.array(AV).T
+        S = np.dot(Vm.T, AVm)
+        S = 0.5*(S+S.T)
+        e, y = np.linalg.eigh(S)
+        theta = e[0]
+        x = np.dot(Vm, y[:, 0])
+        r = np.dot(AVm, y[:, 0]) - theta*x
+        rnorm = np.linalg.norm(r)
+        if verbose:
+            print(" Davidson iter %i eigenvalue %1.5f residual %1.5f" % (it, theta, rnorm))
+        if rnorm < tol or it == max_iter-1:
+            break
+        t = precond(r, theta) if precond is not None else r
+        # orthogonalize twice for numerical stability
+        for _ in range(2):
+            t = t - np.dot(Vm, np.dot(Vm.T, t))
+        tnorm = np.linalg.norm(t)
+        if tnorm < 1e-8:
+            break
+        t /= tnorm
+        V.append(t)
+        AV.append(np.asarray(matvec(t.reshape(shape)), dtype=float).flatten())
+    return theta, x.reshape(shape), rnorm
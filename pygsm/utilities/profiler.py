@@ -0,0 +1,225 @@
+import csv
+import json
+import time
+import threading
+import functools
+from collections import OrderedDict
+
+'''
+Timers and counters of the hot paths of a string calculation.
+
+The lot calls, B-matrices, G-matrix inverses, DLC builds, Cartesian back transformations,
+optimizer steps, reparametrizations and file output are timed by name. Every time is
+filed under the labels that were current when it was taken: the node, the phase of the
+string (growth or opt) and the iteration of that phase, set by the string methods with
+scope and set_labels. So the report shows where the wall time goes per node and per
+iteration. Times are inclusive: a timer nested in another one (e.g. wilsonB in GInverse)
+is counted in full by both.
+
+Counters are timers without a time, e.g. the newCartesian microiterations.
+'''
+
+
+class _Timer(object):
+    __slots__ = ('profiler', 'name', 't0')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter()-self.t0)
+        return False
+
+
+class _SharedTimer(_Timer):
+    ''' a timer of one call made for several nodes, each of them gets an equal share of the time '''
+    __slots__ = ('nodes',)
+
+    def __init__(self, profiler, name, nodes):
+        _Timer.__init__(self, profiler, name)
+        self.nodes = nodes
+
+    def __exit__(self, *exc):
+        share = (time.perf_counter()-self.t0)/len(self.nodes)
+        for node in self.nodes:
+            with self.profiler.scope(node=node):
+                self.profiler.add(self.name, share)
+        return False
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Scope(object):
+
+    def __init__(self, profiler, labels):
+        self.profiler = profiler
+        self.labels = labels
+
+    def __enter__(self):
+        self.previous = self.profiler.labels()
+        self.profiler.set_labels(**self.labels)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.set_labels(**dict(zip(Profiler.LABELS, self.previous)))
+        return False
+
+
+class Profiler(object):
+
+    LABELS = ['node', 'phase', 'iteration']
+    COLUMNS = ['name']+LABELS+['calls', 'total', 'max']
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        ''' forget everything recorded so far, e.g. before the next job of a worker process '''
+        with self.lock:
+            # (name,node,phase,iteration) -> [calls,total seconds,longest call]
+            self.records = {}
+            self.start = time.perf_counter()
+
+    def labels(self):
+        return tuple(getattr(self.local, label, None) for label in self.LABELS)
+
+    def set_labels(self, **labels):
+        ''' file everything recorded from now on in this thread under e.g. phase='opt',iteration=3 '''
+        for label, value in labels.items():
+            assert label in self.LABELS, "unknown profiler label {}".format(label)
+            setattr(self.local, label, value)
+
+    def scope(self, **labels):
+        ''' set_labels for the with block only '''
+        return _Scope(self, labels)
+
+    def timer(self, name):
+        ''' with profiler.timer('wilsonB'): ... '''
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def shared_timer(self, name, nodes):
+        ''' with profiler.shared_timer('lot.run_batch', nodes): ... files the time split evenly under the nodes '''
+        if not self.enabled or not nodes:
+            return _NULL_TIMER
+        return _SharedTimer(self, name, nodes)
+
+    def add(self, name, elapsed, calls=1):
+        if not self.enabled:
+            return
+        key = (name,)+self.labels()
+        with self.lock:
+            record = self.records.get(key)
+            if record is None:
+                self.records[key] = [calls, elapsed, elapsed]
+            else:
+                record[0] += calls
+                record[1] += elapsed
+                if elapsed > record[2]:
+                    record[2] = elapsed
+
+    def count(self, name, n=1):
+        self.add(name, 0., n)
+
+    def rows(self):
+        ''' one dict per name, node and iteration, sorted by name '''
+        with self.lock:
+            items = list(self.records.items())
+        # unlabeled records first
+        order = lambda item: (item[0][0], item[0][1] is not None, item[0][1] or 0, item[0][2] or '', item[0][3] is not None, item[0][3] or 0)
+        return [dict(zip(self.COLUMNS, key+tuple(record))) for key, record in sorted(items, key=order)]
+
+    @staticmethod
+    def iteration_label(row):
+        return None if row['phase'] is None else ' '.join(str(x) for x in (row['phase'], row['iteration']) if x is not None)
+
+    def totals(self, by=None):
+        '''
+        {name: [calls,total,max]} summed over all labels, or with by='node', by='phase' or
+        by='iteration' (phase and iteration, e.g. 'opt 3') {label: {name: [calls,total,max]}}
+        '''
+        totals = OrderedDict()
+        if by == 'node':
+            order = lambda row: (row['node'] is not None, row['node'] or 0)
+        else:
+            order = lambda row: (row['phase'] or '', row['iteration'] is not None, row['iteration'] or 0)
+        for row in sorted(self.rows(), key=order):
+            label = self.iteration_label(row) if by == 'iteration' else row.get(by)
+            table = totals if by is None else totals.setdefault(label, OrderedDict())
+            record = table.setdefault(row['name'], [0, 0., 0.])
+            record[0] += row['calls']
+            record[1] += row['total']
+            record[2] = max(record[2], row['max'])
+        return totals
+
+    def summary(self):
+        def table(totals):
+            return OrderedDict((name, OrderedDict(zip(['calls', 'total', 'max'], record))) for name, record in totals.items())
+        return OrderedDict([
+            ('wall_time', time.perf_counter()-self.start),
+            ('totals', table(self.totals())),
+            ('by_node', OrderedDict((str(node), table(t)) for node, t in self.totals('node').items())),
+            ('by_phase', OrderedDict((str(phase), table(t)) for phase, t in self.totals('phase').items())),
+            ('by_iteration', OrderedDict((str(it), table(t)) for it, t in self.totals('iteration').items())),
+            ])
+
+    def print_report(self):
+        wall = time.perf_counter()-self.start
+        print(" Profile of the last {:.1f} s (inclusive times)".format(wall))
+        print(" {:<34s} {:>9s} {:>11s} {:>7s} {:>11s}".format('timer', 'calls', 'total (s)', '%', 'max (s)'))
+        for name, (calls, total, longest) in sorted(self.totals().items(), key=lambda kv: -kv[1][1]):
+            print(" {:<34s} {:>9d} {:>11.3f} {:>7.1f} {:>11.4f}".format(name, calls, total, 100.*total/wall if wall > 0 else 0., longest))
+
+    def write_json(self, filename):
+        data = self.summary()
+        data['records'] = self.rows()
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=1)
+
+    def write_csv(self, filename):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+
+_profiler = None
+
+
+def get_profiler():
+    ''' The profiler shared by the whole process '''
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def timed(name):
+    ''' decorator timing every call of a function under name '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_profiler().timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,126 @@
+import atexit
+import os
+import queue
+import threading
+
+try:
+    from . import manage_xyz
+except:
+    import manage_xyz
+
+'''
+Background writer for trajectory and string output files.
+
+The optimizers used to rewrite the whole opt_{node_id}.xyz file after every frame and
+the string files are written synchronously every iteration. Here frames are only
+appended, they are formatted and written by one background thread, and frames of the
+same file are collected and written together once buffer_frames of them are waiting or
+flush_interval seconds have passed. Whole files (e.g. the molden string files) can be
+handed to the same thread, so all output keeps the order in which it was requested.
+
+The geometries passed in are not copied, Molecule.geometry already returns a copy.
+'''
+
+
+class TrajectoryWriter(object):
+
+    def __init__(self, buffer_frames=16, flush_interval=2.):
+        self.buffer_frames = buffer_frames
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.buffers = {}
+        self.error = None
+        self.thread = None
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='TrajectoryWriter', daemon=True)
+                self.thread.start()
+
+    def open(self, filename):
+        ''' start filename as a new trajectory, the old file is truncated '''
+        self.start()
+        self.queue.put(('open', filename, None))
+
+    def append(self, filename, geom, comment=''):
+        ''' append one frame to filename '''
+        self.start()
+        self.queue.put(('frame', filename, (geom, comment)))
+
+    def write_file(self, func, filename, *args):
+        ''' call func(filename,*args) in the writer thread, e.g. manage_xyz.write_molden_geoms '''
+        self.start()
+        self.queue.put(('file', filename, (func, args)))
+
+    def flush(self):
+        ''' block until everything requested so far is on disk '''
+        if self.thread is None:
+            return
+        self.queue.put(('flush', None, None))
+        self.queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _write_frames(self, filename):
+        frames = self.buffers.pop(filename, None)
+        if frames:
+            geoms, comments = zip(*frames)
+            with open(filename, 'a') as f:
+                f.write(manage_xyz._xyz_frames(geoms, comments))
+
+    def _flush_all(self):
+        for filename in list(self.buffers.keys()):
+            self._write_frames(filename)
+
+    def _handle(self, kind, filename, data):
+        if kind == 'open':
+            self.buffers.pop(filename, None)
+            dirname = os.path.dirname(filename)
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            open(filename, 'w').close()
+        elif kind == 'frame':
+            frames = self.buffers.setdefault(filename, [])
+            frames.append(data)
+            if len(frames) >= self.buffer_frames:
+                self._write_frames(filename)
+        elif kind == 'file':
+            self._write_frames(filename)
+            func, args = data
+            func(filename, *args)
+        else:
+            self._flush_all()
+
+    def _run(self):
+        while True:
+            try:
+                kind, filename, data = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush_all()
+                continue
+            try:
+                self._handle(kind, filename, data)
+            except Exception as error:
+                print(" trajectory writer failed on {}: {}".format(filename, error))
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+
+_writer = None
+
+
+def get_trajectory_writer(buffer_frames=None, flush_interval=None):
+    ''' The trajectory writer shared by the optimizers and string methods of this process '''
+    global _writer
+    if _writer is None:
+        _writer = TrajectoryWriter()
+    if buffer_frames is not None:
+        _writer.buffer_frames = buffer_frames
+    if flush_interval is not None:
+        _writer.flush_interval = flush_interval
+    return _writer
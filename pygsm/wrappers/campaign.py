@@ -0,0 +1,160 @@
+# standard library imports
+import sys
+import os
+from os import path
+import csv
+import time
+import shlex
+import argparse
+import traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# third party
+import numpy as np
+
+# local application imports
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from utilities import trajectory
+from wrappers.main import main as gsm_main
+
+'''
+Run many strings (e.g. one reactant with many isomer files) from one manifest.
+
+Every non-empty line of the manifest that is not a comment (#) holds the gsm command line
+arguments of one job, e.g.
+
+    -xyzfile reactant.xyz -mode SE_GSM -isomers isomers_001.txt -package xTB_lot
+    -xyzfile diels_alder.xyz -mode DE_GSM -package xTB_lot -num_nodes 11
+
+Arguments given to the campaign that it does not know itself are added to every job.
+Files are looked up relative to the manifest. Job i (ID i unless the line sets -ID) runs
+in its own directory outdir/job_{ID:04d}, so the scratch folders and output files of
+the jobs never mix, and writes its output to gsm.log there.
+
+The jobs are run by a pool of nworkers processes that are reused, the imports are paid
+once per process and not once per string. A row is added to the summary file as soon
+as a job finishes.
+'''
+
+SUMMARY_FIELDS = ['ID', 'status', 'TSnode', 'TS_energy', 'dE_rxn', 'nnodes', 'wall_time', 'workdir', 'error']
+
+
+def read_manifest(filename, common_args=[]):
+    ''' list of (ID, argv) of the jobs in the manifest '''
+    base = path.dirname(path.abspath(filename))
+    jobs = []
+    with open(filename) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            argv = shlex.split(line) + list(common_args)
+            # files are relative to the manifest, the job runs in its own directory
+            argv = [path.join(base, a) if not a.startswith('-') and path.exists(path.join(base, a)) else a for a in argv]
+            if '-ID' in argv:
+                ID = int(argv[argv.index('-ID')+1])
+            else:
+                ID = len(jobs)
+                argv += ['-ID', str(ID)]
+            jobs.append((ID, argv))
+    IDs = [ID for ID, _ in jobs]
+    if len(set(IDs)) != len(IDs):
+        raise ValueError("job IDs in {} are not unique".format(filename))
+    return jobs
+
+
+def summarize(gsm):
+    ''' TS node and barrier of a finished string, as in post_processing '''
+    energies = gsm.energies
+    TSnode = int(gsm.TSnode)
+    minnodeR = int(np.argmin(energies[:TSnode])) if TSnode > 0 else 0
+    return {
+            'TSnode': TSnode,
+            'TS_energy': float(energies[TSnode]-energies[minnodeR]),
+            'dE_rxn': float(energies[gsm.nnodes-1]-energies[0]) if gsm.nodes[gsm.nnodes-1] is not None else '',
+            'nnodes': gsm.nnodes,
+            }
+
+
+def run_job(ID, argv, outdir):
+    ''' run one string in outdir/job_{ID}, called in the campaign worker processes '''
+    import matplotlib.pyplot as plt
+
+    workdir = path.abspath(path.join(outdir, 'job_{:04d}'.format(ID)))
+    if not path.isdir(workdir):
+        os.makedirs(workdir)
+    row = {'ID': ID, 'workdir': workdir, 'status': 'done', 'error': ''}
+
+    owd = os.getcwd()
+    t0 = time.time()
+    with open(path.join(workdir, 'gsm.log'), 'w') as log:
+        os.chdir(workdir)
+        # redirect the file descriptors, handlers like the nifty logger hold on to the
+        # sys.stdout object of import time and the lots run programs that write to them
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved = os.dup(1), os.dup(2)
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            gsm = gsm_main(argv)
+            row.update(summarize(gsm))
+        except (Exception, SystemExit) as error:
+            # e.g. a manifest line argparse rejects, Ctrl-C stops the campaign
+            traceback.print_exc()
+            row['status'] = 'failed'
+            row['error'] = '{}: {}'.format(type(error).__name__, error)
+        finally:
+            # relative output paths must be written before leaving the job directory
+            trajectory.get_trajectory_writer().flush()
+            plt.close('all')
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, saved_fd in zip((1, 2), saved):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+            os.chdir(owd)
+    row['wall_time'] = round(time.time()-t0, 1)
+    return row
+
+
+def run_campaign(manifest, nworkers=1, outdir='campaign', summary='campaign_summary.csv', common_args=[]):
+    jobs = read_manifest(manifest, common_args)
+    print(" running {} jobs from {} on {} workers".format(len(jobs), manifest, nworkers))
+
+    rows = []
+    with open(summary, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        f.flush()
+        with ProcessPoolExecutor(max_workers=nworkers, mp_context=mp.get_context('fork')) as executor:
+            futures = [executor.submit(run_job, ID, argv, outdir) for ID, argv in jobs]
+            for future in as_completed(futures):
+                row = future.result()
+                writer.writerow(row)
+                f.flush()
+                rows.append(row)
+                print(" job {ID:4d} {status:6s} TS node {TSnode} TS energy {TS_energy} ({wall_time} s)".format(**dict({'TSnode': '-', 'TS_energy': '-'}, **row)))
+                sys.stdout.flush()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the strings of a manifest (one line of gsm arguments per job) in a pool of worker processes. \
+                Unknown arguments are added to every job.",
+        )
+    parser.add_argument('manifest', help='file with the gsm arguments of one job per line')
+    parser.add_argument('-nworkers', type=int, default=1, help='number of strings run at the same time (default: %(default)s)')
+    parser.add_argument('-outdir', default='campaign', help='the jobs run in outdir/job_{ID} (default: %(default)s)')
+    parser.add_argument('-summary', default='campaign_summary.csv', help='summary table, one row per finished job (default: %(default)s)')
+    args, common_args = parser.parse_known_args(argv)
+
+    rows = run_campaign(args.manifest, args.nworkers, args.outdir, args.summary, common_args)
+    nfailed = sum(1 for row in rows if row['status'] != 'done')
+    print(" {} jobs done, {} failed, summary in {}".format(len(rows)-nfailed, nfailed, args.summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,6 @@ import sys
 import os
 from os import path
 import importlib
-import matplotlib as mpl
-mpl.use('Agg')
-import matplotlib.pyplot as plt
 
 #third party
 import argparse
@@ -15,17 +12,18 @@ import textwrap
 # local application imports
 sys.path.append(path.dirname( path.dirname( path.abspath(__file__))))
 from utilities import *
+import potential_energy_surfaces
 from potential_energy_surfaces import PES
-from potential_energy_surfaces import Avg_PES
-from potential_energy_surfaces import Penalty_PES
+import level_of_theories
+from level_of_theories.gradient_dispatcher import GradientDispatcher
 from wrappers import Molecule
-from optimizers import *
-from growing_string_methods import *
-from coordinate_systems import Topology,PrimitiveInternalCoordinates,DelocalizedInternalCoordinates,Distance,Angle,Dihedral,OutOfPlane,TranslationX,TranslationY,TranslationZ,RotationA,RotationB,RotationC
+import optimizers
+import growing_string_methods
+from coordinate_systems import CoordinateCache,Topology,PrimitiveInternalCoordinates,DelocalizedInternalCoordinates,Distance,Angle,Dihedral,OutOfPlane,TranslationX,TranslationY,TranslationZ,RotationA,RotationB,RotationC
 
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Reaction path transition state and photochemistry tool",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -39,7 +37,7 @@ def main():
     parser.add_argument('-isomers', help='driving coordinate file', type=str, required=False)
     parser.add_argument('-mode', default="DE_GSM",help='GSM Type (default: %(default)s)',choices=["DE_GSM","SE_GSM","SE_Cross"], type=str, required=True)
     parser.add_argument('-only_drive',action='store_true',help='')
-    parser.add_argument('-package',default="QChem",type=str,help="Electronic structure theory package (default: %(default)s)",choices=["QChem","Orca","Molpro","PyTC","TeraChemCloud","OpenMM","DFTB","TeraChem","BAGEL","xTB_lot"])
+    parser.add_argument('-package',default="QChem",type=str,help="Electronic structure theory package (default: %(default)s)",choices=["QChem","Orca","Molpro","PyTC","TeraChemCloud","OpenMM","DFTB","TeraChem","BAGEL","xTB_lot","ModelPotential"])
     parser.add_argument('-lot_inp_file',type=str,default=None, help='external file to specify calculation e.g. qstart,gstart,etc. Highly package specific.',required=False)
     parser.add_argument('-ID',default=0, type=int,help='string identification number (default: %(default)s)',required=False)
     parser.add_argument('-num_nodes',type=int,help='number of nodes for string (defaults: 9 DE-GSM, 20 SE-GSM)',required=False)
@@ -61,6 +59,7 @@ def main():
     parser.add_argument('-reactant_geom_fixed',action='store_true',help='Fix reactant geometry i.e. do not pre-optimize')
     parser.add_argument('-product_geom_fixed',action='store_true',help='Fix product geometry i.e. do not pre-optimize')
     parser.add_argument('-nproc',type=int,default=1,help='Processors for calculation. Python will detect OMP_NUM_THREADS, only use this if you want to force the number of processors')
+    parser.add_argument('-nworkers',type=int,default=1,help='Number of calculations of file based level of theories (QChem, Molpro, BAGEL, Orca, DFTB) run at the same time, nodes evaluated together are then submitted in parallel (default: %(default)s)')
     parser.add_argument('-charge',type=int,default=0,help='Total system charge (default: %(default)s)')
     parser.add_argument('-max_gsm_iters',type=int,default=100,help='The maximum number of GSM cycles (default: %(default)s)')
     parser.add_argument('-max_opt_steps',type=int,help='The maximum number of node optimizations per GSM cycle (defaults: 3 DE-GSM, 20 SE-GSM)')
@@ -68,7 +67,7 @@ def main():
     parser.add_argument('-no_climb',action='store_true',help="Don't climb to the TS")
     parser.add_argument('-optimize_mesx',action='store_true',help='optimize to the MESX')
     parser.add_argument('-optimize_meci',action='store_true',help='optimize to the MECI')
-    parser.add_argument('-restart_file',help='restart file',type=str)
+    parser.add_argument('-restart_file',help='restart file, a string xyz file or a scratch/checkpoint_{ID}.npz checkpoint',type=str)
     parser.add_argument('-use_multiprocessing',action='store_true',help="Use python multiprocessing to parallelize jobs on a single compute node. Set OMP_NUM_THREADS, ncpus accordingly.")
     parser.add_argument('-dont_analyze_ICs',action='store_false',help="Don't post-print the internal coordinates primitives and values") #defaults to true
     parser.add_argument('-hybrid_coord_idx_file',type=str,help="A filename containing a list of  indices to use in hybrid coordinates. 0-Based indexed")
@@ -81,9 +80,32 @@ def main():
     parser.add_argument('-prim_idx_file',type=str,help="A filename containing a list of indices to define fragments. 0-Based indexed")
     parser.add_argument('-reparametrize',action='store_true',help='Reparametrize restart string equally along path')
     parser.add_argument('-bonds_file',type=str,help="A file which contains the bond indices (0-based)")
-
-
-    args = parser.parse_args()
+    parser.add_argument('-coordinate_cache',type=str,default=None,help='Directory of a cache of built topologies, primitives, delocalized coordinates and guess Hessians shared by jobs with the same reactant')
+    parser.add_argument('-gradient_dispatcher',type=str,default=None,choices=['local','work_queue'],help='Scatter the node gradients of each optimization cycle over local processes or Work Queue workers')
+    parser.add_argument('-dispatcher_nworkers',type=int,default=None,help='Number of processes of the local gradient dispatcher (default: number of cpus)')
+    parser.add_argument('-wq_port',type=int,default=9123,help='Port of the Work Queue master (default: %(default)s)')
+    parser.add_argument('-TS_hessian',type=str,default='RP',help='How to form the TS node Hessian: modify the guess along the reaction path (RP), transform the analytic/finite-difference Cartesian Hessian (exact), or use the lowest mode from a Davidson search on Hessian vector products (davidson) (default: %(default)s)',choices=['RP','exact','davidson'])
+    parser.add_argument('-profile',type=str,default=None,help='Write the timers and counters of the hot paths per node and iteration to PROFILE.json and PROFILE.csv at the end of the run')
+    parser.add_argument('-max_gradients',type=int,default=None,help='QM budget: stop with a restartable checkpoint before the next iteration would need more than this many gradients')
+    parser.add_argument('-max_wall_time',type=float,default=None,help='Wall time budget in seconds: stop with a restartable checkpoint before the next iteration would overrun it')
+    parser.add_argument('-log_level',type=str,default='INFO',help='Level of the messages of the optimization loops, DEBUG, INFO or WARNING (default: %(default)s)')
+    parser.add_argument('-log_levels',type=str,default=None,help='Levels per subsystem (gsm, optimizer, coordinates, lot, pes), e.g. optimizer=DEBUG,coordinates=WARNING')
+    parser.add_argument('-log_events',type=str,default=None,help='Append a json line per optimizer step, string iteration and Cartesian back transformation to this file')
+    parser.add_argument('-log_events_rate',type=float,default=10.,help='At most this many events of one kind per second are written after a burst of 100 (default: %(default)s)')
+
+
+    args = parser.parse_args(argv)
+
+    # campaign workers run many jobs in one process
+    profiler.get_profiler().reset()
+    # a print level above 1 turns on the debug messages of its subsystem, unless -log_levels sets it
+    log_levels = {}
+    if args.gsm_print_level>1:
+        log_levels['gsm'] = 'DEBUG'
+    if args.opt_print_level>1:
+        log_levels['optimizer'] = 'DEBUG'
+    log_levels.update(logs.parse_levels(args.log_levels))
+    logs.configure(level=args.log_level,levels=log_levels,events_file=args.log_events,events_rate=args.log_events_rate)
 
     print_msg()
 
@@ -158,14 +180,22 @@ def main():
               'max_opt_steps' : args.max_opt_steps,
               'use_multiprocessing': args.use_multiprocessing,
               'sigma'   :   args.sigma,
+              'TS_hessian': args.TS_hessian,
+              'gradient_dispatcher': args.gradient_dispatcher,
+              'profile_report': args.profile,
+              'max_gradients': args.max_gradients,
+              'max_wall_time': args.max_wall_time,
               }
 
     nifty.printcool_dictionary(inpfileq,title='Parsed GSM Keys : Values')
 
     #LOT
     nifty.printcool("Build the {} level of theory (LOT) object".format(inpfileq['EST_Package']))
-    est_package=importlib.import_module("level_of_theories."+inpfileq['EST_Package'].lower())
-    lot_class = getattr(est_package,inpfileq['EST_Package'])
+    if inpfileq['EST_Package'] in level_of_theories.__all__:
+        lot_class = getattr(level_of_theories,inpfileq['EST_Package'])
+    else:
+        est_package=importlib.import_module("level_of_theories."+inpfileq['EST_Package'].lower())
+        lot_class = getattr(est_package,inpfileq['EST_Package'])
 
     geoms = manage_xyz.read_xyzs(inpfileq['xyzfile'])
 
@@ -191,6 +221,7 @@ def main():
             coupling_states=coupling_states,
             geom=geoms[0],
             nproc=nproc,
+            nworkers=args.nworkers,
             charge=args.charge,
             do_coupling=do_coupling,
             )
@@ -236,7 +267,7 @@ def main():
         print(inpfileq['RESTRAINTS'])
 
     nifty.printcool("Building the {} objects".format(inpfileq['PES_type']))
-    pes_class = getattr(sys.modules[__name__], inpfileq['PES_type'])
+    pes_class = getattr(potential_energy_surfaces, inpfileq['PES_type'])
     if inpfileq['PES_type']=='PES':
         pes = pes_class.from_options(
                 lot=lot,
@@ -314,45 +345,71 @@ def main():
     ELEMENT_TABLE = elements.ElementData()
     atoms = [ELEMENT_TABLE.from_symbol(atom) for atom in atom_symbols]
     xyz1 = manage_xyz.xyz_to_np(geoms[0])
-    top1 = Topology.build_topology(
-            xyz1,
-            atoms,
-            hybrid_indices=hybrid_indices,
-            prim_idx_start_stop=prim_indices,
-            bondlistfile=args.bonds_file,
-            )
+    xyz2 = manage_xyz.xyz_to_np(geoms[-1]) if inpfileq['gsm_type'] == 'DE_GSM' else None
+
+    # The topology (before adding the driving coordinate bonds) only depends on the input files,
+    # SE-GSM jobs from the same reactant with different isomers files share it
+    top1 = None
+    coordinate_cache = None
+    if args.coordinate_cache is not None:
+        coordinate_cache = CoordinateCache(args.coordinate_cache)
+        bonds = None
+        if args.bonds_file is not None:
+            with open(args.bonds_file) as f:
+                bonds = f.read()
+        topology_key = CoordinateCache.key(
+                'topology',
+                atoms=atom_symbols,
+                xyz1=xyz1,
+                xyz2=xyz2,
+                hybrid_indices=hybrid_indices,
+                prim_indices=prim_indices,
+                bonds=bonds,
+                )
+        top1 = coordinate_cache.load(topology_key)
 
-    if inpfileq['gsm_type'] == 'DE_GSM':
-        # find union bonds
-        xyz2 = manage_xyz.xyz_to_np(geoms[-1])
-        top2 = Topology.build_topology(
-                xyz2,
+    if top1 is None:
+        top1 = Topology.build_topology(
+                xyz1,
                 atoms,
                 hybrid_indices=hybrid_indices,
                 prim_idx_start_stop=prim_indices,
+                bondlistfile=args.bonds_file,
                 )
 
-        # Add bonds to top1 that are present in top2
-        # It's not clear if we should form the topology so the bonds
-        # are the same since this might affect the Primitives of the xyz1 (slightly)
-        # Later we stil need to form the union of bonds, angles and torsions
-        # However, I think this is important, the way its formulated, for identifiyin 
-        # the number of fragments and blocks, which is used in hybrid TRIC. 
-        for bond in top2.edges():
-            if bond in top1.edges:
-                pass
-            elif (bond[1],bond[0]) in top1.edges():
-                pass
-            else:
-                print(" Adding bond {} to top1".format(bond))
-                if bond[0]>bond[1]:
-                    top1.add_edge(bond[0],bond[1])
+        if inpfileq['gsm_type'] == 'DE_GSM':
+            # find union bonds
+            top2 = Topology.build_topology(
+                    xyz2,
+                    atoms,
+                    hybrid_indices=hybrid_indices,
+                    prim_idx_start_stop=prim_indices,
+                    )
+
+            # Add bonds to top1 that are present in top2
+            # It's not clear if we should form the topology so the bonds
+            # are the same since this might affect the Primitives of the xyz1 (slightly)
+            # Later we stil need to form the union of bonds, angles and torsions
+            # However, I think this is important, the way its formulated, for identifiyin 
+            # the number of fragments and blocks, which is used in hybrid TRIC. 
+            for bond in top2.edges():
+                if bond in top1.edges:
+                    pass
+                elif (bond[1],bond[0]) in top1.edges():
+                    pass
                 else:
-                    top1.add_edge(bond[1],bond[0])
-    elif inpfileq['gsm_type'] == 'SE_GSM' or inpfileq['gsm_type']=='SE_Cross':
+                    print(" Adding bond {} to top1".format(bond))
+                    if bond[0]>bond[1]:
+                        top1.add_edge(bond[0],bond[1])
+                    else:
+                        top1.add_edge(bond[1],bond[0])
+        if coordinate_cache is not None:
+            coordinate_cache.store(topology_key, top1)
+
+    driving_coord_prims=[]
+    if inpfileq['gsm_type'] == 'SE_GSM' or inpfileq['gsm_type']=='SE_Cross':
         driving_coordinates = read_isomers_file(inpfileq['isomers_file'])
 
-        driving_coord_prims=[]
         for dc in driving_coordinates:
             prim = get_driving_coord_prim(dc)
             if prim is not None:
@@ -379,48 +436,68 @@ def main():
         addtr=True
     elif inpfileq['coordinate_type']=="HDLC":
         addcart=True
-    p1 = PrimitiveInternalCoordinates.from_options(
-            xyz=xyz1,
-            atoms=atoms,
-            connect=connect,
-            addtr=addtr,
-            addcart=addcart,
-            topology=top1,
-            frozen_atoms=frozen_indices,
-            )
 
-    if inpfileq['gsm_type'] == 'DE_GSM':
-        nifty.printcool("Building Primitive Internal Coordinates 2")
-        p2 = PrimitiveInternalCoordinates.from_options(
-                xyz=xyz2,
+    # The primitives, DLC basis and guess Hessian depend on the final topology,
+    # the driving coordinate bonds are in top1.edges()
+    cached_coordinates = None
+    if coordinate_cache is not None:
+        coordinates_key = CoordinateCache.key(
+                'coordinates',
+                topology=topology_key,
+                edges=sorted(tuple(sorted(bond)) for bond in top1.edges()),
+                coordinate_type=inpfileq['coordinate_type'],
+                frozen_indices=frozen_indices,
+                driving_prims=[str(dc) for dc in driving_coord_prims if type(dc)!=Distance],
+                Form_Hessian=Form_Hessian,
+                )
+        cached_coordinates = coordinate_cache.load(coordinates_key)
+
+    if cached_coordinates is not None:
+        coord_obj1,Primitive_Hessian = cached_coordinates
+    else:
+        Primitive_Hessian = None
+        p1 = PrimitiveInternalCoordinates.from_options(
+                xyz=xyz1,
+                atoms=atoms,
+                connect=connect,
+                addtr=addtr,
+                addcart=addcart,
+                topology=top1,
+                frozen_atoms=frozen_indices,
+                )
+
+        if inpfileq['gsm_type'] == 'DE_GSM':
+            nifty.printcool("Building Primitive Internal Coordinates 2")
+            p2 = PrimitiveInternalCoordinates.from_options(
+                    xyz=xyz2,
+                    atoms=atoms,
+                    addtr = addtr,
+                    addcart=addcart,
+                    connect=connect,
+                    topology=top1,  # Use the topology of 1 because we fixed it above
+                    ) 
+            nifty.printcool("Forming Union of Primitives")
+            # Form the union of primitives
+            p1.add_union_primitives(p2)
+
+            print("check {}".format(len(p1.Internals)))
+        elif inpfileq['gsm_type'] == 'SE_GSM' or inpfileq['gsm_type']=='SE_Cross':
+            for dc in driving_coord_prims:
+                if type(dc)!=Distance: # Already handled in topology
+                    if dc not in p1.Internals:
+                        print("Adding driving coord prim {} to Internals".format(dc))
+                        p1.append_prim_to_block(dc)
+
+        nifty.printcool("Building Delocalized Internal Coordinates")
+        coord_obj1 = DelocalizedInternalCoordinates.from_options(
+                xyz=xyz1,
                 atoms=atoms,
                 addtr = addtr,
                 addcart=addcart,
                 connect=connect,
-                topology=top1,  # Use the topology of 1 because we fixed it above
+                primitives=p1,
+                frozen_atoms=frozen_indices,
                 ) 
-        nifty.printcool("Forming Union of Primitives")
-        # Form the union of primitives
-        p1.add_union_primitives(p2)
-
-        print("check {}".format(len(p1.Internals)))
-    elif inpfileq['gsm_type'] == 'SE_GSM' or inpfileq['gsm_type']=='SE_Cross':
-        for dc in driving_coord_prims:
-            if type(dc)!=Distance: # Already handled in topology
-                if dc not in p1.Internals:
-                    print("Adding driving coord prim {} to Internals".format(dc))
-                    p1.append_prim_to_block(dc)
-
-    nifty.printcool("Building Delocalized Internal Coordinates")
-    coord_obj1 = DelocalizedInternalCoordinates.from_options(
-            xyz=xyz1,
-            atoms=atoms,
-            addtr = addtr,
-            addcart=addcart,
-            connect=connect,
-            primitives=p1,
-            frozen_atoms=frozen_indices,
-            ) 
     if inpfileq['gsm_type'] == 'DE_GSM':
         # TMP 
         pass
@@ -432,11 +509,17 @@ def main():
             PES=pes,
             coord_obj = coord_obj1,
             Form_Hessian=Form_Hessian,
+            Primitive_Hessian=Primitive_Hessian,
             )
+    if cached_coordinates is not None and Primitive_Hessian is not None:
+        # the cached Hessian is the guess Hessian, treat it as form_Primitive_Hessian does
+        reactant.newHess = 10
+    if coordinate_cache is not None and cached_coordinates is None:
+        # stored before the optimization changes the coordinate basis
+        coordinate_cache.store(coordinates_key, (coord_obj1,reactant.Primitive_Hessian))
 
     if inpfileq['gsm_type']=='DE_GSM':
         nifty.printcool("Building the product object")
-        xyz2 = manage_xyz.xyz_to_np(geoms[-1])
         product = Molecule.copy_from_options(
                 reactant,
                 xyz=xyz2,
@@ -449,7 +532,7 @@ def main():
     update_hess_in_bg = True
     if args.only_climb or inpfileq['optimizer']=="lbfgs":
         update_hess_in_bg = False
-    opt_class = getattr(sys.modules[__name__], inpfileq['optimizer'])
+    opt_class = getattr(optimizers, inpfileq['optimizer'])
     optimizer = opt_class.from_options(
             print_level=inpfileq['opt_print_level'],
             Linesearch=inpfileq['linesearch'],
@@ -461,9 +544,13 @@ def main():
             opt_climb = True if args.only_climb else False,
             )
 
+    gradient_dispatcher = None
+    if inpfileq['gradient_dispatcher'] is not None:
+        gradient_dispatcher = GradientDispatcher.from_name(inpfileq['gradient_dispatcher'],nworkers=args.dispatcher_nworkers,wq_port=args.wq_port)
+
     # GSM
     nifty.printcool("Building the GSM object")
-    gsm_class = getattr(sys.modules[__name__], inpfileq['gsm_type'])
+    gsm_class = getattr(growing_string_methods, inpfileq['gsm_type'])
     if inpfileq['gsm_type']=="DE_GSM":
         gsm = gsm_class.from_options(
                 reactant=reactant,
@@ -480,6 +567,11 @@ def main():
                 ID=inpfileq['ID'],
                 print_level=inpfileq['gsm_print_level'],
                 use_multiprocessing=inpfileq['use_multiprocessing'],
+                TS_hessian=inpfileq['TS_hessian'],
+                gradient_dispatcher=gradient_dispatcher,
+                profile_report=inpfileq['profile_report'],
+                max_gradients=inpfileq['max_gradients'],
+                max_wall_time=inpfileq['max_wall_time'],
                 )
     else:
         gsm = gsm_class.from_options(
@@ -494,6 +586,11 @@ def main():
                 driving_coords=driving_coordinates,
                 ID=inpfileq['ID'],
                 use_multiprocessing=inpfileq['use_multiprocessing'],
+                TS_hessian=inpfileq['TS_hessian'],
+                gradient_dispatcher=gradient_dispatcher,
+                profile_report=inpfileq['profile_report'],
+                max_gradients=inpfileq['max_gradients'],
+                max_wall_time=inpfileq['max_wall_time'],
                 )
 
 
@@ -553,7 +650,15 @@ def main():
    
     if args.restart_file is not None:
         gsm.restart_string(args.restart_file,rtype,args.reparametrize)
-    gsm.go_gsm(inpfileq['max_gsm_iters'],inpfileq['max_opt_steps'],rtype)
+    try:
+        gsm.go_gsm(inpfileq['max_gsm_iters'],inpfileq['max_opt_steps'],rtype)
+    finally:
+        # stop the dispatcher workers also when the string fails
+        if gradient_dispatcher is not None:
+            gradient_dispatcher.shutdown()
+    if gsm.budget_stop is not None:
+        # the string is continued from its checkpoint, nothing to analyze yet
+        return gsm
     if inpfileq['gsm_type']=='SE_Cross':
         post_processing(
                 gsm,
@@ -571,7 +676,7 @@ def main():
 
     cleanup_scratch(gsm.ID)
 
-    return
+    return gsm
 
 
 def read_isomers_file(isomers_file):
@@ -665,6 +770,10 @@ def cleanup_scratch(ID):
     #        os.system(cmd)
 
 def plot(fx,x,title):
+    # matplotlib is only needed at the very end of a run, it is imported here to keep startup fast
+    import matplotlib as mpl
+    mpl.use('Agg')
+    import matplotlib.pyplot as plt
     plt.figure(1)
     plt.title("String {:04d}".format(title))
     plt.plot(x,fx,color='b', label = 'Energy',linewidth=2,marker='o',markersize=12)
@@ -20,8 +20,6 @@ sys.path.append(path.dirname( path.dirname( path.abspath(__file__))))
 from utilities import *
 import potential_energy_surfaces
 from potential_energy_surfaces import PES
-from potential_energy_surfaces import Avg_PES
-from potential_energy_surfaces import Penalty_PES
 from coordinate_systems import DelocalizedInternalCoordinates
 from coordinate_systems import CartesianCoordinates
 
@@ -78,7 +76,7 @@ class Molecule(object):
         opt.add_option(
                 key='geom',
                 required=False,
-                allowed_types=[list],
+                allowed_types=[list,manage_xyz.Geometry],
                 doc='geometry including atomic symbols'
                 )
 
@@ -390,7 +388,10 @@ class Molecule(object):
 
     @property
     def geometry(self):
-        return manage_xyz.combine_atom_xyz(self.atom_symbols,self.xyz)
+        # a snapshot, optimizers keep the geometries of every step
+        if getattr(self,'_symbols',None) is None or len(self._symbols)!=len(self.atoms):
+            self._symbols = manage_xyz.Geometry(self.atom_symbols,self.xyz).atoms
+        return manage_xyz.Geometry(self._symbols,self.xyz.copy())
 
     @property
     def atom_symbols(self):
@@ -433,7 +434,21 @@ class Molecule(object):
 
     @property
     def exactHessian(self):
-        raise NotImplementedError
+        hessx = self.PES.get_hessian(self.xyz)
+        gradx = self.PES.get_gradient(self.xyz)
+        return self.coord_obj.calcHess(self.xyz,gradx,hessx)
+
+    def form_Hessian_from_cartesian(self,hessx):
+        ''' Transform a Cartesian Hessian (Ha/ang^2) into the current coordinate basis.
+        The primitive Hessian is set to V H V^T so that form_Hessian_in_basis gives back the same Hessian.
+        '''
+        gradx = self.PES.get_gradient(self.xyz)
+        self.Hessian = self.coord_obj.calcHess(self.xyz,gradx,hessx)
+        if self.coord_obj.__class__.__name__=='DelocalizedInternalCoordinates':
+            Vecs = block_matrix.full_matrix(self.coord_basis)
+            self.Primitive_Hessian = np.linalg.multi_dot([Vecs,self.Hessian,Vecs.T])
+        self.newHess = 5
+        return self.Hessian
 
     @property
     def Primitive_Hessian(self):
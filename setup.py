@@ -33,6 +33,7 @@ setup(
 
     entry_points={'console_scripts': [
         'gsm=pygsm.wrappers.main:main',
+        'gsm-campaign=pygsm.wrappers.campaign:main',
             ]},
 
     )